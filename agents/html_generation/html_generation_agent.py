@@ -1,7 +1,10 @@
-from agents.html_generation.html_generation_system_prompt import html_prompt
+from agents.html_generation.html_generation_system_prompt import html_patch_prompt, html_prompt, page_spec_prompt
 from pydantic import BaseModel, Field
-from strands import Agent
-from utils.ai_config import create_model
+from typing import TYPE_CHECKING, Literal
+from utils.ai_config import cacheable_system_prompt, create_model
+
+if TYPE_CHECKING:
+    from strands import Agent
 
 class HTMLGenerationResult(BaseModel):
     """Model that defines result of HTML generation"""
@@ -12,13 +15,127 @@ class HTMLGenerationResult(BaseModel):
         description="Error message if HTML generation unsuccessful. If successful, this is empty"
     )
 
-def create_html_generation_agent() -> Agent:
+class PatchOperation(BaseModel):
+    """One DOM edit applied to the previous HTML"""
+    op: Literal["replace", "insert", "remove"] = Field(description="Kind of edit")
+    selector: str = Field(description="XPath matching exactly one element of the previous HTML")
+    position: Literal["before", "after", "inside_start", "inside_end"] | None = Field(
+        default=None,
+        description="Where to insert relative to the selected element. Only for insert"
+    )
+    html: str | None = Field(
+        default=None,
+        description="New HTML for replace and insert. Empty for remove"
+    )
+
+class HTMLPatchResult(BaseModel):
+    """Model that defines result of a patch-based refinement"""
+    success: bool = Field(description="True if the refinement can be expressed as edits to the previous HTML")
+    operations: list[PatchOperation] = Field(
+        default_factory=list,
+        description="Edits applied in order to the previous HTML"
+    )
+    error_message: str | None = Field(
+        default=None,
+        description="Why the refinement needs a full regeneration. If successful, this is empty"
+    )
+
+class SpecLink(BaseModel):
+    """A link shown on an item"""
+    label: str = Field(description="Link text")
+    url: str = Field(description="URL taken from the portfolio data")
+
+class SpecItem(BaseModel):
+    """One card, timeline entry or list entry"""
+    title: str = Field(description="Item name, e.g. project, role or degree")
+    subtitle: str | None = Field(default=None, description="Secondary line, e.g. company or institution")
+    meta: str | None = Field(default=None, description="Dates, location or other short details")
+    description: str | None = Field(default=None, description="One or two sentence summary")
+    bullets: list[str] = Field(default_factory=list, description="Short highlights")
+    tags: list[str] = Field(default_factory=list, description="Technologies, skills or keywords")
+    links: list[SpecLink] = Field(default_factory=list, description="Links present in the portfolio data")
+
+class PageSection(BaseModel):
+    """A section of the page, rendered by the named component"""
+    component: Literal["hero", "text", "cards", "timeline", "list", "tags"] = Field(
+        description="hero: page intro; text: paragraphs; cards: grid of items; "
+                    "timeline: dated items in order; list: compact items; tags: grouped keywords"
+    )
+    heading: str | None = Field(default=None, description="Section heading")
+    body: str | None = Field(default=None, description="Plain-text paragraphs, separated by blank lines")
+    items: list[SpecItem] = Field(default_factory=list, description="Items for cards, timeline, list and tags")
+
+class PageSpec(BaseModel):
+    """Content of a page; the application renders the markup"""
+    title: str = Field(description="Page title")
+    subtitle: str | None = Field(default=None, description="One-line summary under the title")
+    sections: list[PageSection] = Field(description="Sections in display order")
+
+class PageSpecResult(BaseModel):
+    """Model that defines result of page spec generation"""
+    success: bool = Field(description="True if the request can be shown with the available components")
+    page: PageSpec | None = Field(default=None, description="The page content. Empty if unsuccessful")
+    error_message: str | None = Field(
+        default=None,
+        description="Why the page needs free-form HTML. If successful, this is empty"
+    )
+
+def create_html_generation_agent(callback_handler=None) -> "Agent":
     """
     Factory function to create instance of HTML generation agent.
+
+    Pass `callback_handler` to observe streamed model events; otherwise the
+    strands default handler is used.
     """
+    from strands import Agent
+
+    agent_kwargs = {}
+    if callback_handler is not None:
+        agent_kwargs["callback_handler"] = callback_handler
+
     return Agent(
         name="HTMLGenerationAgent",
-        system_prompt=html_prompt,
+        system_prompt=cacheable_system_prompt(html_prompt),
+        model=create_model(),
+        tools=[],
+        **agent_kwargs
+    )
+
+def create_html_patch_agent(callback_handler=None) -> "Agent":
+    """
+    Factory function to create instance of the HTML patch agent, which
+    refines a page by returning DOM edits instead of the whole document.
+    """
+    from strands import Agent
+
+    agent_kwargs = {}
+    if callback_handler is not None:
+        agent_kwargs["callback_handler"] = callback_handler
+
+    return Agent(
+        name="HTMLPatchAgent",
+        system_prompt=cacheable_system_prompt(html_patch_prompt),
+        model=create_model(),
+        tools=[],
+        **agent_kwargs
+    )
+
+def create_page_spec_agent(callback_handler=None) -> "Agent":
+    """
+    Factory function to create instance of the page spec agent, which
+    describes a page as structured content for the component templates
+    instead of writing its markup.
+    """
+    from strands import Agent
+
+    agent_kwargs = {}
+    if callback_handler is not None:
+        agent_kwargs["callback_handler"] = callback_handler
+
+    return Agent(
+        name="PageSpecAgent",
+        system_prompt=cacheable_system_prompt(page_spec_prompt),
         model=create_model(),
-        tools=[]
+        tools=[],
+        **agent_kwargs
     )
@@ -0,0 +1,122 @@
+"""
+Apply DOM edit operations from the HTML patch agent to a cached page.
+
+Selectors are XPath expressions evaluated against the page fragment wrapped
+in a single container element. Every selector must match exactly one element
+so an ambiguous edit fails instead of changing the wrong part of the page.
+Full documents are rejected: parsed as a fragment they would lose their
+<head>, styles included.
+"""
+import re
+from typing import Iterable
+
+from lxml import etree
+from lxml import html as lxml_html
+
+from agents.html_generation.html_generation_agent import PatchOperation
+
+_CONTAINER = "patch-root"
+_DOCUMENT_TAG = re.compile(r"<\s*(?:!doctype|html|head|body)\b", re.IGNORECASE)
+
+
+class PatchError(Exception):
+    """An operation could not be applied; the caller regenerates the page"""
+
+
+def _parse_fragment(html: str):
+    if _DOCUMENT_TAG.search(html):
+        raise PatchError("html is a full document, not a fragment")
+    return lxml_html.fragment_fromstring(html, create_parent=_CONTAINER)
+
+
+def _new_nodes(html: str | None) -> tuple[str, list]:
+    """Leading text and elements of an operation's HTML"""
+    if not html or not html.strip():
+        raise PatchError("operation has no html")
+    container = _parse_fragment(html)
+    return container.text or "", list(container)
+
+
+def _select(root, selector: str):
+    try:
+        matches = root.xpath(selector)
+    except etree.XPathError as exc:
+        raise PatchError(f"invalid selector {selector!r}: {exc}") from exc
+    elements = [match for match in matches if isinstance(match, etree._Element)]
+    if len(elements) != 1:
+        raise PatchError(f"selector {selector!r} matched {len(elements)} elements, expected 1")
+    if elements[0] is root:
+        raise PatchError(f"selector {selector!r} matched the whole page")
+    return elements[0]
+
+
+def _append_text(root, anchor, text: str) -> None:
+    """Attach text after `anchor`, or at the start of `root` when anchor is None"""
+    if not text:
+        return
+    if anchor is None:
+        root.text = (root.text or "") + text
+    else:
+        anchor.tail = (anchor.tail or "") + text
+
+
+def _insert_at(parent, index: int, text: str, nodes: list) -> None:
+    previous = parent[index - 1] if index > 0 else None
+    _append_text(parent, previous, text)
+    for offset, node in enumerate(nodes):
+        parent.insert(index + offset, node)
+
+
+def _apply(root, operation: PatchOperation) -> None:
+    target = _select(root, operation.selector)
+    parent = target.getparent()
+
+    if operation.op == "remove":
+        target.drop_tree()
+        return
+
+    text, nodes = _new_nodes(operation.html)
+    if operation.op == "replace":
+        index = parent.index(target)
+        tail, target.tail = target.tail, None
+        target.drop_tree()
+        _insert_at(parent, index, text, nodes)
+        previous = nodes[-1] if nodes else (parent[index - 1] if index > 0 else None)
+        _append_text(parent, previous, tail or "")
+        return
+
+    position = operation.position or "after"
+    if position == "before":
+        _insert_at(parent, parent.index(target), text, nodes)
+    elif position == "after":
+        index = parent.index(target) + 1
+        tail, target.tail = target.tail, None
+        _insert_at(parent, index, text, nodes)
+        _append_text(parent, nodes[-1] if nodes else target, tail or "")
+    elif position == "inside_start":
+        existing = target.text
+        target.text = None
+        _insert_at(target, 0, text, nodes)
+        _append_text(target, nodes[-1] if nodes else None, existing or "")
+    elif position == "inside_end":
+        _insert_at(target, len(target), text, nodes)
+    else:
+        raise PatchError(f"unknown insert position {position!r}")
+
+
+def apply_patch(html: str, operations: Iterable[PatchOperation]) -> str:
+    """Return `html` with `operations` applied in order"""
+    try:
+        root = _parse_fragment(html)
+    except etree.ParserError as exc:
+        raise PatchError(f"cached HTML could not be parsed: {exc}") from exc
+
+    for operation in operations:
+        _apply(root, operation)
+
+    patched = (root.text or "") + "".join(
+        lxml_html.tostring(child, encoding="unicode") for child in root
+    )
+    if not patched.strip():
+        raise PatchError("operations left the page empty")
+    return patched
@@ -0,0 +1,137 @@
+import re
+
+_HTML_FIELD_PATTERN = re.compile(r'"html"\s*:\s*"')
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class HTMLStreamExtractor:
+    """
+    Incrementally decode the `html` string field of a structured output
+    payload while the model is still streaming its JSON.
+
+    `feed` takes the accumulated tool-use input seen so far and returns only
+    the newly decoded HTML, stopping before any escape sequence that has not
+    fully arrived yet.
+    """
+
+    def __init__(self):
+        self._value_start: int | None = None
+        self._position = 0
+        self._complete = False
+        self.html = ""
+
+    def feed(self, partial_json: str) -> str:
+        if self._complete:
+            return ""
+
+        if self._value_start is None:
+            match = _HTML_FIELD_PATTERN.search(partial_json)
+            if not match:
+                return ""
+            self._value_start = match.end()
+            self._position = self._value_start
+
+        decoded = []
+        position = self._position
+        length = len(partial_json)
+
+        while position < length:
+            char = partial_json[position]
+
+            if char == '"':
+                self._complete = True
+                position += 1
+                break
+
+            if char != "\\":
+                decoded.append(char)
+                position += 1
+                continue
+
+            if position + 1 >= length:
+                break
+
+            escape = partial_json[position + 1]
+            if escape in _SIMPLE_ESCAPES:
+                decoded.append(_SIMPLE_ESCAPES[escape])
+                position += 2
+                continue
+
+            if escape != "u":
+                # Malformed escape; keep it verbatim rather than stalling the stream.
+                decoded.append(escape)
+                position += 2
+                continue
+
+            code_point = self._read_unicode_escape(partial_json, position)
+            if code_point is None:
+                break
+            text, consumed = code_point
+            decoded.append(text)
+            position += consumed
+
+        self._position = position
+        fragment = "".join(decoded)
+        self.html += fragment
+        return fragment
+
+    @staticmethod
+    def _read_unicode_escape(partial_json: str, position: int) -> tuple[str, int] | None:
+        """Decode a \\uXXXX escape (and its surrogate pair), or None if incomplete."""
+        hex_digits = partial_json[position + 2:position + 6]
+        if len(hex_digits) < 4:
+            return None
+
+        try:
+            value = int(hex_digits, 16)
+        except ValueError:
+            return hex_digits, 6
+
+        if 0xD800 <= value <= 0xDBFF:
+            low = partial_json[position + 6:position + 12]
+            if len(low) < 6:
+                return None
+            if low.startswith("\\u"):
+                try:
+                    low_value = int(low[2:], 16)
+                except ValueError:
+                    low_value = 0
+                if 0xDC00 <= low_value <= 0xDFFF:
+                    combined = 0x10000 + ((value - 0xD800) << 10) + (low_value - 0xDC00)
+                    return chr(combined), 12
+            return "\ufffd", 6
+
+        return chr(value), 6
+
+
+def create_html_stream_handler(on_fragment):
+    """
+    Build a strands callback handler that forwards HTML fragments from the
+    streamed structured output to `on_fragment` as they are decoded.
+    """
+    extractor = HTMLStreamExtractor()
+
+    def callback_handler(**kwargs):
+        current_tool_use = kwargs.get("current_tool_use")
+        if not current_tool_use or kwargs.get("type") != "tool_use_stream":
+            return
+
+        partial_input = current_tool_use.get("input")
+        if not isinstance(partial_input, str):
+            return
+
+        fragment = extractor.feed(partial_input)
+        if fragment:
+            on_fragment(fragment)
+
+    return callback_handler
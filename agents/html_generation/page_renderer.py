@@ -0,0 +1,52 @@
+"""
+Render a PageSpec through the Jinja component templates in
+templates/components.
+
+The model only writes content; every tag, class and layout comes from the
+templates, so pages stay consistent and cost far fewer output tokens than
+free-form HTML. All spec text is autoescaped, and links other than http(s)
+and mailto are dropped.
+"""
+from functools import cache
+from pathlib import Path
+
+from agents.html_generation.html_generation_agent import PageSpec
+
+COMPONENTS_DIR = Path(__file__).resolve().parents[2] / "templates" / "components"
+
+_SAFE_URL_SCHEMES = ("http://", "https://", "mailto:")
+
+
+def _safe_url(url: str | None) -> str | None:
+    url = (url or "").strip()
+    return url if url.lower().startswith(_SAFE_URL_SCHEMES) else None
+
+
+def _paragraphs(text: str | None) -> list[str]:
+    return [paragraph.strip() for paragraph in (text or "").split("\n\n") if paragraph.strip()]
+
+
+@cache
+def _environment():
+    from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+    environment = Environment(
+        loader=FileSystemLoader(COMPONENTS_DIR),
+        autoescape=True,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        undefined=StrictUndefined,
+    )
+    environment.filters["safe_url"] = _safe_url
+    environment.tests["safe_url"] = lambda url: _safe_url(url) is not None
+    environment.filters["paragraphs"] = _paragraphs
+    return environment
+
+
+def render_page_spec(spec: PageSpec) -> str:
+    return _environment().get_template("page.html").render(page=spec).strip()
+
+
+def render_section(section, index: int = 0) -> str:
+    """One section on its own, as it appears inside the rendered page"""
+    return _environment().get_template("section.html").render(section=section, index=index).strip()
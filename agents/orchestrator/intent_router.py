@@ -0,0 +1,333 @@
+"""
+Local fast path for common requests.
+
+Recognizes high-frequency requests ("Show me your projects", the quick-start
+prompts) and builds their OrchestrationDecision without an LLM call. Two
+sources can answer:
+
+- keyword rules, which only match messages made entirely of request words
+  and a single topic, so anything more specific goes to the LLM;
+- a small naive Bayes classifier trained from logged LLM decisions
+  (scripts/train_intent_router.py), used only when every word of the message
+  was seen in training and the prediction is confident.
+
+Everything else returns None and the orchestrator LLM decides as before.
+"""
+from dataclasses import dataclass, field
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Iterable, Optional
+
+from clients.redis_client import redis_client
+from utils.metrics import INTENT_ROUTER_REQUESTS_TOTAL, INTENT_ROUTER_SHADOW_TOTAL
+
+DECISION_LOG_KEY = "intent_router:decisions"
+MODEL_KEY = "intent_router:model"
+
+# Label for logged decisions that no fast-path intent covers
+OTHER = "other"
+
+# Words that carry no intent of their own in a request like "Can you show me your projects?"
+REQUEST_WORDS = frozenset("""
+    a about all an and any are can could describe display do give have i is list me my of on overview
+    please see show some tell the their what you your yours view work
+""".split())
+
+
+@dataclass(frozen=True)
+class IntentRule:
+    name: str
+    topic_words: frozenset[str]
+    instruction: str
+    chat_message: str
+
+
+INTENT_RULES = (
+    IntentRule(
+        name="projects",
+        topic_words=frozenset({"project", "projects"}),
+        instruction="Display all projects with descriptions and technologies used",
+        chat_message="Here are the projects from the portfolio.",
+    ),
+    IntentRule(
+        name="experience",
+        topic_words=frozenset({"experience", "experiences", "professional", "career", "jobs", "employment"}),
+        instruction="Display work experience with companies, roles, and dates",
+        chat_message="Here's the work experience.",
+    ),
+    IntentRule(
+        name="education",
+        topic_words=frozenset({"education", "coursework", "courses", "degree", "degrees", "academic", "school"}),
+        instruction="Display education history with degrees, institutions, and relevant coursework",
+        chat_message="Here's the education background and coursework.",
+    ),
+    IntentRule(
+        name="skills",
+        topic_words=frozenset({"skills", "skill", "technical", "tech", "stack", "technologies"}),
+        instruction="Display technical skills grouped by category",
+        chat_message="Here are the technical skills.",
+    ),
+)
+
+_RULES_BY_NAME = {rule.name: rule for rule in INTENT_RULES}
+
+
+def tokenize(text: str) -> list[str]:
+    return [token.removesuffix("'s") for token in re.findall(r"[a-z0-9+#']+", text.lower())]
+
+
+def _topics(tokens: Iterable[str]) -> set[str]:
+    tokens = set(tokens)
+    return {rule.name for rule in INTENT_RULES if tokens & rule.topic_words}
+
+
+def _first_topic(tokens: Iterable[str]) -> Optional[str]:
+    for token in tokens:
+        for rule in INTENT_RULES:
+            if token in rule.topic_words:
+                return rule.name
+    return None
+
+
+def decision_for_intent(intent: str):
+    """The OrchestrationDecision the LLM makes for a plain request about `intent`"""
+    from agents.orchestrator.orchestrator_agent import OrchestrationDecision
+
+    rule = _RULES_BY_NAME[intent]
+    return OrchestrationDecision(
+        success=True,
+        chat_message=rule.chat_message,
+        needs_ui_change=True,
+        instruction=rule.instruction,
+        refine_previous=False,
+        requires_external_data=True,
+    )
+
+
+def decision_intent(decision) -> str:
+    """
+    The fast-path intent an LLM decision amounts to, or OTHER. Used to label
+    logged decisions and to check routed answers against the LLM.
+    """
+    if not (decision.success and decision.needs_ui_change and decision.instruction):
+        return OTHER
+    if decision.refine_previous or not decision.requires_external_data:
+        return OTHER
+    # Instructions lead with their subject: "Display all projects with the technologies used"
+    return _first_topic(tokenize(decision.instruction)) or OTHER
+
+
+def match_rule(user_action: str) -> Optional[str]:
+    """The intent when the message is only request words plus one topic"""
+    tokens = tokenize(user_action)
+    topic_words = set().union(*(rule.topic_words for rule in INTENT_RULES))
+    if not tokens or any(token not in REQUEST_WORDS and token not in topic_words for token in tokens):
+        return None
+    topics = _topics(tokens)
+    return topics.pop() if len(topics) == 1 else None
+
+
+@dataclass
+class NaiveBayesIntentClassifier:
+    """Multinomial naive Bayes over message words, with add-one smoothing"""
+
+    class_counts: dict[str, int] = field(default_factory=dict)
+    token_counts: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    @classmethod
+    def train(cls, examples: Iterable[tuple[str, str]]) -> "NaiveBayesIntentClassifier":
+        classifier = cls()
+        for text, label in examples:
+            classifier.class_counts[label] = classifier.class_counts.get(label, 0) + 1
+            counts = classifier.token_counts.setdefault(label, {})
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+        return classifier
+
+    @property
+    def vocabulary(self) -> set[str]:
+        return {token for counts in self.token_counts.values() for token in counts}
+
+    def predict(self, text: str) -> Optional[tuple[str, float]]:
+        """
+        (label, probability), or None when the message has words never seen
+        in training and the model has nothing to say about them.
+        """
+        tokens = tokenize(text)
+        vocabulary = self.vocabulary
+        if not tokens or not self.class_counts or any(token not in vocabulary for token in tokens):
+            return None
+
+        total = sum(self.class_counts.values())
+        scores = {}
+        for label, class_count in self.class_counts.items():
+            counts = self.token_counts.get(label, {})
+            denominator = sum(counts.values()) + len(vocabulary)
+            score = math.log(class_count / total)
+            for token in tokens:
+                score += math.log((counts.get(token, 0) + 1) / denominator)
+            scores[label] = score
+
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / normalizer
+
+    def to_dict(self) -> dict:
+        return {"class_counts": self.class_counts, "token_counts": self.token_counts}
+
+    @staticmethod
+    def from_dict(data: dict) -> "NaiveBayesIntentClassifier":
+        return NaiveBayesIntentClassifier(
+            class_counts=data["class_counts"],
+            token_counts=data["token_counts"],
+        )
+
+
+@dataclass
+class RouteResult:
+    intent: str
+    source: str  # "rule" or "classifier"
+    confidence: float
+
+    @property
+    def decision(self):
+        return decision_for_intent(self.intent)
+
+
+class IntentRouter:
+    """
+    Answers common requests locally. The classifier is read from Redis and
+    refreshed every `refresh_seconds`, so a retrained model reaches every
+    worker without a restart.
+    """
+
+    def __init__(
+        self,
+        min_confidence: Optional[float] = None,
+        refresh_seconds: Optional[float] = None,
+        classifier: Optional[NaiveBayesIntentClassifier] = None,
+    ):
+        if min_confidence is None:
+            min_confidence = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.9"))
+        if refresh_seconds is None:
+            refresh_seconds = float(os.getenv("INTENT_ROUTER_REFRESH_SECONDS", "300"))
+        self.min_confidence = min_confidence
+        self.refresh_seconds = refresh_seconds
+        self._classifier = classifier
+        self._loaded_at = time.monotonic() if classifier else None
+        self._lock = threading.Lock()
+
+    def classifier(self) -> Optional[NaiveBayesIntentClassifier]:
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return self._classifier
+            self._loaded_at = time.monotonic()
+            try:
+                self._classifier = load_classifier()
+            except Exception as e:
+                print(f"Could not load intent classifier: {e}")
+            return self._classifier
+
+    def classify(self, user_action: str) -> Optional[RouteResult]:
+        """Route without recording metrics"""
+        intent = match_rule(user_action)
+        if intent:
+            return RouteResult(intent=intent, source="rule", confidence=1.0)
+
+        classifier = self.classifier()
+        prediction = classifier.predict(user_action) if classifier else None
+        if prediction and prediction[0] in _RULES_BY_NAME and prediction[1] >= self.min_confidence:
+            return RouteResult(intent=prediction[0], source="classifier", confidence=prediction[1])
+        return None
+
+    def route(self, user_action: str) -> Optional[RouteResult]:
+        if not intent_router_enabled():
+            return None
+        result = self.classify(user_action)
+        INTENT_ROUTER_REQUESTS_TOTAL.inc(result=result.source if result else "fallback")
+        return result
+
+
+def intent_router_enabled() -> bool:
+    return os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+
+
+def shadow_check_due() -> bool:
+    """Sample routed requests whose LLM decision is also computed to measure accuracy"""
+    return random.random() < float(os.getenv("INTENT_ROUTER_SHADOW_RATE", "0.02"))
+
+
+def record_shadow_result(route: RouteResult, llm_decision) -> bool:
+    agreed = decision_intent(llm_decision) == route.intent
+    INTENT_ROUTER_SHADOW_TOTAL.inc(source=route.source, agreed=str(agreed).lower())
+    return agreed
+
+
+def log_decision(user_action: str, decision) -> None:
+    """Keep an LLM decision as training data for the classifier"""
+    if os.getenv("INTENT_ROUTER_LOG_DECISIONS", "true").lower() != "true":
+        return
+    record = {"text": user_action, "decision": decision.model_dump()}
+    try:
+        pipe = redis_client.pipeline()
+        pipe.lpush(DECISION_LOG_KEY, json.dumps(record))
+        pipe.ltrim(DECISION_LOG_KEY, 0, int(os.getenv("INTENT_ROUTER_LOG_MAX", "5000")) - 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"Could not log orchestration decision: {e}")
+
+
+def logged_decisions() -> list[dict]:
+    return [json.loads(record) for record in redis_client.lrange(DECISION_LOG_KEY, 0, -1)]
+
+
+def load_classifier() -> Optional[NaiveBayesIntentClassifier]:
+    data = redis_client.get(MODEL_KEY)
+    return NaiveBayesIntentClassifier.from_dict(json.loads(data)) if data else None
+
+
+def save_classifier(classifier: NaiveBayesIntentClassifier) -> None:
+    redis_client.set(MODEL_KEY, json.dumps(classifier.to_dict()))
+
+
+def labelled_examples(records: Iterable[dict]) -> list[tuple[str, str]]:
+    from agents.orchestrator.orchestrator_agent import OrchestrationDecision
+
+    return [
+        (record["text"], decision_intent(OrchestrationDecision(**record["decision"])))
+        for record in records
+    ]
+
+
+def evaluate_router(router: IntentRouter, examples: list[tuple[str, str]]) -> dict:
+    """
+    Replay logged requests through the router. Hit rate is the share it
+    answers without the LLM; accuracy is how often those answers match the
+    LLM's decision.
+    """
+    by_source: dict[str, dict[str, int]] = {}
+    for text, label in examples:
+        result = router.classify(text)
+        if result is None:
+            continue
+        stats = by_source.setdefault(result.source, {"hits": 0, "correct": 0})
+        stats["hits"] += 1
+        stats["correct"] += int(result.intent == label)
+
+    hits = sum(stats["hits"] for stats in by_source.values())
+    correct = sum(stats["correct"] for stats in by_source.values())
+    return {
+        "requests": len(examples),
+        "hits": hits,
+        "hit_rate": round(hits / len(examples), 3) if examples else 0.0,
+        "accuracy": round(correct / hits, 3) if hits else None,
+        "by_source": by_source,
+    }
+
+
+intent_router = IntentRouter()
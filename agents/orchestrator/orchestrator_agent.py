@@ -1,9 +1,28 @@
+from agents.orchestrator.intent_router import (
+    RouteResult,
+    intent_router,
+    log_decision,
+    record_shadow_result,
+    shadow_check_due,
+)
 from agents.orchestrator.orchestrator_system_prompt import orchestrator_system_prompt
-from agents.orchestrator.tools.orchestrator_tools import generate_html_from_request
+from agents.orchestrator.tools.orchestrator_tools import generate_html_from_request_async
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import json
+import os
+import threading
 from pydantic import BaseModel, Field
-from strands import Agent
-from utils.ai_config import create_model
+from typing import TYPE_CHECKING
+from utils.agent_pool import pooled_agent
+from utils.async_runner import run_sync
+from utils.ai_config import cacheable_system_prompt, create_model
+from utils.metrics import LLM_CALLS_PER_REQUEST, record_stage_timings
+from utils.speculative_retrieval import SpeculativeRetrieval, start_speculative_retrieval
+from utils.timing import StageTimer
+
+if TYPE_CHECKING:
+    from strands import Agent
 
 class PortfolioAgentResult(BaseModel):
     """Model that defines output of portfolio orchestator agent"""
@@ -17,6 +36,14 @@ class PortfolioAgentResult(BaseModel):
         default=None,
         description="Error message if process unsuccessful. If successful, this is empty"
     )
+    from_cache: bool = Field(
+        default=False,
+        description="True when a previously generated page was served without running the agents"
+    )
+    timings: dict[str, float] = Field(
+        default_factory=dict,
+        description="Milliseconds spent in each pipeline stage"
+    )
 
 
 class OrchestrationDecision(BaseModel):
@@ -34,48 +61,75 @@ class OrchestrationDecision(BaseModel):
     error_message: str | None = Field(default=None, description="Error message if success is false")
 
 
-def create_orchestrator_agent() -> Agent:
+def create_orchestrator_agent() -> "Agent":
     """
     Factory function to create an orchestration decision agent.
     """
+    from strands import Agent
+
     return Agent(
         name="PortfolioAgent",
-        system_prompt=orchestrator_system_prompt,
+        system_prompt=cacheable_system_prompt(orchestrator_system_prompt),
         model=create_model(),
         tools=[]
     )
 
 
-def run_portfolio_request(
-    user_action: str,
-    html_cache=None,
-    progress_callback=None,
-    chat_history: list[dict] | None = None,
-) -> PortfolioAgentResult:
-    def send_progress(message: str):
-        if progress_callback:
-            progress_callback(message)
+def _semantic_cache_result(user_action: str, html_cache, send_progress) -> PortfolioAgentResult | None:
+    """
+    Serve a previously generated page when the request closely matches an
+    earlier query in this session, skipping the orchestrator entirely.
 
-    send_progress("Analyzing request...")
-    portfolio_agent = create_orchestrator_agent()
-    previous_html_available = bool(html_cache and html_cache.latest())
-    recent_history = chat_history[-8:] if chat_history else []
+    The match is promoted so follow-up refinements apply to the page on screen.
+    """
+    if not html_cache or os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    from utils.html_cache import record_semantic_cache_lookup
+
+    threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+    entry = html_cache.find_similar_query(user_action, threshold=threshold)
+    if not entry:
+        record_semantic_cache_lookup(hit=False)
+        return None
+
+    record_semantic_cache_lookup(hit=True, saved_ms=entry.duration_ms or 0.0)
+
+    send_progress("Found a matching page from earlier")
+    html_cache.promote(entry)
+    return PortfolioAgentResult(
+        success=True,
+        chat_message=f'Here\'s the page from your earlier request: "{entry.query}".',
+        html=entry.html,
+        error_message=None,
+        from_cache=True,
+    )
+
+
+# Chat messages the decision prompt sees; callers fetch only this many
+RECENT_HISTORY_MESSAGES = 8
+
+
+async def _build_decision_prompt(user_action: str, html_cache, chat_history: list[dict] | None) -> str:
+    previous_html_available = bool(html_cache and await asyncio.to_thread(html_cache.latest))
+    recent_history = chat_history[-RECENT_HISTORY_MESSAGES:] if chat_history else []
     history_lines = [
         f"{entry.get('role', 'unknown')}: {entry.get('content', '')}"
         for entry in recent_history
     ]
-    decision_prompt = (
+    return (
         f"Previous HTML exists: {previous_html_available}\n\n"
         "Recent chat history:\n"
         f"{chr(10).join(history_lines) if history_lines else '(none)'}\n\n"
         f"Current user chat request: {user_action}"
     )
-    decision_result = portfolio_agent(
-        decision_prompt,
-        structured_output_model=OrchestrationDecision
-    )
-    decision: OrchestrationDecision = decision_result.structured_output
 
+
+def _result_without_generation(decision: OrchestrationDecision) -> PortfolioAgentResult | None:
+    """
+    Return the final result when the decision does not need HTML generation,
+    otherwise None.
+    """
     if not decision.success:
         return PortfolioAgentResult(
             success=False,
@@ -100,23 +154,24 @@ def run_portfolio_request(
             error_message="Missing HTML generation instruction.",
         )
 
-    from agents.orchestrator.tools.orchestrator_tools import (
-        set_orchestrator_html_cache,
-        set_progress_callback,
-    )
+    return None
 
-    set_progress_callback(progress_callback)
-    set_orchestrator_html_cache(html_cache)
 
-    try:
-        html_result_json = generate_html_from_request(
-            instruction=decision.instruction,
-            refine_previous=decision.refine_previous,
-            requires_external_data=decision.requires_external_data,
-        )
-        html_result = json.loads(html_result_json)
-    finally:
-        set_progress_callback(None)
+def early_chat_reply_enabled() -> bool:
+    return os.getenv("EARLY_CHAT_REPLY", "true").lower() == "true"
+
+
+def _send_early_chat_reply(decision: OrchestrationDecision, progress_callback) -> None:
+    """
+    Show the decision's chat message while the page is still being generated.
+    The complete event repeats it, so clients that ignore `chat` lose nothing.
+    """
+    if progress_callback and early_chat_reply_enabled() and decision.chat_message:
+        progress_callback({"status": "chat", "message": decision.chat_message})
+
+
+def _result_from_generation(decision: OrchestrationDecision, html_result_json: str) -> PortfolioAgentResult:
+    html_result = json.loads(html_result_json)
 
     if not html_result.get("success"):
         error_message = html_result.get("error_message") or "HTML generation failed."
@@ -133,3 +188,158 @@ def run_portfolio_request(
         html=html_result.get("html"),
         error_message=None,
     )
+
+
+async def _llm_decision(decision_prompt: str) -> OrchestrationDecision:
+    with pooled_agent("orchestrator", create_orchestrator_agent) as portfolio_agent:
+        decision_result = await portfolio_agent.invoke_async(
+            decision_prompt,
+            structured_output_model=OrchestrationDecision
+        )
+    return decision_result.structured_output
+
+
+_shadow_executor: ThreadPoolExecutor | None = None
+_shadow_slots: threading.BoundedSemaphore | None = None
+_shadow_lock = threading.Lock()
+
+
+def _get_shadow_executor() -> tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _shadow_executor, _shadow_slots
+    with _shadow_lock:
+        if _shadow_executor is None:
+            workers = int(os.getenv("INTENT_ROUTER_SHADOW_WORKERS", "2"))
+            _shadow_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="intent-shadow")
+            _shadow_slots = threading.BoundedSemaphore(workers)
+        return _shadow_executor, _shadow_slots
+
+
+def _start_shadow_check(route: RouteResult, decision_prompt: str) -> None:
+    """
+    Have the LLM decide a routed request too, off the request path, to measure
+    router accuracy. Skipped while every shadow worker is busy, so a burst of
+    routed requests cannot queue up model calls.
+    """
+    executor, slots = _get_shadow_executor()
+    if not slots.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            record_shadow_result(route, run_sync(_llm_decision(decision_prompt)))
+        except Exception as e:
+            print(f"Intent router shadow check failed: {e}")
+        finally:
+            slots.release()
+
+    executor.submit(run)
+
+
+async def _decide(
+    user_action: str,
+    html_cache,
+    chat_history: list[dict] | None,
+    stage_timer: StageTimer,
+) -> tuple[OrchestrationDecision, SpeculativeRetrieval | None]:
+    """
+    Decide locally when the intent router recognizes the request, otherwise
+    ask the orchestrator LLM and log its decision as router training data.
+
+    While the LLM decides, knowledge-base retrieval on the raw message runs
+    speculatively; the caller resolves or discards it.
+    """
+    with stage_timer.stage("routing"):
+        route = await asyncio.to_thread(intent_router.route, user_action)
+    if route:
+        if shadow_check_due():
+            _start_shadow_check(route, await _build_decision_prompt(user_action, html_cache, chat_history))
+        return route.decision, None
+
+    speculation = start_speculative_retrieval(user_action)
+    try:
+        with stage_timer.stage("decision"):
+            decision = await _llm_decision(await _build_decision_prompt(user_action, html_cache, chat_history))
+    except Exception:
+        if speculation:
+            speculation.discard()
+        raise
+    await asyncio.to_thread(log_decision, user_action, decision)
+    return decision, speculation
+
+
+# Stages that make exactly one model call each time they run
+LLM_STAGES = ("decision", "generation", "patch_generation", "spec_generation", "section_generation")
+
+
+def _finish_timings(result: PortfolioAgentResult, stage_timer: StageTimer) -> PortfolioAgentResult:
+    result.timings = stage_timer.as_dict()
+    record_stage_timings(result.timings)
+    LLM_CALLS_PER_REQUEST.observe(sum(stage_timer.count(stage) for stage in LLM_STAGES))
+    return result
+
+
+def run_portfolio_request(
+    user_action: str,
+    html_cache=None,
+    progress_callback=None,
+    chat_history: list[dict] | None = None,
+) -> PortfolioAgentResult:
+    """Blocking entry point to run_portfolio_request_async, for Flask threads and agent workers"""
+    return run_sync(run_portfolio_request_async(user_action, html_cache, progress_callback, chat_history))
+
+
+async def run_portfolio_request_async(
+    user_action: str,
+    html_cache=None,
+    progress_callback=None,
+    chat_history: list[dict] | None = None,
+) -> PortfolioAgentResult:
+    """
+    Decide how to answer the request and generate the page when one is
+    needed. The decision and HTML generation run on the caller's event loop.
+    """
+    stage_timer = StageTimer()
+    result = await _run_portfolio_request_async(
+        user_action, html_cache, progress_callback, chat_history, stage_timer
+    )
+    return _finish_timings(result, stage_timer)
+
+
+async def _run_portfolio_request_async(
+    user_action: str,
+    html_cache,
+    progress_callback,
+    chat_history: list[dict] | None,
+    stage_timer: StageTimer,
+) -> PortfolioAgentResult:
+    def send_progress(message: str):
+        if progress_callback:
+            progress_callback(message)
+
+    with stage_timer.stage("semantic_cache"):
+        cached_result = await asyncio.to_thread(_semantic_cache_result, user_action, html_cache, send_progress)
+    if cached_result:
+        return cached_result
+
+    send_progress("Analyzing request...")
+    decision, speculation = await _decide(user_action, html_cache, chat_history, stage_timer)
+    try:
+        early_result = _result_without_generation(decision)
+        if early_result:
+            return early_result
+        _send_early_chat_reply(decision, progress_callback)
+
+        html_result_json = await generate_html_from_request_async(
+            instruction=decision.instruction,
+            refine_previous=decision.refine_previous,
+            requires_external_data=decision.requires_external_data,
+            html_cache=html_cache,
+            progress_callback=progress_callback,
+            stage_timer=stage_timer,
+            speculation=speculation,
+        )
+    finally:
+        if speculation:
+            speculation.discard()
+
+    return _result_from_generation(decision, html_result_json)
@@ -0,0 +1,86 @@
+"""
+Split a broad page request into independently generated sections.
+
+An instruction that spans several portfolio topics ("Show projects,
+experience and skills", "Give me an overview of everything") becomes an
+outline with one section per topic. Each section is then retrieved for and
+generated on its own model call, concurrently, so the page takes about as
+long as its slowest section rather than the sum.
+
+The outline is built from the intent router's topic words, without a model
+call, so narrow requests pay nothing and keep the single-call path.
+"""
+from dataclasses import dataclass
+import re
+from typing import Optional
+
+from agents.orchestrator.intent_router import INTENT_RULES, tokenize
+
+# Words starting a qualifier of the page's subject: "projects with the technologies used"
+_QUALIFIER = re.compile(r"\b(?:with|including|using|grouped|showing|that|which|where)\b", re.IGNORECASE)
+
+# Words asking for the whole portfolio when no topic is named
+BROAD_WORDS = frozenset({"everything", "overview", "resume", "cv"})
+
+# Component that suits each topic best, suggested to the section's model call
+TOPIC_COMPONENTS = {
+    "projects": "cards",
+    "experience": "timeline",
+    "education": "timeline",
+    "skills": "tags",
+}
+
+
+@dataclass(frozen=True)
+class OutlineSection:
+    topic: str
+    heading: str
+    # What to retrieve for and show in this section
+    query: str
+    component: str
+
+
+@dataclass(frozen=True)
+class PageOutline:
+    title: str
+    sections: tuple[OutlineSection, ...]
+
+
+def _section(rule) -> OutlineSection:
+    return OutlineSection(
+        topic=rule.name,
+        heading=rule.name.capitalize(),
+        query=rule.instruction,
+        component=TOPIC_COMPONENTS.get(rule.name, "cards"),
+    )
+
+
+def mentioned_topics(instruction: str) -> list[str]:
+    """
+    Portfolio topics the instruction's subject names, in the order it names
+    them. Topic words in a qualifier describe the subject, not another topic.
+    """
+    subject = _QUALIFIER.split(instruction, maxsplit=1)[0]
+    topics = []
+    for token in tokenize(subject):
+        for rule in INTENT_RULES:
+            if token in rule.topic_words and rule.name not in topics:
+                topics.append(rule.name)
+    return topics
+
+
+def page_outline(instruction: str, max_sections: int = 4) -> Optional[PageOutline]:
+    """The outline for a multi-topic request, or None when one call should write the page"""
+    topics = mentioned_topics(instruction)
+    if not topics and BROAD_WORDS & set(tokenize(instruction)):
+        topics = [rule.name for rule in INTENT_RULES]
+    if len(topics) < 2:
+        return None
+
+    rules = {rule.name: rule for rule in INTENT_RULES}
+    sections = tuple(_section(rules[topic]) for topic in topics[:max_sections])
+    headings = [section.heading for section in sections]
+    return PageOutline(
+        title=", ".join(headings[:-1]) + f" and {headings[-1]}",
+        sections=sections,
+    )
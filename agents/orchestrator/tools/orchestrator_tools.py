@@ -1,80 +1,171 @@
-from agents.html_generation.html_generation_agent import HTMLGenerationResult, create_html_generation_agent
+from agents.html_generation.html_generation_agent import (
+    HTMLGenerationResult,
+    HTMLPatchResult,
+    PageSpec,
+    PageSpecResult,
+    create_html_generation_agent,
+    create_html_patch_agent,
+    create_page_spec_agent,
+)
+from agents.html_generation.html_patch import PatchError, apply_patch
+from agents.html_generation.page_renderer import render_page_spec, render_section
+from agents.orchestrator.page_outline import OutlineSection, PageOutline, page_outline
+from agents.html_generation.html_stream import create_html_stream_handler
 from lxml import html as lxml_html
+import asyncio
+from contextlib import ExitStack, contextmanager
 import json
-from utils.retrieval_config import retrieval_client_singleton
-import threading
+import os
+import time
+from utils.admission import section_admission
+from utils.agent_pool import pooled_agent
+from utils.async_runner import run_sync
+from utils.kb_version import get_kb_version
+from utils.page_cache import page_cache, page_cache_enabled
+from utils.retrieval_config import get_retrieval_client
+from utils.metrics import (
+    HTML_FIRST_PAINT_SECONDS,
+    HTML_GENERATION_OUTPUT_TOKENS,
+    HTML_GENERATION_SECONDS,
+    HTML_PATCH_TOTAL,
+    HTML_SECTION_SECONDS,
+    HTML_SECTIONS_TOTAL,
+    HTML_SPEC_TOTAL,
+    KB_CONTEXT_TOKENS,
+    RETRIEVAL_CHUNKS,
+    RETRIEVAL_SCORE,
+)
+from utils.single_flight import generation_flight, single_flight_enabled
+from utils.speculative_retrieval import SpeculativeRetrieval
+from utils.timing import StageTimer
+def _html_streaming_enabled() -> bool:
+    return os.getenv("HTML_STREAMING", "true").lower() == "true"
 
-_thread_local = threading.local()
+def _html_patch_enabled() -> bool:
+    return os.getenv("HTML_PATCH_REFINEMENT", "true").lower() == "true"
 
-def set_progress_callback(callback):
-    """Set the progress callback for the current thread"""
-    _thread_local.progress_callback = callback
+def _html_generation_mode() -> str:
+    """
+    'html' has the model write the markup, streamed as it is written; 'spec'
+    renders fresh pages from a structured page spec, which costs fewer output
+    tokens but shows nothing until the page is rendered
+    """
+    return os.getenv("HTML_GENERATION_MODE", "html").lower()
 
-def set_orchestrator_html_cache(cache):
-    """Set the HTML cache for the current thread"""
-    _thread_local.html_cache = cache
+def _sectioned_generation_enabled() -> bool:
+    return os.getenv("SECTIONED_GENERATION", "true").lower() == "true"
 
-def generate_html_from_request(
+@contextmanager
+def _generation_agent(send_progress, stage_timer: StageTimer):
+    """
+    Check out a pooled HTML generation agent, streaming partial HTML to the
+    progress callback as `html_chunk` events when HTML_STREAMING is enabled.
+    """
+    callback_handler = None
+    if _html_streaming_enabled():
+        def on_fragment(fragment: str):
+            send_progress({"status": "html_chunk", "html": fragment})
+
+        callback_handler = create_html_stream_handler(on_fragment)
+
+    with ExitStack() as stack:
+        with stage_timer.stage("agent_setup"):
+            agent = stack.enter_context(
+                pooled_agent("html_generation", create_html_generation_agent, callback_handler)
+            )
+        yield agent
+
+@contextmanager
+def _patch_agent(stage_timer: StageTimer):
+    """Check out a pooled HTML patch agent; its output is edits, so nothing is streamed"""
+    with ExitStack() as stack:
+        with stage_timer.stage("agent_setup"):
+            agent = stack.enter_context(pooled_agent("html_patch", create_html_patch_agent))
+        yield agent
+
+@contextmanager
+def _page_spec_agent(stage_timer: StageTimer):
+    """Check out a pooled page spec agent; its output is not HTML, so nothing is streamed"""
+    with ExitStack() as stack:
+        with stage_timer.stage("agent_setup"):
+            agent = stack.enter_context(pooled_agent("page_spec", create_page_spec_agent))
+        yield agent
+
+def _lookup_shared_page(
     instruction: str,
     refine_previous: bool,
-    requires_external_data: bool
-) -> str:
+    requires_external_data: bool,
+    send_progress,
+) -> tuple[str | None, str | None]:
     """
-    Generate HTML based on user instruction, optional KB context,
-    and optional refinement of previous HTML.
+    Check the cross-session page cache for fresh (non-refinement) requests.
+
+    Returns the KB version the page is keyed on (None when the cache does not
+    apply) and the serialized tool result on a hit.
     """
-    def send_progress(message: str):
-        callback = getattr(_thread_local, 'progress_callback', None)
-        if callback:
-            callback(message)
-    
-    def get_html_cache():
-        return getattr(_thread_local, 'html_cache', None)
-    
-    send_progress("Starting HTML generation...")
-    
+    if refine_previous or not page_cache_enabled():
+        return None, None
+
+    kb_version = get_kb_version()
+    entry = page_cache.get(instruction, kb_version, requires_external_data)
+    if not entry:
+        return kb_version, None
+
+    send_progress("Loaded page from shared cache")
+    return kb_version, json.dumps({
+        "success": True,
+        "html": entry.html
+    })
+
+def _store_shared_page(
+    instruction: str,
+    requires_external_data: bool,
+    kb_version: str | None,
+    html_result_json: str,
+) -> None:
+    if kb_version is None:
+        return
+
+    html_result = json.loads(html_result_json)
+    if html_result.get("success") and html_result.get("html"):
+        page_cache.add(instruction, kb_version, html_result["html"], requires_external_data)
+
+def _log_generation_request(instruction: str, refine_previous: bool, requires_external_data: bool) -> None:
     print(
         "generate_html_from_request\n"
         f"  refine_previous={refine_previous}\n"
         f"  requires_external_data={requires_external_data}\n"
         f"  instruction_len={len(instruction)}"
     )
-    
-    html_generation_agent = create_html_generation_agent()
 
-    # ----------------------------
-    # Retrieve KB context if needed
-    # ----------------------------
-    kb_context = ""
-    if requires_external_data:
-        send_progress("Searching knowledge base...")
-        kb_chunks = retrieval_client_singleton.retrieve(query=instruction)
-        send_progress(f"Found {len(kb_chunks)} relevant documents")
-        kb_context = retrieval_client_singleton.build_kb_context(kb_chunks)
-    
-    # ----------------------------
-    # Build prompt sections
-    # ----------------------------
+def _build_html_prompt(
+    instruction: str,
+    refine_previous: bool,
+    kb_context: str,
+    previous_html: str | None,
+    send_progress,
+) -> str:
+    """
+    Assemble the HTML generation prompt from KB context, the previous HTML
+    (when refining) and the orchestrator instruction.
+    """
     send_progress("Preparing context...")
     prompt_sections = []
-    
+
     if kb_context:
         prompt_sections.append(
             "KNOWLEDGE BASE CONTEXT:\n"
             f"{kb_context}"
         )
-    
+
     if refine_previous:
         send_progress("Loading previous HTML...")
-        html_cache = get_html_cache()
-        if html_cache:
-            previous_entry = html_cache.latest()
-            if previous_entry:
-                prompt_sections.append(
-                    "PREVIOUS HTML:\n"
-                    f"{previous_entry.html}"
-                )
-        
+        if previous_html:
+            prompt_sections.append(
+                "PREVIOUS HTML:\n"
+                f"{previous_html}"
+            )
+
         prompt_sections.append(
             "INSTRUCTION:\n"
             f"Refine the previous HTML based on the following request:\n"
@@ -87,30 +178,344 @@ def generate_html_from_request(
             f"Generate brand new HTML based on the following request:\n"
             f"{instruction}"
         )
-    
-    html_prompt = "\n\n---\n\n".join(prompt_sections)
-    
-    # ----------------------------
-    # Call HTML generation agent
-    # ----------------------------
-    send_progress("Generating HTML with AI...")
-    result = html_generation_agent(
-        html_prompt,
-        structured_output_model=HTMLGenerationResult
+
+    return "\n\n---\n\n".join(prompt_sections)
+
+def _build_patch_prompt(instruction: str, kb_context: str, previous_html: str) -> str:
+    prompt_sections = []
+    if kb_context:
+        prompt_sections.append(
+            "KNOWLEDGE BASE CONTEXT:\n"
+            f"{kb_context}"
+        )
+    prompt_sections.append(
+        "CURRENT HTML:\n"
+        f"{previous_html}"
     )
-    
-    html_response: HTMLGenerationResult = result.structured_output
-    
+    prompt_sections.append(
+        "INSTRUCTION:\n"
+        f"Return the edit operations that apply the following request to the current HTML:\n"
+        f"{instruction}"
+    )
+    return "\n\n---\n\n".join(prompt_sections)
+
+def _build_spec_prompt(instruction: str, kb_context: str) -> str:
+    prompt_sections = []
+    if kb_context:
+        prompt_sections.append(
+            "KNOWLEDGE BASE CONTEXT:\n"
+            f"{kb_context}"
+        )
+    prompt_sections.append(
+        "INSTRUCTION:\n"
+        f"Describe the content of a new page for the following request:\n"
+        f"{instruction}"
+    )
+    return "\n\n---\n\n".join(prompt_sections)
+
+async def _previous_html(refine_previous: bool, html_cache) -> str | None:
+    """The page on screen, which a refinement patches or rewrites"""
+    if not refine_previous or not html_cache:
+        return None
+    previous_entry = await asyncio.to_thread(html_cache.latest)
+    return previous_entry.html if previous_entry else None
+
+def _patched_result_json(
+    patch_response: HTMLPatchResult,
+    previous_html: str,
+    send_progress,
+    stage_timer: StageTimer,
+) -> str | None:
+    """
+    Apply the patch agent's edits to the previous HTML. None when the model
+    declined or the edits could not be applied, so the page is regenerated.
+    """
+    if not patch_response.success or not patch_response.operations:
+        print(f"HTML patch declined: {patch_response.error_message}")
+        HTML_PATCH_TOTAL.inc(result="declined")
+        return None
+
+    send_progress(f"Applying {len(patch_response.operations)} edits...")
+    try:
+        with stage_timer.stage("patch_apply"):
+            patched_html = apply_patch(previous_html, patch_response.operations)
+    except PatchError as exc:
+        print(f"HTML patch rejected: {exc}")
+        HTML_PATCH_TOTAL.inc(result="rejected")
+        return None
+
+    html_result_json = _html_result_json(
+        HTMLGenerationResult(success=True, html=patched_html), send_progress, stage_timer
+    )
+    if not json.loads(html_result_json)["success"]:
+        HTML_PATCH_TOTAL.inc(result="rejected")
+        return None
+
+    HTML_PATCH_TOTAL.inc(result="applied")
+    return html_result_json
+
+async def _refine_with_patch(
+    instruction: str,
+    kb_context: str,
+    previous_html: str,
+    send_progress,
+    stage_timer: StageTimer,
+) -> str | None:
+    send_progress("Planning edits to the current page...")
+    try:
+        with _patch_agent(stage_timer) as patch_agent:
+            with stage_timer.stage("patch_generation"):
+                result = await patch_agent.invoke_async(
+                    _build_patch_prompt(instruction, kb_context, previous_html),
+                    structured_output_model=HTMLPatchResult
+                )
+    except Exception as exc:
+        print(f"HTML patch generation failed: {exc}")
+        HTML_PATCH_TOTAL.inc(result="failed")
+        return None
+    return _patched_result_json(result.structured_output, previous_html, send_progress, stage_timer)
+
+def _use_page_spec(refine_previous: bool) -> bool:
+    # Refinements edit existing markup, which a spec cannot describe
+    return not refine_previous and _html_generation_mode() == "spec"
+
+class _FirstPaint:
+    """Times the first page content a generation sends to the client"""
+    PAINT_STATUSES = ("html_chunk", "html_section")
+
+    def __init__(self, send_progress):
+        self._send_progress = send_progress
+        self.started = time.perf_counter()
+        self.seconds: float | None = None
+
+    def send_progress(self, message: str | dict):
+        if self.seconds is None and isinstance(message, dict) and message.get("status") in self.PAINT_STATUSES:
+            self.seconds = time.perf_counter() - self.started
+        self._send_progress(message)
+
+    def record(self, mode: str) -> None:
+        """Observe the first paint, which is the finished page when nothing streamed"""
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.started
+        HTML_FIRST_PAINT_SECONDS.observe(seconds, mode=mode)
+
+def _record_generation(mode: str, result, started: float) -> None:
+    """Output tokens and duration of one page generation, to compare modes"""
+    usage = result.metrics.accumulated_usage
+    HTML_GENERATION_OUTPUT_TOKENS.observe(usage.get("outputTokens", 0), mode=mode)
+    HTML_GENERATION_SECONDS.observe(time.perf_counter() - started, mode=mode)
+
+def _rendered_spec_json(spec_response: PageSpecResult, send_progress, stage_timer: StageTimer) -> str | None:
+    """
+    Render the spec agent's page through the component templates. None when
+    the model declined or the page could not be rendered, so the page is
+    generated as free-form HTML.
+    """
+    if not spec_response.success or not spec_response.page or not spec_response.page.sections:
+        print(f"Page spec declined: {spec_response.error_message}")
+        HTML_SPEC_TOTAL.inc(result="declined")
+        return None
+
+    send_progress("Rendering page...")
+    try:
+        with stage_timer.stage("render"):
+            html = render_page_spec(spec_response.page)
+    except Exception as exc:
+        print(f"Page spec rendering failed: {exc}")
+        HTML_SPEC_TOTAL.inc(result="rejected")
+        return None
+
+    html_result_json = _html_result_json(HTMLGenerationResult(success=True, html=html), send_progress, stage_timer)
+    if not json.loads(html_result_json)["success"]:
+        HTML_SPEC_TOTAL.inc(result="rejected")
+        return None
+
+    HTML_SPEC_TOTAL.inc(result="rendered")
+    return html_result_json
+
+async def _generate_from_spec(
+    instruction: str,
+    kb_context: str,
+    send_progress,
+    stage_timer: StageTimer,
+) -> str | None:
+    send_progress("Generating page content with AI...")
+    started = time.perf_counter()
+    try:
+        with _page_spec_agent(stage_timer) as spec_agent:
+            with stage_timer.stage("spec_generation"):
+                result = await spec_agent.invoke_async(
+                    _build_spec_prompt(instruction, kb_context),
+                    structured_output_model=PageSpecResult
+                )
+    except Exception as exc:
+        print(f"Page spec generation failed: {exc}")
+        HTML_SPEC_TOTAL.inc(result="failed")
+        return None
+
+    html_result_json = _rendered_spec_json(result.structured_output, send_progress, stage_timer)
+    if html_result_json:
+        _record_generation("spec", result, started)
+    return html_result_json
+
+def _page_outline(instruction: str, refine_previous: bool) -> PageOutline | None:
+    """
+    The sections of a multi-topic fresh page, generated concurrently. They
+    stream as they render, so this applies in either generation mode.
+    """
+    if refine_previous or not _sectioned_generation_enabled():
+        return None
+    return page_outline(instruction, max_sections=int(os.getenv("SECTIONED_GENERATION_MAX_SECTIONS", "4")))
+
+def _build_section_prompt(instruction: str, section: OutlineSection, kb_context: str) -> str:
+    prompt_sections = []
+    if kb_context:
+        prompt_sections.append(
+            "KNOWLEDGE BASE CONTEXT:\n"
+            f"{kb_context}"
+        )
+    prompt_sections.append(
+        "INSTRUCTION:\n"
+        f"This is ONE section of a larger page. The full page request is:\n"
+        f"{instruction}\n\n"
+        f"Describe only the {section.heading} section: {section.query}.\n"
+        f"Use a single `{section.component}` section headed \"{section.heading}\"."
+    )
+    return "\n\n---\n\n".join(prompt_sections)
+
+def _section_context(section: OutlineSection, requires_external_data: bool, stage_timer: StageTimer) -> str:
+    """Knowledge-base context retrieved for one section's topic"""
+    if not requires_external_data:
+        return ""
+    with stage_timer.stage("section_retrieval"):
+        retrieval_client = get_retrieval_client()
+        kb_chunks = retrieval_client.retrieve(query=section.query)
+    _record_retrieval(kb_chunks)
+    with stage_timer.stage("context_packing"):
+        pack = retrieval_client.pack_kb_context(kb_chunks)
+    KB_CONTEXT_TOKENS.observe(pack.tokens, kind="packed")
+    KB_CONTEXT_TOKENS.observe(pack.tokens_saved, kind="saved")
+    return pack.context
+
+def _rendered_section(index: int, section: OutlineSection, result, started: float, send_progress):
+    """
+    The section's spec, streamed to the client as an `html_section` event
+    once rendered. None when the model declined or rendering failed.
+    """
+    spec_response: PageSpecResult = result.structured_output
+    if not spec_response.success or not spec_response.page or not spec_response.page.sections:
+        print(f"Section {section.heading} declined: {spec_response.error_message}")
+        HTML_SECTIONS_TOTAL.inc(result="declined")
+        return None
+
+    sections = list(spec_response.page.sections)
+    if not sections[0].heading:
+        sections[0] = sections[0].model_copy(update={"heading": section.heading})
+    try:
+        html = "\n".join(render_section(page_section) for page_section in sections)
+    except Exception as exc:
+        print(f"Section {section.heading} rendering failed: {exc}")
+        HTML_SECTIONS_TOTAL.inc(result="rejected")
+        return None
+
+    HTML_SECTIONS_TOTAL.inc(result="rendered")
+    HTML_SECTION_SECONDS.observe(time.perf_counter() - started)
+    send_progress({"status": "html_section", "index": index, "html": html})
+    return sections, result.metrics.accumulated_usage.get("outputTokens", 0)
+
+async def _generate_section(
+    index: int,
+    section: OutlineSection,
+    instruction: str,
+    requires_external_data: bool,
+    send_progress,
+    stage_timer: StageTimer,
+):
+    started = time.perf_counter()
+    ticket = None
+    try:
+        # Sections from every request share SECTION_MAX_CONCURRENCY model calls
+        ticket = section_admission.reserve()
+        if not await section_admission.wait_async(ticket):
+            raise RuntimeError("section cancelled")
+        kb_context = await asyncio.to_thread(_section_context, section, requires_external_data, stage_timer)
+        with _page_spec_agent(stage_timer) as spec_agent:
+            with stage_timer.stage("section_generation"):
+                result = await spec_agent.invoke_async(
+                    _build_section_prompt(instruction, section, kb_context),
+                    structured_output_model=PageSpecResult
+                )
+    except Exception as exc:
+        print(f"Section {section.heading} generation failed: {exc}")
+        HTML_SECTIONS_TOTAL.inc(result="failed")
+        return None
+    finally:
+        if ticket:
+            section_admission.release(ticket)
+    return _rendered_section(index, section, result, started, send_progress)
+
+def _assembled_page_json(
+    outline: PageOutline,
+    section_results: list,
+    started: float,
+    send_progress,
+    stage_timer: StageTimer,
+) -> str | None:
+    """
+    Join the generated sections, in outline order, into one validated page.
+    Sections that failed are left out; None when none succeeded.
+    """
+    generated = [section_result for section_result in section_results if section_result]
+    if not generated:
+        return None
+
+    send_progress(f"Assembling {len(generated)} of {len(outline.sections)} sections...")
+    page = PageSpec(title=outline.title, sections=[section for sections, _ in generated for section in sections])
+    try:
+        with stage_timer.stage("render"):
+            html = render_page_spec(page)
+    except Exception as exc:
+        print(f"Page assembly failed: {exc}")
+        return None
+
+    html_result_json = _html_result_json(HTMLGenerationResult(success=True, html=html), send_progress, stage_timer)
+    if not json.loads(html_result_json)["success"]:
+        return None
+
+    wall_seconds = time.perf_counter() - started
+    HTML_GENERATION_OUTPUT_TOKENS.observe(sum(tokens for _, tokens in generated), mode="sections")
+    HTML_GENERATION_SECONDS.observe(wall_seconds, mode="sections")
+    print(f"[SECTIONS] {len(generated)}/{len(outline.sections)} sections in {wall_seconds * 1000:.0f}ms")
+    return html_result_json
+
+async def _generate_sectioned(
+    outline: PageOutline,
+    instruction: str,
+    requires_external_data: bool,
+    send_progress,
+    stage_timer: StageTimer,
+) -> str | None:
+    send_progress(f"Generating {len(outline.sections)} sections in parallel...")
+    send_progress({"status": "html_outline", "count": len(outline.sections)})
+    started = time.perf_counter()
+    section_results = await asyncio.gather(*(
+        _generate_section(index, section, instruction, requires_external_data, send_progress, stage_timer)
+        for index, section in enumerate(outline.sections)
+    ))
+    return _assembled_page_json(outline, list(section_results), started, send_progress, stage_timer)
+
+def _html_result_json(html_response: HTMLGenerationResult, send_progress, stage_timer: StageTimer) -> str:
+    """Validate the structured generation output and serialize the tool result."""
     if not html_response.success:
         send_progress("Error generating HTML")
         return json.dumps({
             "success": False,
             "error_message": html_response.error_message
         })
-    
+
     send_progress("Validating HTML...")
     try:
-        lxml_html.fromstring(html_response.html)
+        with stage_timer.stage("validation"):
+            lxml_html.fromstring(html_response.html)
     except Exception as exc:
         return json.dumps({
             "success": False,
@@ -121,3 +526,192 @@ def generate_html_from_request(
         "success": True,
         "html": html_response.html
     })
+
+def _record_retrieval(kb_chunks) -> None:
+    provider = type(get_retrieval_client()).__name__
+    RETRIEVAL_CHUNKS.observe(len(kb_chunks), provider=provider)
+    for chunk in kb_chunks:
+        RETRIEVAL_SCORE.observe(chunk.score, provider=provider)
+
+def _packed_kb_context(retrieval_client, kb_chunks, send_progress, stage_timer: StageTimer) -> str:
+    """Fit the retrieved chunks to the provider's context token budget"""
+    with stage_timer.stage("context_packing"):
+        pack = retrieval_client.pack_kb_context(kb_chunks)
+    KB_CONTEXT_TOKENS.observe(pack.tokens, kind="packed")
+    KB_CONTEXT_TOKENS.observe(pack.tokens_saved, kind="saved")
+    send_progress(
+        f"Using {len(pack.chunks)} of {len(kb_chunks)} documents "
+        f"(~{pack.tokens} tokens, ~{pack.tokens_saved} saved)"
+    )
+    return pack.context
+
+async def _generate_page(
+    instruction: str,
+    refine_previous: bool,
+    requires_external_data: bool,
+    html_cache,
+    kb_version: str | None,
+    send_progress,
+    stage_timer: StageTimer,
+    speculation: SpeculativeRetrieval | None = None,
+) -> str:
+    first_paint = _FirstPaint(send_progress)
+    send_progress = first_paint.send_progress
+
+    # ----------------------------
+    # Generate multi-topic pages section by section, concurrently
+    # ----------------------------
+    outline = _page_outline(instruction, refine_previous)
+    if outline:
+        if speculation:
+            # Each section retrieves for its own topic; don't hold the speculation for the fallback
+            speculation.discard()
+            speculation = None
+        assembled = await _generate_sectioned(outline, instruction, requires_external_data, send_progress, stage_timer)
+        if assembled:
+            first_paint.record("sections")
+            await asyncio.to_thread(_store_shared_page, instruction, requires_external_data, kb_version, assembled)
+            return assembled
+        send_progress("Generating the page in one pass instead...")
+
+    # ----------------------------
+    # Retrieve KB context if needed
+    # ----------------------------
+    kb_context = ""
+    if requires_external_data:
+        send_progress("Searching knowledge base...")
+        with stage_timer.stage("retrieval"):
+            retrieval_client = await asyncio.to_thread(get_retrieval_client)
+            if speculation:
+                kb_chunks = await speculation.resolve_async(instruction)
+            else:
+                kb_chunks = await asyncio.to_thread(retrieval_client.retrieve, query=instruction)
+        _record_retrieval(kb_chunks)
+        send_progress(f"Found {len(kb_chunks)} relevant documents")
+        kb_context = _packed_kb_context(retrieval_client, kb_chunks, send_progress, stage_timer)
+
+    # ----------------------------
+    # Refine by patching the previous HTML when possible
+    # ----------------------------
+    previous_html = await _previous_html(refine_previous, html_cache)
+    if previous_html and _html_patch_enabled():
+        patched = await _refine_with_patch(instruction, kb_context, previous_html, send_progress, stage_timer)
+        if patched:
+            first_paint.record("patch")
+            return patched
+        send_progress("Regenerating the full page...")
+
+    # ----------------------------
+    # Render fresh pages from a page spec when possible
+    # ----------------------------
+    html_mode = "html"
+    if _use_page_spec(refine_previous):
+        rendered = await _generate_from_spec(instruction, kb_context, send_progress, stage_timer)
+        if rendered:
+            first_paint.record("spec")
+            await asyncio.to_thread(_store_shared_page, instruction, requires_external_data, kb_version, rendered)
+            return rendered
+        send_progress("Generating free-form HTML instead...")
+        html_mode = "spec_fallback"
+
+    # ----------------------------
+    # Build prompt sections
+    # ----------------------------
+    with stage_timer.stage("prompt"):
+        html_prompt = _build_html_prompt(
+            instruction,
+            refine_previous,
+            kb_context,
+            previous_html,
+            send_progress,
+        )
+
+    # ----------------------------
+    # Call HTML generation agent
+    # ----------------------------
+    send_progress("Generating HTML with AI...")
+    started = time.perf_counter()
+    with _generation_agent(send_progress, stage_timer) as html_generation_agent:
+        with stage_timer.stage("generation"):
+            result = await html_generation_agent.invoke_async(
+                html_prompt,
+                structured_output_model=HTMLGenerationResult
+            )
+
+    html_response: HTMLGenerationResult = result.structured_output
+    html_result_json = _html_result_json(html_response, send_progress, stage_timer)
+    _record_generation("html", result, started)
+    first_paint.record(html_mode)
+    await asyncio.to_thread(_store_shared_page, instruction, requires_external_data, kb_version, html_result_json)
+    return html_result_json
+
+def generate_html_from_request(
+    instruction: str,
+    refine_previous: bool,
+    requires_external_data: bool,
+    html_cache=None,
+    progress_callback=None,
+    stage_timer: StageTimer | None = None,
+    speculation: SpeculativeRetrieval | None = None,
+) -> str:
+    """Blocking entry point to generate_html_from_request_async, for threads and scripts"""
+    return run_sync(generate_html_from_request_async(
+        instruction,
+        refine_previous,
+        requires_external_data,
+        html_cache=html_cache,
+        progress_callback=progress_callback,
+        stage_timer=stage_timer,
+        speculation=speculation,
+    ))
+
+async def generate_html_from_request_async(
+    instruction: str,
+    refine_previous: bool,
+    requires_external_data: bool,
+    html_cache=None,
+    progress_callback=None,
+    stage_timer: StageTimer | None = None,
+    speculation: SpeculativeRetrieval | None = None,
+) -> str:
+    """
+    Generate HTML based on user instruction, optional KB context,
+    and optional refinement of previous HTML.
+
+    Identical fresh-page requests that arrive while one is already being
+    generated join that execution and receive its progress and result.
+
+    Callbacks, cache and timer are passed explicitly because many requests
+    share one event loop thread. Blocking Redis and retrieval calls run in
+    the default executor so they do not stall other streams.
+    """
+    def send_progress(message: str | dict):
+        if progress_callback:
+            progress_callback(message)
+
+    stage_timer = stage_timer or StageTimer()
+
+    send_progress("Starting HTML generation...")
+    _log_generation_request(instruction, refine_previous, requires_external_data)
+
+    with stage_timer.stage("page_cache"):
+        kb_version, cached_result = await asyncio.to_thread(
+            _lookup_shared_page, instruction, refine_previous, requires_external_data, send_progress
+        )
+    if cached_result:
+        return cached_result
+
+    async def run_generation(progress) -> str:
+        return await _generate_page(
+            instruction, refine_previous, requires_external_data, html_cache, kb_version, progress, stage_timer,
+            speculation,
+        )
+
+    if kb_version is None or not single_flight_enabled():
+        return await run_generation(send_progress)
+
+    return await generation_flight.do_async(
+        page_cache.key_for(instruction, kb_version, requires_external_data),
+        run_generation,
+        send_progress,
+    )
@@ -1,18 +1,44 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import nest_asyncio
 nest_asyncio.apply()
 
-from flask import Flask, render_template, request, jsonify, Response, stream_with_context, session
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, session, g
 from datetime import datetime
 import json
-import queue
 import threading
 import os
 import secrets
 from markupsafe import Markup
 
-from agents.orchestrator.orchestrator_agent import PortfolioAgentResult, run_portfolio_request
+from agents.orchestrator.orchestrator_agent import (
+    RECENT_HISTORY_MESSAGES,
+    PortfolioAgentResult,
+    run_portfolio_request,
+)
+from utils.admission import AdmissionRejected, agent_admission
+from utils.chat_jobs import (
+    TERMINAL_STATUSES,
+    ChatJobEvents,
+    enqueue_chat_job,
+    follow_job_events,
+    job_notifier,
+    job_queue_enabled,
+    parse_last_event_id,
+)
 from utils.chat_message_store import ChatStore
 from utils.html_cache import HTMLCache
+from utils.metrics import (
+    HTTP_REQUESTS_TOTAL,
+    SSE_STREAM_SECONDS,
+    collect_metrics,
+    start_snapshot_publisher,
+    render_prometheus,
+)
+from utils.quick_start_pages import get_quick_start_page
+from utils.timing import StageTimer
+from utils.warmup import record_import_time, warm_up
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
@@ -23,9 +49,8 @@ def get_session_id():
         session['session_id'] = secrets.token_urlsafe(16)
     return session['session_id']
 
-def get_chat_store():
-    """Get ChatStore for current session"""
-    session_id = get_session_id()
+def create_chat_store(session_id: str) -> ChatStore:
+    """Get ChatStore for a session, seeding the welcome message"""
     store = ChatStore(session_id)
     
     if len(store) == 0:
@@ -36,11 +61,10 @@ def get_chat_store():
     
     return store
 
-def get_html_cache():
-    """Get HTMLCache for current session"""
+def create_html_cache(session_id: str) -> HTMLCache:
+    """Get HTMLCache for a session, seeding the welcome page"""
     from utils.html_cache import WELCOME_HTML
     
-    session_id = get_session_id()
     cache = HTMLCache(session_id)
     
     if len(cache) == 0:
@@ -48,6 +72,133 @@ def get_html_cache():
     
     return cache
 
+@app.before_request
+def start_stage_timer():
+    g.stage_timer = StageTimer()
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def add_server_timing(response: Response) -> Response:
+    """
+    Report stage durations on regular responses. Streaming responses send
+    their headers before any work runs, so they carry timings in the
+    `complete` event instead.
+    """
+    HTTP_REQUESTS_TOTAL.inc(
+        endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+        method=request.method,
+        status=response.status_code,
+    )
+    start_snapshot_publisher()
+
+    stage_timer = g.get('stage_timer')
+    if stage_timer is None or response.mimetype == 'text/event-stream':
+        return response
+
+    stage_timer.record('total', (time.perf_counter() - g.request_started) * 1000)
+    response.headers['Server-Timing'] = stage_timer.server_timing_header()
+    return response
+
+def timed_stage(name: str):
+    """Time a block against the current request's stage timer"""
+    return g.stage_timer.stage(name)
+
+def get_chat_store():
+    """Get ChatStore for current session"""
+    return create_chat_store(get_session_id())
+
+def get_html_cache():
+    """Get HTMLCache for current session"""
+    return create_html_cache(get_session_id())
+
+def progress_payload(message: str | dict) -> dict:
+    """
+    Progress callbacks receive either plain status text or a ready-made SSE
+    payload such as an `html_chunk` event.
+    """
+    if isinstance(message, dict):
+        return message
+    return {'status': 'progress', 'message': message}
+
+def format_sse(payload: dict, event_id: str | None = None) -> str:
+    """Serialize one SSE message, with its id when it can be resumed from"""
+    prefix = f"id: {event_id}\n" if event_id else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+def queue_position_payload(position: int) -> dict:
+    return {
+        'status': 'queued',
+        'position': position,
+        'message': f'Waiting for a free agent (position {position} in queue)...'
+    }
+
+def busy_response(message: str) -> Response:
+    """Fast rejection when the agent execution queue is full"""
+    response = Response(
+        format_sse({'status': 'error', 'message': message}),
+        status=503,
+        mimetype='text/event-stream',
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Retry-After'] = '5'
+    return response
+
+def turn_timings(portfolio_agent_response: PortfolioAgentResult, duration_ms: float | None) -> dict:
+    timings = dict(portfolio_agent_response.timings)
+    if duration_ms is not None:
+        timings['total'] = round(duration_ms, 1)
+    return timings
+
+def finish_chat_turn(
+    chat_store: ChatStore,
+    html_cache: HTMLCache,
+    user_action: str,
+    portfolio_agent_response: PortfolioAgentResult,
+    duration_ms: float | None = None,
+    history_cursor: int | None = None,
+) -> list[dict]:
+    """
+    Persist the agent reply and generated HTML, and return the closing SSE
+    payloads for the turn. Shared by the Flask and ASGI streaming endpoints.
+
+    `duration_ms` is stored with new pages so later cache hits can report the
+    latency they saved, and is reported as the `total` timing alongside the
+    per-stage durations recorded by the agent pipeline.
+
+    The complete event carries only the chat messages added after the
+    client's `history_cursor` version, plus the new version.
+    """
+    chat_message = portfolio_agent_response.chat_message
+    agent_html = portfolio_agent_response.html
+    success = portfolio_agent_response.success
+    error_message = portfolio_agent_response.error_message
+    
+    chat_store.add("agent", chat_message)
+    
+    if not success:
+        return [{'status': 'error', 'message': error_message}]
+    
+    payloads = []
+    if portfolio_agent_response.from_cache:
+        # The matched entry was already promoted; re-adding would duplicate it.
+        payloads.append({'status': 'cached', 'message': 'Served from cache'})
+    elif agent_html:
+        html_cache.add(user_action, agent_html, duration_ms)
+    
+    safe_html = Markup(agent_html) if agent_html else ""
+    
+    payloads.append({'status': 'finalizing', 'message': 'Finalizing...'})
+    payloads.append({
+        "status": "complete",
+        "success": success,
+        "chat_message": chat_message,
+        "html": str(safe_html),
+        "from_cache": portfolio_agent_response.from_cache,
+        "history_delta": chat_store.since(history_cursor),
+        "timings": turn_timings(portfolio_agent_response, duration_ms),
+    })
+    return payloads
+
 @app.route("/")
 def index():
     get_session_id()
@@ -57,124 +208,197 @@ def index():
         current_year=datetime.now().year
     )
 
-@app.route("/chat/stream", methods=["POST"])
-def handle_chat_stream():
-    """Streaming endpoint that sends progress updates"""
-    user_action = request.json.get("instruction", "")
+def new_job_id(requested: str | None) -> str:
+    """Use the client's request id when it is usable as a key, else make one"""
+    if requested and len(requested) <= 64 and requested.replace('-', '').replace('_', '').isalnum():
+        return requested
+    return secrets.token_urlsafe(12)
+
+def parse_history_version(value) -> int | None:
+    """The chat history version the client already has, if it sent a valid one"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def started_payload(job_events: ChatJobEvents) -> dict:
+    return {'status': 'started', 'message': 'Processing request...', 'job_id': job_events.job_id}
+
+def run_chat_job(
+    job_events: ChatJobEvents,
+    chat_store: ChatStore,
+    html_cache: HTMLCache,
+    user_action: str,
+    admission_ticket,
+    history_cursor: int | None = None,
+    retry: bool = False,
+):
+    """
+    Run one chat turn to completion, writing every SSE payload to the job's
+    event stream. Runs on its own thread so it finishes and persists its
+    result even if the browser disconnects.
+
+    Agent workers pass no `admission_ticket`: their process pool size is the
+    concurrency limit. `history_cursor` is the chat history version the
+    client already holds. A `retry` of a turn whose worker died does not
+    record the user message again, and tells the client to discard the
+    partial page it streamed.
+    """
+    turn_started = time.perf_counter()
     
-    chat_store = get_chat_store()
-    html_cache = get_html_cache()
+    def progress_callback(message: str | dict):
+        job_events.append(progress_payload(message))
     
-    progress_queue = queue.Queue()
+    try:
+        if retry:
+            job_events.append({'status': 'retrying', 'message': 'Retrying after an interruption...'})
+        else:
+            chat_store.add("user", user_action)
+        
+        job_events.append({'status': 'orchestrating', 'message': 'Analyzing request...'})
+        
+        if admission_ticket and not agent_admission.wait(admission_ticket):
+            job_events.append({'status': 'error', 'message': 'Request cancelled'})
+            return
+        try:
+            portfolio_agent_response = run_portfolio_request(
+                user_action,
+                html_cache=html_cache,
+                progress_callback=progress_callback,
+                chat_history=chat_store.recent_messages(RECENT_HISTORY_MESSAGES),
+            )
+        finally:
+            if admission_ticket:
+                agent_admission.release(admission_ticket)
+        
+        duration_ms = (time.perf_counter() - turn_started) * 1000
+        for payload in finish_chat_turn(
+            chat_store, html_cache, user_action, portfolio_agent_response, duration_ms, history_cursor
+        ):
+            job_events.append(payload)
     
-    def progress_callback(message: str):
-        progress_queue.put({"type": "progress", "message": message})
+    except Exception as e:
+        print(f"Error in chat job: {e}")
+        import traceback
+        traceback.print_exc()
+        job_events.append({'status': 'error', 'message': str(e)})
+    finally:
+        if admission_ticket:
+            agent_admission.finish(admission_ticket)
+        job_notifier.mark_done(job_events.key)
+
+def queue_chat_job(job_events: ChatJobEvents, user_action: str, history_cursor: int | None = None) -> bool:
+    """Hand the turn to the agent worker pool. False when the queue is full."""
+    position = enqueue_chat_job(job_events.session_id, job_events.job_id, user_action, history_cursor)
+    if position is None:
+        job_events.discard()
+        return False
     
+    job_events.append(queue_position_payload(position))
+    return True
+
+def job_event_response(job_events: ChatJobEvents, last_event_id: str | None) -> Response:
+    """SSE response that replays the job's events after `last_event_id` and follows it live"""
     @stream_with_context
     def generate():
+        stream_started = time.perf_counter()
+        # Stays "disconnected" if the client goes away mid-stream
+        outcome = 'disconnected'
         try:
-            yield f"data: {json.dumps({'status': 'started', 'message': 'Processing request...'})}\n\n"
-            
-            chat_store.add("user", user_action)
-            
-            yield f"data: {json.dumps({'status': 'orchestrating', 'message': 'Analyzing request...'})}\n\n"
-            
-            result_container = {}
-            error_container = {}
-            
-            def run_agent():
-                import asyncio
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                try:
-                    result = run_portfolio_request(
-                        user_action,
-                        html_cache=html_cache,
-                        progress_callback=progress_callback,
-                        chat_history=chat_store.format_messages(),
-                    )
-                    result_container['result'] = result
-                except Exception as e:
-                    import traceback
-                    traceback.print_exc()
-                    error_container['error'] = e
-                finally:
-                    progress_queue.put({"type": "done"})
-                    loop.close()
-            
-            agent_thread = threading.Thread(target=run_agent)
-            agent_thread.start()
-            
-            while True:
-                try:
-                    msg = progress_queue.get(timeout=0.1)
-                    if msg["type"] == "done":
-                        break
-                    elif msg["type"] == "progress":
-                        yield f"data: {json.dumps({'status': 'progress', 'message': msg['message']})}\n\n"
-                
-                except queue.Empty:
+            for event_id, payload in follow_job_events(job_events, last_event_id):
+                if payload is None:
                     yield ": heartbeat\n\n"
-            
-            agent_thread.join()
-            
-            if 'error' in error_container:
-                raise error_container['error']
-            
-            portfolio_agent_response: PortfolioAgentResult = result_container['result']
-            
-            chat_message = portfolio_agent_response.chat_message
-            agent_html = portfolio_agent_response.html
-            success = portfolio_agent_response.success
-            error_message = portfolio_agent_response.error_message
-            
-            chat_store.add("agent", chat_message)
-            
-            if not success:
-                yield f"data: {json.dumps({'status': 'error', 'message': error_message})}\n\n"
-                return
-            
-            yield f"data: {json.dumps({'status': 'finalizing', 'message': 'Finalizing...'})}\n\n"
-            
-            safe_html = Markup(agent_html) if agent_html else ""
-            if agent_html:
-                html_cache.add(user_action, agent_html)
-            
-            final_data = {
-                "status": "complete",
-                "success": success,
-                "chat_message": chat_message,
-                "html": str(safe_html),
-                "history": chat_store.format_messages()
-            }
-            yield f"data: {json.dumps(final_data)}\n\n"
-            
-        except Exception as e:
-            print(f"Error in stream: {e}")
-            import traceback
-            traceback.print_exc()
-            yield f"data: {json.dumps({'status': 'error', 'message': str(e)})}\n\n"
+                    continue
+                if payload['status'] in TERMINAL_STATUSES:
+                    outcome = payload['status']
+                yield format_sse(payload, event_id)
+        finally:
+            SSE_STREAM_SECONDS.observe(
+                time.perf_counter() - stream_started, server='flask', outcome=outcome
+            )
     
     response = Response(generate(), mimetype='text/event-stream')
     response.headers['Cache-Control'] = 'no-cache'
     response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['X-Chat-Job-Id'] = job_events.job_id
     return response
 
+@app.route("/chat/stream", methods=["POST"])
+def handle_chat_stream():
+    """
+    Start a chat turn and stream its progress. Re-sending the same
+    `request_id` follows the existing turn instead of starting another.
+    """
+    user_action = request.json.get("instruction", "")
+    job_events = ChatJobEvents(get_session_id(), new_job_id(request.json.get("request_id")))
+    history_cursor = parse_history_version(request.json.get("history_version"))
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    
+    if not job_events.claim():
+        return job_event_response(job_events, last_event_id)
+    
+    job_events.append(started_payload(job_events))
+    
+    if job_queue_enabled():
+        if not queue_chat_job(job_events, user_action, history_cursor):
+            return busy_response("The portfolio agent is busy right now. Please try again in a moment.")
+        return job_event_response(job_events, last_event_id)
+    
+    chat_store = get_chat_store()
+    html_cache = get_html_cache()
+    
+    def queue_position_callback(position: int):
+        job_events.append(queue_position_payload(position))
+    
+    try:
+        admission_ticket = agent_admission.reserve(on_queue_position=queue_position_callback)
+    except AdmissionRejected as e:
+        job_events.discard()
+        return busy_response(str(e))
+    
+    job_notifier.mark_running(job_events.key)
+    threading.Thread(
+        target=run_chat_job,
+        args=(job_events, chat_store, html_cache, user_action, admission_ticket, history_cursor),
+        daemon=True,
+    ).start()
+    
+    return job_event_response(job_events, last_event_id)
+
+@app.route("/chat/stream/<job_id>", methods=["GET"])
+def resume_chat_stream(job_id: str):
+    """Reconnect to a chat turn, resuming after the `Last-Event-ID` header"""
+    job_events = ChatJobEvents(get_session_id(), job_id)
+    if not job_events.exists():
+        return jsonify({"success": False, "error": "Unknown or expired chat request"}), 404
+    
+    last_event_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+    return job_event_response(job_events, last_event_id)
+
 @app.route("/chat/history", methods=["GET"])
 def get_chat_history():
-    chat_store = get_chat_store()
+    with timed_stage('chat_store'):
+        chat_store = get_chat_store()
+        version = chat_store.version()
+        entries = chat_store.format_messages()
     return jsonify({
         "success": True,
-        "entries": chat_store.format_messages()
+        "entries": entries,
+        "version": version
     })
 
 @app.route("/ui/history", methods=["GET"])
 def get_ui_history():
-    html_cache = get_html_cache()
+    with timed_stage('html_cache'):
+        html_cache = get_html_cache()
+        cached_entries = html_cache.all()
     entries = []
 
-    for idx, entry in enumerate(html_cache.all()):
+    for idx, entry in enumerate(cached_entries):
         entries.append({
             "id": idx,
             "query": entry.query,
@@ -188,13 +412,15 @@ def get_ui_history():
 
 @app.route("/ui/history/<int:entry_id>", methods=["GET"])
 def restore_ui_from_history(entry_id: int):
-    html_cache = get_html_cache()
-    entry = html_cache.get(entry_id)
+    with timed_stage('html_cache'):
+        html_cache = get_html_cache()
+        entry = html_cache.get(entry_id)
 
     if not entry:
         return jsonify({"success": False}), 404
 
-    html_cache.promote(entry)
+    with timed_stage('promote'):
+        html_cache.promote(entry)
 
     return jsonify({
         "success": True,
@@ -202,6 +428,52 @@ def restore_ui_from_history(entry_id: int):
         "query": entry.query,
     })
 
+@app.route("/quick-start/<name>", methods=["POST"])
+def quick_start_page(name: str):
+    """
+    A quick-start card's page, pre-rendered for the current knowledge base.
+    Recorded in the chat and UI history like a normal turn, hence POST. 404
+    until the page has been rendered; the client then sends the card's
+    prompt through /chat/stream instead.
+    """
+    with timed_stage('quick_start'):
+        page = get_quick_start_page(name)
+    if not page:
+        return jsonify({"success": False, "error": "Page not pre-rendered yet"}), 404
+
+    with timed_stage('chat_store'):
+        chat_store = get_chat_store()
+        html_cache = get_html_cache()
+        chat_store.add("user", page.prompt)
+        payloads = finish_chat_turn(
+            chat_store,
+            html_cache,
+            page.prompt,
+            PortfolioAgentResult(success=True, chat_message=page.chat_message, html=page.html),
+            history_cursor=parse_history_version((request.get_json(silent=True) or {}).get('history_version')),
+        )
+    return jsonify(payloads[-1])
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint, aggregated across workers"""
+    return Response(
+        render_prometheus(collect_metrics()),
+        mimetype='text/plain; version=0.0.4',
+    )
+
+@app.route("/healthz/warm", methods=["GET"])
+def healthz_warm():
+    """
+    Readiness probe that creates the lazily initialized services first, so a
+    new dyno can be warmed before it takes traffic. 503 until every service
+    is up.
+    """
+    status = warm_up()
+    return jsonify({"success": status["warm"], **status}), 200 if status["warm"] else 503
+
+record_import_time(time.perf_counter() - IMPORT_STARTED)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
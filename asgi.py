@@ -0,0 +1,271 @@
+"""
+Async-native serving mode.
+
+`/chat/stream` runs the orchestrator, retrieval and HTML generation as
+coroutines on the server's event loop and pushes progress to the SSE response
+as soon as it is emitted. Every other route is served by the Flask app mounted
+underneath, so both modes share templates, static files and the session cookie.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+"""
+import asyncio
+import secrets
+import time
+
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as portfolio_app
+from agents.orchestrator.orchestrator_agent import RECENT_HISTORY_MESSAGES, run_portfolio_request_async
+from utils.admission import AdmissionRejected, agent_admission
+from utils.chat_jobs import (
+    TERMINAL_STATUSES,
+    ChatJobEvents,
+    follow_job_events_async,
+    job_notifier,
+    job_queue_enabled,
+    parse_last_event_id,
+)
+from utils.metrics import HTTP_REQUESTS_TOTAL, SSE_STREAM_SECONDS, start_snapshot_publisher
+
+flask_app = portfolio_app.app
+
+
+def load_session_id(request: Request) -> tuple[str, str | None]:
+    """
+    Read the session id from Flask's signed session cookie.
+
+    Returns the session id and, when a new session had to be created, the
+    signed cookie value to send back to the browser.
+    """
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    data = {}
+
+    if cookie:
+        try:
+            data = serializer.loads(
+                cookie,
+                max_age=int(flask_app.permanent_session_lifetime.total_seconds()),
+            )
+        except BadSignature:
+            data = {}
+
+    if "session_id" in data:
+        return data["session_id"], None
+
+    data["session_id"] = secrets.token_urlsafe(16)
+    return data["session_id"], serializer.dumps(data)
+
+
+def open_session_stores(session_id: str):
+    return (
+        portfolio_app.create_chat_store(session_id),
+        portfolio_app.create_html_cache(session_id),
+    )
+
+
+_background_jobs: set[asyncio.Task] = set()
+
+
+async def run_chat_job(
+    job_events: ChatJobEvents,
+    chat_store,
+    html_cache,
+    user_action: str,
+    admission_ticket,
+    pending: asyncio.Queue,
+    history_cursor: int | None = None,
+) -> None:
+    """
+    Run one chat turn as a task that outlives the request, publishing its
+    SSE payloads through `pending`.
+    """
+    loop = asyncio.get_running_loop()
+    turn_started = time.perf_counter()
+
+    def publish(payload: dict | None):
+        # Callbacks arrive both from the loop and from worker threads
+        loop.call_soon_threadsafe(pending.put_nowait, payload)
+
+    def progress_callback(message: str | dict):
+        publish(portfolio_app.progress_payload(message))
+
+    try:
+        await asyncio.to_thread(chat_store.add, "user", user_action)
+
+        publish({'status': 'orchestrating', 'message': 'Analyzing request...'})
+
+        chat_history = await asyncio.to_thread(chat_store.recent_messages, RECENT_HISTORY_MESSAGES)
+        if not await agent_admission.wait_async(admission_ticket):
+            publish({'status': 'error', 'message': 'Request cancelled'})
+            return
+        try:
+            portfolio_agent_response = await run_portfolio_request_async(
+                user_action,
+                html_cache=html_cache,
+                progress_callback=progress_callback,
+                chat_history=chat_history,
+            )
+        finally:
+            agent_admission.release(admission_ticket)
+
+        closing_payloads = await asyncio.to_thread(
+            portfolio_app.finish_chat_turn,
+            chat_store,
+            html_cache,
+            user_action,
+            portfolio_agent_response,
+            (time.perf_counter() - turn_started) * 1000,
+            history_cursor,
+        )
+        for payload in closing_payloads:
+            publish(payload)
+
+    except Exception as e:
+        print(f"Error in chat job: {e}")
+        import traceback
+        traceback.print_exc()
+        publish({'status': 'error', 'message': str(e)})
+    finally:
+        agent_admission.finish(admission_ticket)
+        publish(None)
+
+
+async def write_job_events(job_events: ChatJobEvents, pending: asyncio.Queue) -> None:
+    """Append queued payloads to the job's Redis Stream in order, off the event loop."""
+    try:
+        while (payload := await pending.get()) is not None:
+            await asyncio.to_thread(job_events.append, payload)
+    finally:
+        job_notifier.mark_done(job_events.key)
+
+
+def start_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_jobs.add(task)
+    task.add_done_callback(_background_jobs.discard)
+
+
+def job_event_response(job_events: ChatJobEvents, last_event_id: str | None, session_cookie: str | None):
+    """SSE response that replays the job's events after `last_event_id` and follows it live"""
+    async def generate():
+        stream_started = time.perf_counter()
+        # Stays "disconnected" if the client goes away mid-stream
+        outcome = "disconnected"
+        try:
+            async for event_id, payload in follow_job_events_async(job_events, last_event_id):
+                if payload is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                if payload["status"] in TERMINAL_STATUSES:
+                    outcome = payload["status"]
+                yield portfolio_app.format_sse(payload, event_id)
+        finally:
+            SSE_STREAM_SECONDS.observe(
+                time.perf_counter() - stream_started, server="asgi", outcome=outcome
+            )
+
+    response = StreamingResponse(generate(), media_type="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.headers["X-Chat-Job-Id"] = job_events.job_id
+    if session_cookie:
+        response.set_cookie(
+            flask_app.config["SESSION_COOKIE_NAME"],
+            session_cookie,
+            httponly=True,
+            samesite=flask_app.config["SESSION_COOKIE_SAMESITE"],
+        )
+    return response
+
+
+def busy_sse_response(message: str) -> Response:
+    """Fast rejection when the agent execution queue is full"""
+    HTTP_REQUESTS_TOTAL.inc(endpoint="/chat/stream", method="POST", status=503)
+    return Response(
+        portfolio_app.format_sse({'status': 'error', 'message': message}),
+        status_code=503,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Retry-After": "5"},
+    )
+
+
+async def handle_chat_stream(request: Request) -> Response:
+    """
+    Start a chat turn and stream its progress. Re-sending the same
+    `request_id` follows the existing turn instead of starting another.
+    """
+    body = await request.json()
+    user_action = body.get("instruction", "")
+
+    session_id, session_cookie = load_session_id(request)
+    job_events = ChatJobEvents(session_id, portfolio_app.new_job_id(body.get("request_id")))
+    last_event_id = parse_last_event_id(request.headers.get("last-event-id"))
+    history_cursor = portfolio_app.parse_history_version(body.get("history_version"))
+
+    if not await asyncio.to_thread(job_events.claim):
+        HTTP_REQUESTS_TOTAL.inc(endpoint="/chat/stream", method="POST", status=200)
+        return job_event_response(job_events, last_event_id, session_cookie)
+
+    await asyncio.to_thread(job_events.append, portfolio_app.started_payload(job_events))
+
+    if job_queue_enabled():
+        if not await asyncio.to_thread(portfolio_app.queue_chat_job, job_events, user_action, history_cursor):
+            return busy_sse_response("The portfolio agent is busy right now. Please try again in a moment.")
+        HTTP_REQUESTS_TOTAL.inc(endpoint="/chat/stream", method="POST", status=200)
+        return job_event_response(job_events, last_event_id, session_cookie)
+
+    chat_store, html_cache = await asyncio.to_thread(open_session_stores, session_id)
+
+    pending: asyncio.Queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def queue_position_callback(position: int):
+        loop.call_soon_threadsafe(pending.put_nowait, portfolio_app.queue_position_payload(position))
+
+    try:
+        admission_ticket = agent_admission.reserve(on_queue_position=queue_position_callback)
+    except AdmissionRejected as e:
+        await asyncio.to_thread(job_events.discard)
+        return busy_sse_response(str(e))
+
+    job_notifier.mark_running(job_events.key)
+    start_background(write_job_events(job_events, pending))
+    start_background(run_chat_job(
+        job_events, chat_store, html_cache, user_action, admission_ticket, pending, history_cursor
+    ))
+
+    HTTP_REQUESTS_TOTAL.inc(endpoint="/chat/stream", method="POST", status=200)
+    start_snapshot_publisher()
+
+    return job_event_response(job_events, last_event_id, session_cookie)
+
+
+async def resume_chat_stream(request: Request) -> Response:
+    """Reconnect to a chat turn, resuming after the `Last-Event-ID` header"""
+    session_id, session_cookie = load_session_id(request)
+    job_events = ChatJobEvents(session_id, request.path_params["job_id"])
+    if not await asyncio.to_thread(job_events.exists):
+        HTTP_REQUESTS_TOTAL.inc(endpoint="/chat/stream/<job_id>", method="GET", status=404)
+        return JSONResponse({"success": False, "error": "Unknown or expired chat request"}, status_code=404)
+
+    last_event_id = parse_last_event_id(
+        request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    )
+    HTTP_REQUESTS_TOTAL.inc(endpoint="/chat/stream/<job_id>", method="GET", status=200)
+    return job_event_response(job_events, last_event_id, session_cookie)
+
+
+app = Starlette(
+    routes=[
+        Route("/chat/stream", handle_chat_stream, methods=["POST"]),
+        Route("/chat/stream/{job_id}", resume_chat_stream, methods=["GET"]),
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ]
+)
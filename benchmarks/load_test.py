@@ -0,0 +1,291 @@
+"""
+Offline load test for /chat/stream.
+
+Boots the real app in-process on a local port against the simulated LLM
+provider, the simulated retrieval client and an in-process Redis stand-in,
+then drives N concurrent SSE clients. Reports throughput, time-to-first-event,
+time-to-first-paint and time-to-complete percentiles, and memory per
+concurrent stream.
+
+    python benchmarks/load_test.py --clients 20 --llm-latency-ms 500
+    python benchmarks/load_test.py --server asgi --clients 50 --json results.json
+    python benchmarks/load_test.py --generation-mode spec   # compare with the default html mode
+
+Needs no network access or external services.
+"""
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+import resource
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test for /chat/stream.")
+    parser.add_argument("--server", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent SSE clients.")
+    parser.add_argument("--requests-per-client", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0, help="Simulated time to first token.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--html-chars", type=int, default=6000, help="Size of each simulated page.")
+    parser.add_argument("--retrieval-latency-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--generation-mode",
+        choices=("spec", "html"),
+        default="html",
+        help="Have the model write free-form HTML, or render pages from a page spec.",
+    )
+    parser.add_argument("--max-concurrency", type=int, help="Override AGENT_MAX_CONCURRENCY.")
+    parser.add_argument("--max-queue", type=int, help="Override AGENT_MAX_QUEUE.")
+    parser.add_argument(
+        "--same-prompt",
+        action="store_true",
+        help="Send one identical instruction from every client so caches and single-flight apply.",
+    )
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file.")
+    parser.add_argument("--max-p95-first-event-ms", type=float, help="Exit non-zero above this p95.")
+    parser.add_argument("--max-p95-complete-ms", type=float, help="Exit non-zero above this p95.")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point every backend at its offline stand-in before the app is imported."""
+    os.environ.update({
+        "AI_PROVIDER": "simulated",
+        "SIMULATED_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "SIMULATED_LLM_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+        "SIMULATED_LLM_HTML_CHARS": str(args.html_chars),
+        "HTML_GENERATION_MODE": args.generation_mode,
+        "RETRIEVAL_PROVIDER": "simulated",
+        "SIMULATED_RETRIEVAL_LATENCY_MS": str(args.retrieval_latency_ms),
+        "SECRET_KEY": "load-test",
+        "METRICS_SHARED": "false",
+    })
+    if args.max_concurrency is not None:
+        os.environ["AGENT_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    if args.max_queue is not None:
+        os.environ["AGENT_MAX_QUEUE"] = str(args.max_queue)
+
+    import clients.redis_client
+    from benchmarks.local_redis import LocalRedis
+
+    # Every store binds redis_client at import time, so swap it first.
+    clients.redis_client.redis_client = LocalRedis()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str) -> str:
+    """Serve the app from a background thread and return its base URL."""
+    port = free_port()
+
+    if kind == "flask":
+        from werkzeug.serving import make_server
+
+        import app as portfolio_app
+
+        server = make_server("127.0.0.1", port, portfolio_app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        import uvicorn
+
+        import asgi
+
+        server = uvicorn.Server(uvicorn.Config(asgi.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+
+    return f"http://127.0.0.1:{port}"
+
+
+def max_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+async def run_stream(client, base_url: str, instruction: str) -> dict:
+    started = time.perf_counter()
+    result = {
+        "first_event_ms": None,
+        "chat_ms": None,
+        "first_paint_ms": None,
+        "complete_ms": None,
+        "outcome": "incomplete",
+        "events": 0,
+    }
+
+    async with client.stream("POST", f"{base_url}/chat/stream", json={"instruction": instruction}) as response:
+        if response.status_code == 503:
+            result["outcome"] = "rejected"
+            return result
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if result["first_event_ms"] is None:
+                result["first_event_ms"] = elapsed_ms
+            result["events"] += 1
+
+            payload = json.loads(line[len("data:"):])
+            status = payload.get("status")
+            if status in ("chat", "complete") and result["chat_ms"] is None:
+                # When the reply text is first on screen, early or with the page
+                result["chat_ms"] = elapsed_ms
+            painted = status in ("html_chunk", "html_section") or (status == "complete" and payload.get("html"))
+            if painted and result["first_paint_ms"] is None:
+                # When any of the page is first on screen, streamed or whole
+                result["first_paint_ms"] = elapsed_ms
+            if status in ("complete", "error"):
+                # Keep reading until the server closes the stream
+                result["outcome"] = status
+                result["complete_ms"] = elapsed_ms
+
+    return result
+
+
+async def run_client(base_url: str, client_index: int, args: argparse.Namespace) -> list[dict]:
+    import httpx
+
+    results = []
+    # One client per simulated visitor so each keeps its own session cookie
+    async with httpx.AsyncClient(timeout=httpx.Timeout(300.0)) as client:
+        await client.get(f"{base_url}/")
+        for request_index in range(args.requests_per_client):
+            instruction = (
+                "Show projects"
+                if args.same_prompt
+                else f"Show project {client_index}-{request_index}"
+            )
+            results.append(await run_stream(client, base_url, instruction))
+    return results
+
+
+async def run_load(base_url: str, args: argparse.Namespace) -> tuple[list[dict], float]:
+    started = time.perf_counter()
+    per_client = await asyncio.gather(*(run_client(base_url, index, args) for index in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    return [result for results in per_client for result in results], elapsed
+
+
+def generation_output_tokens(mode: str) -> float | None:
+    """Mean model output tokens per generated page in this process"""
+    from utils.metrics import HTML_GENERATION_OUTPUT_TOKENS
+
+    snapshot = HTML_GENERATION_OUTPUT_TOKENS.snapshot()
+    count = sum(snapshot["counts"].get((mode,), []))
+    return round(snapshot["sums"][(mode,)] / count, 1) if count else None
+
+
+def summarize(results: list[dict], elapsed: float, rss_before_kb: int, rss_after_kb: int, args) -> dict:
+    first_event = [r["first_event_ms"] for r in results if r["first_event_ms"] is not None]
+    chat = [r["chat_ms"] for r in results if r["chat_ms"] is not None]
+    first_paint = [r["first_paint_ms"] for r in results if r["first_paint_ms"] is not None]
+    complete = [r["complete_ms"] for r in results if r["outcome"] == "complete"]
+    outcomes = {}
+    for result in results:
+        outcomes[result["outcome"]] = outcomes.get(result["outcome"], 0) + 1
+
+    return {
+        "server": args.server,
+        "generation_mode": args.generation_mode,
+        "clients": args.clients,
+        "requests": len(results),
+        "outcomes": outcomes,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(complete) / elapsed, 2) if elapsed else 0.0,
+        "first_event_ms": {f"p{p}": _round(percentile(first_event, p)) for p in (50, 95, 99)},
+        "chat_ms": {f"p{p}": _round(percentile(chat, p)) for p in (50, 95, 99)},
+        "first_paint_ms": {f"p{p}": _round(percentile(first_paint, p)) for p in (50, 95, 99)},
+        "complete_ms": {f"p{p}": _round(percentile(complete, p)) for p in (50, 95, 99)},
+        "output_tokens_per_page": generation_output_tokens(args.generation_mode),
+        "rss_peak_mb": round(rss_after_kb / 1024, 1),
+        # Peak growth over the warmed-up baseline, shared across concurrent streams
+        "memory_per_stream_kb": round(max(0, rss_after_kb - rss_before_kb) / max(1, args.clients), 1),
+        "simulated_llm": {
+            "latency_ms": args.llm_latency_ms,
+            "tokens_per_second": args.llm_tokens_per_second,
+            "html_chars": args.html_chars,
+        },
+    }
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 1) if value is not None else None
+
+
+def print_report(report: dict) -> None:
+    print(f"Server:            {report['server']}")
+    print(f"Generation mode:   {report['generation_mode']}")
+    print(f"Requests:          {report['requests']} from {report['clients']} clients in {report['elapsed_s']}s")
+    print(f"Outcomes:          {report['outcomes']}")
+    print(f"Throughput:        {report['throughput_rps']} completed streams/s")
+    for label, key in (
+        ("First event (ms):", "first_event_ms"),
+        ("Chat reply (ms):", "chat_ms"),
+        ("First paint (ms):", "first_paint_ms"),
+        ("Complete (ms):", "complete_ms"),
+    ):
+        stats = report[key]
+        print(f"{label:<19}p50={stats['p50']}  p95={stats['p95']}  p99={stats['p99']}")
+    print(f"Output tokens:     {report['output_tokens_per_page']} per generated page")
+    print(f"Peak RSS:          {report['rss_peak_mb']} MB")
+    print(f"Memory per stream: {report['memory_per_stream_kb']} KB")
+
+
+def check_thresholds(report: dict, args: argparse.Namespace) -> list[str]:
+    failures = []
+    for limit, key in (
+        (args.max_p95_first_event_ms, "first_event_ms"),
+        (args.max_p95_complete_ms, "complete_ms"),
+    ):
+        p95 = report[key]["p95"]
+        if limit is not None and (p95 is None or p95 > limit):
+            failures.append(f"{key} p95 {p95} exceeds {limit}")
+    return failures
+
+
+def main() -> None:
+    args = parse_args()
+    configure_environment(args)
+    base_url = start_server(args.server)
+
+    # Warm up imports, agents and caches outside the measured window
+    asyncio.run(run_client(base_url, -1, argparse.Namespace(requests_per_client=1, same_prompt=False)))
+
+    rss_before_kb = max_rss_kb()
+    results, elapsed = asyncio.run(run_load(base_url, args))
+    report = summarize(results, elapsed, rss_before_kb, max_rss_kb(), args)
+
+    print_report(report)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2))
+
+    failures = check_thresholds(report, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
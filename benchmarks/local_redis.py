@@ -0,0 +1,76 @@
+import threading
+import time
+
+from tests.fake_redis import FakeRedis
+
+
+class LocalRedis:
+    """
+    Thread-safe in-process Redis stand-in for load tests.
+
+    Wraps the in-memory test double with one lock so concurrent request
+    threads see atomic commands, like a single Redis server would give them.
+    Blocking commands (BLMOVE, XREAD with BLOCK) poll with the lock held
+    only for each attempt, so a waiting worker or follower never stalls the
+    other threads. Pub/sub reads are not serialized.
+    """
+
+    def __init__(self):
+        self._redis = FakeRedis()
+        self._lock = threading.RLock()
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return self._redis.pubsub(ignore_subscribe_messages=ignore_subscribe_messages)
+
+    def _poll(self, attempt, timeout: float):
+        """Retry `attempt` under the lock until it returns a result or `timeout` (0 = forever) passes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                result = attempt()
+            if result or (timeout and time.monotonic() >= deadline):
+                return result
+            time.sleep(0.01)
+
+    def blmove(self, source, destination, timeout, src="LEFT", dest="RIGHT"):
+        return self._poll(lambda: self._redis.lmove(source, destination, src, dest), timeout)
+
+    def xread(self, streams, count=None, block=None):
+        read = lambda: self._redis.xread(streams, count=count)
+        if block is None:
+            with self._lock:
+                return read()
+        return self._poll(read, block / 1000)
+
+    def pipeline(self):
+        return _LockedPipeline(self)
+
+    def __getattr__(self, name):
+        command = getattr(self._redis, name)
+        if not callable(command):
+            return command
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return command(*args, **kwargs)
+
+        return locked
+
+
+class _LockedPipeline:
+    def __init__(self, client: LocalRedis):
+        self.client = client
+        self.pipeline = client._redis.pipeline()
+
+    def __getattr__(self, name):
+        queue_command = getattr(self.pipeline, name)
+
+        def queued(*args, **kwargs):
+            queue_command(*args, **kwargs)
+            return self
+
+        return queued
+
+    def execute(self):
+        with self.client._lock:
+            return self.pipeline.execute()
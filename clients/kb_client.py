@@ -1,5 +1,5 @@
 import boto3
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 class KnowledgeBaseClient:
@@ -81,37 +81,40 @@ class KnowledgeBaseClient:
     @staticmethod
     def build_kb_context(
         chunks: List[Dict[str, Any]],
+        token_budget: Optional[int] = None,
     ) -> str:
         """
-        Concatenate KB chunks into a context block, ordered by relevance score.
-        No character limit - includes all chunks that passed the score threshold.
+        Pack KB chunks into a context block within a token budget, most
+        relevant and least redundant first. Overlapping and duplicate chunks
+        are trimmed or dropped.
         
         Args:
             chunks: List of dicts with 'text' and 'score' keys
+            token_budget: Maximum context tokens (default: the AI provider's budget)
         """
+        from clients.retrieval.base import RetrievedChunk
+        from clients.retrieval.context_packer import pack_context
+
         print(f"[KB] Building KB context | chunks={len(chunks)}")
 
         if not chunks:
             print("[KB] No chunks to build context from")
             return ""
 
-        sorted_chunks = sorted(chunks, key=lambda x: x.get("score", 0.0), reverse=True)
-
-        context_parts = []
-        total_chars = 0
-
-        for idx, chunk in enumerate(sorted_chunks):
-            text = chunk.get("text", "")
-            score = chunk.get("score", 0.0)
-            
-            context_parts.append(text)
-            total_chars += len(text)
+        pack = pack_context(
+            [
+                RetrievedChunk(text=chunk.get("text", ""), score=chunk.get("score", 0.0))
+                for chunk in chunks
+            ],
+            token_budget,
+        )
 
-            print(
-                f"[KB] Added chunk {idx + 1} | "
-                f"score={score:.3f} | chunk_chars={len(text)} | total_chars={total_chars}"
-            )
+        for idx, chunk in enumerate(pack.chunks):
+            print(f"[KB] Added chunk {idx + 1} | score={chunk.score:.3f} | chunk_chars={len(chunk.text)}")
 
-        print(f"[KB] Final KB context size: {total_chars} chars from {len(context_parts)} chunks")
+        print(
+            f"[KB] Final KB context size: ~{pack.tokens} tokens from {len(pack.chunks)} chunks "
+            f"| duplicates={pack.duplicates} | tokens_saved={pack.tokens_saved}"
+        )
 
-        return "\n\n---\n\n".join(context_parts)
+        return pack.context
@@ -1,9 +1,33 @@
 from abc import ABC, abstractmethod
+import os
+from typing import TYPE_CHECKING, Literal
 
-from strands.models import Model
+if TYPE_CHECKING:
+    from strands.models import Model
+
+# Marks the end of a cacheable prefix in strands system prompt content blocks
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+def prompt_cache_enabled() -> bool:
+    return os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
 
 
 class LLMProvider(ABC):
+    # "explicit": the backend caches up to cache points the request marks.
+    # "implicit": the backend caches long repeated prompt prefixes by itself.
+    prompt_caching: Literal["explicit", "implicit", "none"] = "none"
+
     @abstractmethod
-    def create_model(self) -> Model:
+    def create_model(self) -> "Model":
         raise NotImplementedError
+
+    def system_prompt(self, prompt: str) -> str | list[dict]:
+        """
+        `prompt` as an agent should send it to this provider. With explicit
+        caching a cache point follows it, so the static system prompt (and
+        the tool specs before it) are processed once and reused across calls.
+        """
+        if self.prompt_caching == "explicit" and prompt_cache_enabled():
+            return [{"text": prompt}, CACHE_POINT]
+        return prompt
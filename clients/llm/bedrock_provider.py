@@ -1,9 +1,16 @@
+from typing import TYPE_CHECKING
+
 from clients.llm.base import LLMProvider
-from strands.models import Model
+
+if TYPE_CHECKING:
+    from strands.models import Model
 
 
 class BedrockLLMProvider(LLMProvider):
-    def create_model(self) -> Model:
+    # Converse cache points; prefixes below the model's minimum are simply not cached
+    prompt_caching = "explicit"
+
+    def create_model(self) -> "Model":
         from utils.aws_config import create_bedrock_model
 
         return create_bedrock_model()
@@ -1,8 +1,34 @@
+from functools import cache
+from typing import TYPE_CHECKING
+
 from clients.llm.base import LLMProvider
-from strands.models import Model
+
+if TYPE_CHECKING:
+    from strands.models import Model
+
+
+@cache
+def _cache_usage_model_class():
+    from strands.models.gemini import GeminiModel
+
+    class CacheUsageGeminiModel(GeminiModel):
+        """Reports the prompt tokens Gemini served from its implicit cache"""
+
+        def _format_chunk(self, event):
+            chunk = super()._format_chunk(event)
+            if event["chunk_type"] == "metadata":
+                cached = getattr(event["data"], "cached_content_token_count", None)
+                if cached:
+                    chunk["metadata"]["usage"]["cacheReadInputTokens"] = cached
+            return chunk
+
+    return CacheUsageGeminiModel
 
 
 class GeminiLLMProvider(LLMProvider):
+    # Gemini 2.5+ caches repeated prompt prefixes implicitly
+    prompt_caching = "implicit"
+
     def __init__(
         self,
         api_key: str | None,
@@ -13,10 +39,8 @@ class GeminiLLMProvider(LLMProvider):
         self.model_id = model_id
         self.temperature = temperature
 
-    def create_model(self) -> Model:
-        from strands.models.gemini import GeminiModel
-
-        return GeminiModel(
+    def create_model(self) -> "Model":
+        return _cache_usage_model_class()(
             client_args={"api_key": self.api_key},
             model_id=self.model_id,
             params={"temperature": self.temperature},
@@ -1,5 +1,9 @@
+from typing import TYPE_CHECKING
+
 from clients.llm.base import LLMProvider
-from strands.models import Model
+
+if TYPE_CHECKING:
+    from strands.models import Model
 
 
 class LiteLLMProvider(LLMProvider):
@@ -11,7 +15,13 @@ class LiteLLMProvider(LLMProvider):
         self.model_id = model_id
         self.temperature = temperature
 
-    def create_model(self) -> Model:
+    @property
+    def prompt_caching(self) -> str:
+        # LiteLLM turns cache points into Anthropic cache_control; other backends cache implicitly
+        model = self.model_id.lower()
+        return "explicit" if "anthropic" in model or "claude" in model else "implicit"
+
+    def create_model(self) -> "Model":
         from strands.models.litellm import LiteLLMModel
 
         return LiteLLMModel(
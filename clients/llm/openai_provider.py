@@ -1,8 +1,35 @@
+from functools import cache
+from typing import TYPE_CHECKING
+
 from clients.llm.base import LLMProvider
-from strands.models import Model
+
+if TYPE_CHECKING:
+    from strands.models import Model
+
+
+@cache
+def _cache_usage_model_class():
+    from strands.models.openai import OpenAIModel
+
+    class CacheUsageOpenAIModel(OpenAIModel):
+        """Reports the prompt tokens OpenAI served from its prefix cache"""
+
+        def format_chunk(self, event, **kwargs):
+            chunk = super().format_chunk(event, **kwargs)
+            if event["chunk_type"] == "metadata":
+                details = getattr(event["data"], "prompt_tokens_details", None)
+                cached = getattr(details, "cached_tokens", None)
+                if cached:
+                    chunk["metadata"]["usage"]["cacheReadInputTokens"] = cached
+            return chunk
+
+    return CacheUsageOpenAIModel
 
 
 class OpenAILLMProvider(LLMProvider):
+    # Prompts of 1024+ tokens are cached automatically when the prefix repeats
+    prompt_caching = "implicit"
+
     def __init__(
         self,
         model_id: str = "gpt-4o-mini",
@@ -11,10 +38,8 @@ class OpenAILLMProvider(LLMProvider):
         self.model_id = model_id
         self.temperature = temperature
 
-    def create_model(self) -> Model:
-        from strands.models.openai import OpenAIModel
-
-        return OpenAIModel(
+    def create_model(self) -> "Model":
+        return _cache_usage_model_class()(
             model_id=self.model_id,
             params={"temperature": self.temperature},
         )
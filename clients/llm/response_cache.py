@@ -0,0 +1,292 @@
+"""
+Content-addressed cache of model responses.
+
+A model call is keyed by a hash of everything that determines its answer:
+the model config (model id and sampling params), the system prompt, the
+messages, the tool specs (which carry the structured-output schema) and the
+tool choice. A completed stream is stored as its list of events and replayed
+on an identical call, so the same quick-start decision or regenerated page
+costs one model call rather than one per request.
+
+Sampled calls (temperature above 0, or a provider default that samples) are
+not cached unless LLM_RESPONSE_CACHE_SAMPLED=true, since a cache would freeze
+one of many possible answers.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, AsyncIterable, Optional
+
+from strands.models import Model
+
+from clients.redis_client import redis_client
+from utils.metrics import LLM_RESPONSE_CACHE_SECONDS, record_cache_lookup
+
+
+def response_cache_enabled() -> bool:
+    return os.getenv("LLM_RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+
+
+def cache_sampled_responses() -> bool:
+    return os.getenv("LLM_RESPONSE_CACHE_SAMPLED", "false").lower() == "true"
+
+
+def sampling_temperature(config: dict) -> Optional[float]:
+    """The temperature a model config sets, or None when it uses the provider default"""
+    params = config.get("params") or {}
+    temperature = params.get("temperature", config.get("temperature"))
+    return float(temperature) if temperature is not None else None
+
+
+def response_key(
+    config: dict,
+    messages: list,
+    tool_specs: Optional[list],
+    system_prompt: Optional[str],
+    tool_choice: Any = None,
+    system_prompt_content: Optional[list] = None,
+) -> str:
+    request = {
+        "config": config,
+        "system_prompt": system_prompt,
+        "system_prompt_content": system_prompt_content,
+        "messages": messages,
+        "tool_specs": tool_specs,
+        "tool_choice": tool_choice,
+    }
+    encoded = json.dumps(request, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class RedisResponseCache:
+    """
+    Responses shared by every worker. A sorted set of last-access times
+    bounds the number of entries; the least recently used are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl: int = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = "llm_response_cache"
+        self.index_key = f"{self.prefix}:index"
+
+    def get(self, key: str) -> Optional[list[dict]]:
+        cache_key = f"{self.prefix}:{key}"
+        events_json = redis_client.get(cache_key)
+        if not events_json:
+            return None
+        pipe = redis_client.pipeline()
+        pipe.zadd(self.index_key, {cache_key: time.time()})
+        pipe.expire(cache_key, self.ttl)
+        pipe.execute()
+        return json.loads(events_json)
+
+    def set(self, key: str, events: list[dict]) -> None:
+        cache_key = f"{self.prefix}:{key}"
+        pipe = redis_client.pipeline()
+        pipe.set(cache_key, json.dumps(events), ex=self.ttl)
+        pipe.zadd(self.index_key, {cache_key: time.time()})
+        pipe.execute()
+        self._evict()
+
+    def _evict(self) -> None:
+        overflow = redis_client.zcard(self.index_key) - self.max_entries
+        if overflow <= 0:
+            return
+        keys = [key for key, _ in redis_client.zpopmin(self.index_key, overflow)]
+        if keys:
+            redis_client.delete(*keys)
+
+    def clear(self) -> None:
+        keys = redis_client.zrange(self.index_key, 0, -1)
+        if keys:
+            redis_client.delete(*keys)
+        redis_client.delete(self.index_key)
+
+
+class DiskResponseCache:
+    """
+    Responses in a local directory, one JSON file per key, for development
+    and replayed test traffic without Redis. File modification times record
+    last access; entries past the TTL are dropped and the least recently
+    used are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 2000, ttl: int = 86400):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[list[dict]]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - entry["created"] > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        return entry["events"]
+
+    def set(self, key: str, events: list[dict]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Write then rename, so a concurrent reader never sees a partial file
+        temporary = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps({"created": time.time(), "events": events}), encoding="utf-8")
+        os.replace(temporary, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    entries.append((path.stat().st_mtime, path))
+                except FileNotFoundError:
+                    continue
+            entries.sort()
+            now = time.time()
+            overflow = len(entries) - self.max_entries
+            for index, (accessed, path) in enumerate(entries):
+                if index < overflow or now - accessed > self.ttl:
+                    path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+def create_response_cache() -> RedisResponseCache | DiskResponseCache:
+    backend = os.getenv("LLM_RESPONSE_CACHE_BACKEND", "redis").lower()
+    max_entries = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    ttl = int(os.getenv("LLM_RESPONSE_CACHE_TTL", "86400"))
+
+    if backend == "redis":
+        return RedisResponseCache(max_entries=max_entries, ttl=ttl)
+    if backend == "disk":
+        return DiskResponseCache(
+            os.getenv("LLM_RESPONSE_CACHE_DIR", ".cache/llm_responses"),
+            max_entries=max_entries,
+            ttl=ttl,
+        )
+    raise ValueError(f"Unsupported LLM_RESPONSE_CACHE_BACKEND: {backend}")
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> RedisResponseCache | DiskResponseCache:
+    """Singleton instance (shared everywhere), created on first use"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = create_response_cache()
+    return _response_cache
+
+
+def _replayed(events: list[dict], elapsed_ms: int) -> list[dict]:
+    """Cached events with usage zeroed, since a replay spends no tokens"""
+    replayed = []
+    for event in events:
+        if "metadata" in event:
+            event = {
+                "metadata": {
+                    **event["metadata"],
+                    "usage": {"inputTokens": 0, "outputTokens": 0, "totalTokens": 0},
+                    "metrics": {"latencyMs": elapsed_ms},
+                }
+            }
+        replayed.append(event)
+    return replayed
+
+
+class ResponseCachingModel(Model):
+    """Delegates to `model`, replaying cached responses for identical calls"""
+
+    def __init__(self, model: Model, cache=None):
+        self.model = model
+        self._cache = cache
+
+    def __getattr__(self, name: str):
+        # strands reads `model.config`; provider-specific attributes pass through too
+        return getattr(self.model, name)
+
+    @property
+    def cache(self):
+        return self._cache or get_response_cache()
+
+    def update_config(self, **model_config: Any) -> None:
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        return self.model.get_config()
+
+    def _cacheable(self) -> bool:
+        if not response_cache_enabled():
+            return False
+        temperature = sampling_temperature(self.model.get_config() or {})
+        return temperature == 0 or cache_sampled_responses()
+
+    async def stream(
+        self,
+        messages: list,
+        tool_specs: Optional[list] = None,
+        system_prompt: Optional[str] = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[dict]:
+        if not self._cacheable():
+            async for event in self.model.stream(messages, tool_specs, system_prompt, **kwargs):
+                yield event
+            return
+
+        started = time.perf_counter()
+        key = response_key(
+            self.model.get_config(),
+            messages,
+            tool_specs,
+            system_prompt,
+            kwargs.get("tool_choice"),
+            kwargs.get("system_prompt_content"),
+        )
+        try:
+            cached = await asyncio.to_thread(self.cache.get, key)
+        except Exception as e:
+            print(f"LLM response cache lookup failed: {e}")
+            cached = None
+        record_cache_lookup("llm_response", hit=cached is not None)
+
+        if cached is not None:
+            elapsed = time.perf_counter() - started
+            for event in _replayed(cached, int(elapsed * 1000)):
+                yield event
+            LLM_RESPONSE_CACHE_SECONDS.observe(time.perf_counter() - started, result="hit")
+            return
+
+        events = []
+        async for event in self.model.stream(messages, tool_specs, system_prompt, **kwargs):
+            events.append(event)
+            yield event
+        LLM_RESPONSE_CACHE_SECONDS.observe(time.perf_counter() - started, result="miss")
+
+        # Only complete responses are stored; a stream that raised never gets here
+        if any("messageStop" in event for event in events):
+            try:
+                await asyncio.to_thread(self.cache.set, key, events)
+            except Exception as e:
+                print(f"Could not cache LLM response: {e}")
+
+    def structured_output(self, *args: Any, **kwargs: Any):
+        # Yields parsed pydantic objects, which are not cached
+        return self.model.structured_output(*args, **kwargs)
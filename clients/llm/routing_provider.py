@@ -0,0 +1,303 @@
+"""
+Latency-aware routing across several LLM providers.
+
+Each call goes to the healthiest, fastest provider by rolling time-to-first-
+event. If nothing has streamed back after the hedge delay, the same request
+is sent to the next provider too; whichever starts answering first is used
+and the other is cancelled. A provider that fails before streaming anything
+is failed over to the next one.
+
+Stats are kept per process, over a sliding time window, so a demoted
+provider is retried once its errors age out.
+"""
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import statistics
+import threading
+import time
+from typing import Any, AsyncIterable, Iterable, Optional
+
+from strands.models import Model
+
+from clients.llm.base import LLMProvider
+from utils.model_usage import UsageReportingModel
+from utils.metrics import (
+    LLM_HEDGES_TOTAL,
+    LLM_PROVIDER_CALLS_TOTAL,
+    LLM_PROVIDER_FIRST_EVENT_SECONDS,
+    LLM_ROUTING_DECISIONS_TOTAL,
+)
+
+@dataclass
+class _Sample:
+    at: float
+    ok: bool
+    first_event_seconds: Optional[float] = None
+
+
+class ProviderStats:
+    """Rolling latency and error rate of one provider"""
+
+    def __init__(self, window_seconds: float, max_samples: int = 200):
+        self.window_seconds = window_seconds
+        self._samples: deque[_Sample] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def _recent(self) -> list[_Sample]:
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            while self._samples and self._samples[0].at < cutoff:
+                self._samples.popleft()
+            return list(self._samples)
+
+    def record(self, ok: bool, first_event_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._samples.append(_Sample(time.monotonic(), ok, first_event_seconds))
+
+    def error_rate(self) -> float:
+        samples = self._recent()
+        return sum(not sample.ok for sample in samples) / len(samples) if samples else 0.0
+
+    def calls(self) -> int:
+        return len(self._recent())
+
+    def median_first_event(self) -> Optional[float]:
+        latencies = [sample.first_event_seconds for sample in self._recent() if sample.first_event_seconds is not None]
+        return statistics.median(latencies) if latencies else None
+
+
+class ProviderRouter:
+    def __init__(
+        self,
+        names: list[str],
+        window_seconds: float = 300.0,
+        max_error_rate: float = 0.5,
+        min_calls: int = 5,
+    ):
+        self.names = names
+        self.max_error_rate = max_error_rate
+        self.min_calls = min_calls
+        self.stats = {name: ProviderStats(window_seconds) for name in names}
+
+    def healthy(self, name: str) -> bool:
+        stats = self.stats[name]
+        return stats.calls() < self.min_calls or stats.error_rate() < self.max_error_rate
+
+    def order(self) -> list[str]:
+        """
+        Providers to try, best first: healthy before degraded, then by median
+        time to first event. Providers without samples yet keep their
+        configured position ahead of measured ones, so each gets tried.
+        """
+        def key(item: tuple[int, str]):
+            position, name = item
+            latency = self.stats[name].median_first_event()
+            return (not self.healthy(name), latency is not None, latency or 0.0, position)
+
+        return [name for _, name in sorted(enumerate(self.names), key=key)]
+
+    def record_success(self, name: str, first_event_seconds: float) -> None:
+        self.stats[name].record(True, first_event_seconds)
+        LLM_PROVIDER_CALLS_TOTAL.inc(provider=name, result="ok")
+        LLM_PROVIDER_FIRST_EVENT_SECONDS.observe(first_event_seconds, provider=name)
+
+    def record_error(self, name: str) -> None:
+        self.stats[name].record(False)
+        LLM_PROVIDER_CALLS_TOTAL.inc(provider=name, result="error")
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                "healthy": self.healthy(name),
+                "calls": self.stats[name].calls(),
+                "error_rate": round(self.stats[name].error_rate(), 3),
+                "median_first_event_ms": (
+                    round(self.stats[name].median_first_event() * 1000, 1)
+                    if self.stats[name].median_first_event() is not None else None
+                ),
+            }
+            for name in self.order()
+        }
+
+
+class _Attempt:
+    def __init__(self, name: str, model: Model, args: tuple, kwargs: dict):
+        self.name = name
+        self.started = time.perf_counter()
+        self.events = model.stream(*args, **kwargs).__aiter__()
+        self.first = asyncio.ensure_future(self.events.__anext__())
+
+    async def cancel(self) -> None:
+        self.first.cancel()
+        await asyncio.gather(self.first, return_exceptions=True)
+        try:
+            await self.events.aclose()
+        except Exception:
+            pass
+
+
+async def _cancel_attempts(attempts: list[_Attempt]) -> None:
+    for attempt in attempts:
+        await attempt.cancel()
+        LLM_PROVIDER_CALLS_TOTAL.inc(provider=attempt.name, result="cancelled")
+
+
+def _shared_params(configs: Iterable[dict]) -> dict:
+    """Params set to the same value in every config; a top-level temperature counts as a param"""
+    shared: Optional[dict] = None
+    for config in configs:
+        params = dict(config.get("params") or {})
+        if "temperature" in config:
+            params.setdefault("temperature", config["temperature"])
+        shared = params if shared is None else {
+            key: value for key, value in shared.items() if key in params and params[key] == value
+        }
+    return shared or {}
+
+
+class RoutingModel(Model):
+    """
+    strands Model that streams from whichever routed provider answers first.
+    Each provider's model reports its own usage, labelled with its name.
+    """
+
+    reports_usage = True
+
+    def __init__(
+        self,
+        router: ProviderRouter,
+        models: dict[str, Model],
+        hedge_delay_seconds: Optional[float],
+    ):
+        self.router = router
+        self.models = models
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.config = {"model_id": "routing:" + ",".join(models)}
+        # Cancelled attempts are closed in the background so the winner is not held up
+        self._cleanup: set[asyncio.Task] = set()
+
+    def update_config(self, **model_config: Any) -> None:
+        for model in self.models.values():
+            model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        """
+        The routing model id plus the params every routed model shares, so
+        wrappers that read the config (the response cache checks the
+        temperature) see the settings the call will actually use
+        """
+        return {**self.config, "params": _shared_params(model.get_config() or {} for model in self.models.values())}
+
+    def _cancel_later(self, attempts: list[_Attempt]) -> None:
+        if not attempts:
+            return
+        task = asyncio.ensure_future(_cancel_attempts(attempts))
+        self._cleanup.add(task)
+        task.add_done_callback(self._cleanup.discard)
+
+    async def _first_answer(self, args: tuple, kwargs: dict) -> tuple[_Attempt, dict, Optional[tuple[str, str]]]:
+        """
+        Start the best provider, hedge or fail over as needed, and return the
+        winning attempt with its first event and the (primary, hedge) pair
+        when the call was hedged.
+        """
+        remaining = self.router.order()
+        primary = remaining.pop(0)
+        LLM_ROUTING_DECISIONS_TOTAL.inc(provider=primary)
+        running = [_Attempt(primary, self.models[primary], args, kwargs)]
+        hedge: Optional[tuple[str, str]] = None
+        last_error: Optional[BaseException] = None
+
+        while running:
+            can_hedge = self.hedge_delay_seconds is not None and remaining and hedge is None
+            done, _ = await asyncio.wait(
+                [attempt.first for attempt in running],
+                timeout=self.hedge_delay_seconds if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                name = remaining.pop(0)
+                hedge = (running[0].name, name)
+                running.append(_Attempt(name, self.models[name], args, kwargs))
+                continue
+
+            for attempt in [attempt for attempt in running if attempt.first in done]:
+                running.remove(attempt)
+                error = attempt.first.exception()
+                if error is None:
+                    self.router.record_success(attempt.name, time.perf_counter() - attempt.started)
+                    self._cancel_later(running)
+                    return attempt, attempt.first.result(), hedge
+
+                print(f"[LLM routing] {attempt.name} failed before answering: {error!r}")
+                self.router.record_error(attempt.name)
+                last_error = error
+
+            if not running and remaining:
+                name = remaining.pop(0)
+                print(f"[LLM routing] failing over to {name}")
+                running.append(_Attempt(name, self.models[name], args, kwargs))
+
+        if isinstance(last_error, StopAsyncIteration):
+            raise RuntimeError("every routed provider returned an empty stream")
+        raise last_error
+
+    async def stream(self, *args: Any, **kwargs: Any) -> AsyncIterable[dict]:
+        attempt, first_event, hedge = await self._first_answer(args, kwargs)
+        if hedge is not None:
+            LLM_HEDGES_TOTAL.inc(
+                primary=hedge[0],
+                hedge=hedge[1],
+                winner="primary" if attempt.name == hedge[0] else "hedge",
+            )
+
+        yield first_event
+        try:
+            async for event in attempt.events:
+                yield event
+        except Exception:
+            # Already streaming; too late to switch providers for this call
+            self.router.record_error(attempt.name)
+            raise
+
+    async def structured_output(self, *args: Any, **kwargs: Any) -> AsyncIterable[dict]:
+        # Not streamed token by token, so only failover applies
+        last_error: Optional[Exception] = None
+        for name in self.router.order():
+            try:
+                async for event in self.models[name].structured_output(*args, **kwargs):
+                    yield event
+                return
+            except Exception as error:
+                self.router.record_error(name)
+                last_error = error
+        raise last_error
+
+
+class RoutingLLMProvider(LLMProvider):
+    def __init__(
+        self,
+        providers: dict[str, LLMProvider],
+        hedge_delay_ms: Optional[float] = 2000.0,
+        window_seconds: float = 300.0,
+        max_error_rate: float = 0.5,
+    ):
+        if not providers:
+            raise ValueError("RoutingLLMProvider needs at least one provider")
+        self.providers = providers
+        self.hedge_delay_ms = hedge_delay_ms
+        self.router = ProviderRouter(list(providers), window_seconds, max_error_rate)
+
+    @property
+    def prompt_caching(self) -> str:
+        # Providers that do not use cache points ignore them
+        modes = {provider.prompt_caching for provider in self.providers.values()}
+        return "explicit" if "explicit" in modes else "implicit" if "implicit" in modes else "none"
+
+    def create_model(self) -> Model:
+        return RoutingModel(
+            self.router,
+            {name: UsageReportingModel(provider.create_model(), name) for name, provider in self.providers.items()},
+            self.hedge_delay_ms / 1000 if self.hedge_delay_ms is not None else None,
+        )
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import uuid
+from typing import Any, AsyncIterable, Callable, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+from strands.models import Model
+
+from clients.llm.base import LLMProvider
+
+T = TypeVar("T", bound=BaseModel)
+
+# Builds the tool input for a structured-output tool from the conversation
+Responder = Callable[[list], dict]
+
+
+def _last_user_text(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        for block in message.get("content", []):
+            if "text" in block:
+                return block["text"]
+    return ""
+
+
+def default_responders(html_chars: int = 6000) -> dict[str, Responder]:
+    """
+    Canned answers for the portfolio agents' structured outputs: the
+    orchestrator always asks for a fresh knowledge-base page, the HTML
+    generator returns a valid page of roughly `html_chars` characters, and the
+    page spec agent returns the same cards as a spec.
+    """
+    def decision(messages: list) -> dict:
+        request = _last_user_text(messages).rsplit("Current user chat request:", 1)[-1].strip()
+        return {
+            "success": True,
+            "chat_message": f"Here is a page about {request or 'the portfolio'}.",
+            "needs_ui_change": True,
+            "instruction": f"Create a page about {request or 'the portfolio'}",
+            "refine_previous": False,
+            "requires_external_data": True,
+            "error_message": None,
+        }
+
+    def html_page(messages: list) -> dict:
+        card = '<article class="card"><h3>Simulated project</h3><p>Lorem ipsum dolor sit amet.</p></article>\n'
+        cards = card * max(1, html_chars // len(card))
+        return {
+            "success": True,
+            "html": f'<section class="page">\n<h2>Simulated page</h2>\n{cards}</section>',
+            "error_message": None,
+        }
+
+    def page_spec(messages: list) -> dict:
+        # The same cards as html_page, as content only
+        card = '<article class="card"><h3>Simulated project</h3><p>Lorem ipsum dolor sit amet.</p></article>\n'
+        items = [
+            {"title": "Simulated project", "description": "Lorem ipsum dolor sit amet."}
+        ] * max(1, html_chars // len(card))
+        return {
+            "success": True,
+            "page": {
+                "title": "Simulated page",
+                "sections": [{"component": "cards", "heading": "Projects", "items": items}],
+            },
+            "error_message": None,
+        }
+
+    return {
+        "OrchestrationDecision": decision,
+        "HTMLGenerationResult": html_page,
+        "PageSpecResult": page_spec,
+    }
+
+
+class SimulatedModel(Model):
+    """
+    Offline strands model for load tests.
+
+    Answers every call with a tool use for the requested structured output,
+    after `latency_ms` of time-to-first-token, streaming the JSON input at
+    `tokens_per_second` (about four characters per token). Unknown tools get
+    a short text reply.
+    """
+
+    # System prompt prefixes cached "server-side", shared by every simulated model
+    _cached_prefixes: set[str] = set()
+
+    def __init__(
+        self,
+        latency_ms: float = 500.0,
+        tokens_per_second: float = 80.0,
+        responders: dict[str, Responder] | None = None,
+        chars_per_token: int = 4,
+    ):
+        self.config = {
+            "model_id": "simulated",
+            "latency_ms": latency_ms,
+            "tokens_per_second": tokens_per_second,
+            "chars_per_token": chars_per_token,
+        }
+        self.responders = responders or default_responders()
+
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> dict:
+        return self.config
+
+    async def _pace(self, text: str) -> AsyncIterable[str]:
+        step = self.config["chars_per_token"]
+        delay = 1.0 / self.config["tokens_per_second"] if self.config["tokens_per_second"] else 0.0
+        for start in range(0, len(text), step):
+            if delay:
+                await asyncio.sleep(delay)
+            yield text[start:start + step]
+
+    def _cache_usage(self, system_prompt_content: Optional[list]) -> dict:
+        """cacheWrite on the first call with a cache point, cacheRead after"""
+        prefix = []
+        for block in system_prompt_content or []:
+            if "cachePoint" in block:
+                key = "".join(prefix)
+                tokens = len(key) // self.config["chars_per_token"]
+                if key in self._cached_prefixes:
+                    return {"cacheReadInputTokens": tokens}
+                self._cached_prefixes.add(key)
+                return {"cacheWriteInputTokens": tokens}
+            prefix.append(block.get("text", ""))
+        return {}
+
+    async def stream(
+        self,
+        messages: list,
+        tool_specs: Optional[list] = None,
+        system_prompt: Optional[str] = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[dict]:
+        await asyncio.sleep(self.config["latency_ms"] / 1000)
+        cache_usage = self._cache_usage(kwargs.get("system_prompt_content"))
+
+        tool_name = next(
+            (spec["name"] for spec in tool_specs or [] if spec["name"] in self.responders),
+            None,
+        )
+        input_tokens = sum(len(json.dumps(message)) for message in messages) // self.config["chars_per_token"]
+
+        yield {"messageStart": {"role": "assistant"}}
+        if tool_name:
+            payload = json.dumps(self.responders[tool_name](messages))
+            yield {
+                "contentBlockStart": {
+                    "start": {"toolUse": {"toolUseId": f"tooluse_{uuid.uuid4().hex[:12]}", "name": tool_name}}
+                }
+            }
+            async for chunk in self._pace(payload):
+                yield {"contentBlockDelta": {"delta": {"toolUse": {"input": chunk}}}}
+            stop_reason = "tool_use"
+        else:
+            payload = "Simulated response."
+            yield {"contentBlockStart": {"start": {}}}
+            async for chunk in self._pace(payload):
+                yield {"contentBlockDelta": {"delta": {"text": chunk}}}
+            stop_reason = "end_turn"
+
+        yield {"contentBlockStop": {}}
+        yield {"messageStop": {"stopReason": stop_reason}}
+        output_tokens = len(payload) // self.config["chars_per_token"]
+        yield {
+            "metadata": {
+                "usage": {
+                    "inputTokens": input_tokens,
+                    "outputTokens": output_tokens,
+                    "totalTokens": input_tokens + output_tokens,
+                    **cache_usage,
+                },
+                "metrics": {"latencyMs": int(self.config["latency_ms"])},
+            }
+        }
+
+    async def structured_output(
+        self, output_model: Type[T], prompt: list, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> AsyncIterable[dict[str, Any]]:
+        await asyncio.sleep(self.config["latency_ms"] / 1000)
+        responder = self.responders.get(output_model.__name__)
+        yield {"output": output_model(**responder(prompt))}
+
+
+class SimulatedLLMProvider(LLMProvider):
+    prompt_caching = "explicit"
+
+    def __init__(
+        self,
+        latency_ms: float = 500.0,
+        tokens_per_second: float = 80.0,
+        html_chars: int = 6000,
+    ):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.html_chars = html_chars
+
+    def create_model(self) -> Model:
+        return SimulatedModel(
+            latency_ms=self.latency_ms,
+            tokens_per_second=self.tokens_per_second,
+            responders=default_responders(self.html_chars),
+        )
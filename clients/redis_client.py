@@ -1,12 +1,18 @@
 import os
-import redis
+import threading
+from typing import TYPE_CHECKING
 
-def get_redis_client() -> redis.Redis:
+if TYPE_CHECKING:
+    import redis
+
+def get_redis_client() -> "redis.Redis":
     """
     Connect to Redis Cloud (or local Redis for development)
     """
+    import redis
+
     redis_url = os.getenv('REDIS_URL')
-    
+
     if redis_url:
         return redis.from_url(
             redis_url,
@@ -21,4 +27,49 @@ def get_redis_client() -> redis.Redis:
             decode_responses=True
         )
 
-redis_client = get_redis_client()
\ No newline at end of file
+def get_async_redis_client() -> "redis.asyncio.Redis":
+    """
+    asyncio client for the ASGI app's blocking reads, which would otherwise
+    hold a worker thread each while they wait
+    """
+    import redis.asyncio
+
+    redis_url = os.getenv('REDIS_URL')
+
+    if redis_url:
+        return redis.asyncio.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_keepalive=True
+        )
+    else:
+        return redis.asyncio.Redis(
+            host='localhost',
+            port=6379,
+            decode_responses=True
+        )
+
+class LazyRedisClient:
+    """
+    Stands in for the shared Redis client and creates it on first use, so
+    importing the stores neither loads redis-py nor builds a connection pool.
+    """
+
+    def __init__(self, factory=get_redis_client):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get_client(self) -> "redis.Redis":
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name: str):
+        return getattr(self.get_client(), name)
+
+redis_client = LazyRedisClient()
+async_redis_client = LazyRedisClient(get_async_redis_client)
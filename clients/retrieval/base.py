@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from clients.retrieval.context_packer import ContextPack
 
 
 @dataclass
@@ -21,6 +24,12 @@ class RetrievalClient(ABC):
         raise NotImplementedError
 
     @staticmethod
-    def build_kb_context(chunks: list[RetrievedChunk]) -> str:
-        sorted_chunks = sorted(chunks, key=lambda item: item.score, reverse=True)
-        return "\n\n---\n\n".join(chunk.text for chunk in sorted_chunks if chunk.text)
+    def pack_kb_context(chunks: list[RetrievedChunk], token_budget: int | None = None) -> "ContextPack":
+        """Deduplicated, diverse chunks within the provider's token budget"""
+        from clients.retrieval.context_packer import pack_context
+
+        return pack_context(chunks, token_budget)
+
+    @staticmethod
+    def build_kb_context(chunks: list[RetrievedChunk], token_budget: int | None = None) -> str:
+        return RetrievalClient.pack_kb_context(chunks, token_budget).context
@@ -0,0 +1,183 @@
+"""
+Token-budgeted packing of retrieved chunks into the generation prompt.
+
+Chunks are deduplicated first: exact repeats and chunks contained in a
+higher-scored one are dropped, and text shared with an already packed chunk
+(the local splitter's `chunk_overlap`) is trimmed. The remainder is picked by
+maximal marginal relevance, trading score against word overlap with the
+chunks already packed, until the token budget is used up.
+
+Token counts are estimated from characters; the budget bounds prompt size,
+it is not exact accounting for any one tokenizer.
+"""
+from dataclasses import dataclass, field
+import math
+import os
+import re
+
+from clients.retrieval.base import RetrievedChunk
+from utils.ai_config import routing_provider_names
+
+SEPARATOR = "\n\n---\n\n"
+CHARS_PER_TOKEN = 4
+
+# Shared text shorter than this is not treated as splitter overlap
+MIN_OVERLAP_CHARS = 40
+
+# Word-set similarity above which a chunk adds nothing new
+NEAR_DUPLICATE_SIMILARITY = 0.9
+
+DEFAULT_TOKEN_BUDGET = 3000
+
+
+@dataclass
+class ContextPack:
+    context: str
+    chunks: list[RetrievedChunk] = field(default_factory=list)
+    tokens: int = 0
+    # Tokens the unpacked context (every chunk, as before) would have used
+    candidate_tokens: int = 0
+    duplicates: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.candidate_tokens - self.tokens, 0)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def context_token_budget(provider: str | None = None) -> int:
+    """
+    KB context budget for the model provider. KB_CONTEXT_TOKEN_BUDGET_<PROVIDER>
+    (e.g. KB_CONTEXT_TOKEN_BUDGET_GEMINI) overrides KB_CONTEXT_TOKEN_BUDGET.
+    With routing, the prompt has to fit whichever provider answers, so the
+    smallest budget among the routed providers applies.
+    """
+    provider = (provider or os.getenv("AI_PROVIDER", "bedrock")).lower()
+    if provider == "routing":
+        return min(
+            (context_token_budget(name) for name in routing_provider_names()),
+            default=_configured_budget(provider),
+        )
+    return _configured_budget(provider)
+
+
+def _configured_budget(provider: str) -> int:
+    budget = os.getenv(f"KB_CONTEXT_TOKEN_BUDGET_{provider.upper()}") or os.getenv("KB_CONTEXT_TOKEN_BUDGET")
+    return int(budget) if budget else DEFAULT_TOKEN_BUDGET
+
+
+def _words(text: str) -> frozenset[str]:
+    return frozenset(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _similarity(first: frozenset[str], second: frozenset[str]) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def _overlap(before: str, after: str) -> int:
+    """Length of the longest end of `before` that starts `after`"""
+    for size in range(min(len(before), len(after)) - 1, MIN_OVERLAP_CHARS - 1, -1):
+        if before.endswith(after[:size]):
+            return size
+    return 0
+
+
+def _trim_overlap(text: str, kept: list[str]) -> str:
+    for other in kept:
+        size = _overlap(other, text)
+        if size:
+            text = text[size:]
+        size = _overlap(text, other)
+        if size:
+            text = text[:-size]
+    return text.strip()
+
+
+def _deduplicate(chunks: list[RetrievedChunk]) -> tuple[list[RetrievedChunk], int]:
+    kept: list[RetrievedChunk] = []
+    duplicates = 0
+    for chunk in chunks:
+        text = chunk.text.strip()
+        if any(text in other.text for other in kept):
+            duplicates += 1
+            continue
+        trimmed = _trim_overlap(text, [other.text for other in kept])
+        if not trimmed:
+            duplicates += 1
+            continue
+        kept.append(RetrievedChunk(text=trimmed, score=chunk.score, metadata=chunk.metadata))
+    return kept, duplicates
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut to about `tokens`, at a paragraph or line break when there is one"""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    for separator in ("\n\n", "\n"):
+        cut = text.rfind(separator, 0, limit)
+        if cut > limit // 2:
+            return text[:cut].rstrip()
+    return text[:limit].rstrip()
+
+
+def pack_context(
+    chunks: list[RetrievedChunk],
+    token_budget: int | None = None,
+    mmr_lambda: float = 0.7,
+) -> ContextPack:
+    """
+    Select chunks for the prompt, most relevant and least redundant first,
+    within `token_budget` tokens (context_token_budget() by default).
+    """
+    token_budget = token_budget if token_budget is not None else context_token_budget()
+    ranked = sorted((chunk for chunk in chunks if chunk.text), key=lambda item: item.score, reverse=True)
+    candidate_tokens = estimate_tokens(SEPARATOR.join(chunk.text for chunk in ranked))
+
+    candidates, duplicates = _deduplicate(ranked)
+    words = [_words(chunk.text) for chunk in candidates]
+    top_score = max((chunk.score for chunk in candidates), default=0.0) or 1.0
+
+    selected: list[int] = []
+    texts: list[str] = []
+    remaining = set(range(len(candidates)))
+    used = 0
+    while remaining:
+        def marginal_relevance(index: int) -> float:
+            redundancy = max((_similarity(words[index], words[other]) for other in selected), default=0.0)
+            return mmr_lambda * candidates[index].score / top_score - (1 - mmr_lambda) * redundancy
+
+        index = max(remaining, key=lambda index: (marginal_relevance(index), -index))
+        remaining.discard(index)
+        if any(_similarity(words[index], words[other]) >= NEAR_DUPLICATE_SIMILARITY for other in selected):
+            duplicates += 1
+            continue
+
+        text = candidates[index].text
+        cost = estimate_tokens(text) + (estimate_tokens(SEPARATOR) if texts else 0)
+        if used + cost > token_budget:
+            if texts:
+                continue
+            # The best chunk alone is over budget; keep its beginning
+            text = _truncate(text, token_budget)
+            cost = estimate_tokens(text)
+            if not text:
+                break
+
+        selected.append(index)
+        texts.append(text)
+        used += cost
+
+    context = SEPARATOR.join(texts)
+    return ContextPack(
+        context=context,
+        chunks=[candidates[index] for index in selected],
+        tokens=estimate_tokens(context),
+        candidate_tokens=candidate_tokens,
+        duplicates=duplicates,
+    )
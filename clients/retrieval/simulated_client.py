@@ -0,0 +1,35 @@
+import time
+
+from clients.retrieval.base import RetrievedChunk, RetrievalClient
+
+
+class SimulatedRetrievalClient(RetrievalClient):
+    """
+    Offline retriever for load tests. Sleeps for `latency_ms`, then returns
+    `chunk_count` synthetic chunks with descending scores.
+    """
+
+    def __init__(self, latency_ms: float = 50.0, chunk_count: int = 6, chunk_chars: int = 1200):
+        self.latency_ms = latency_ms
+        self.chunk_count = chunk_count
+        self.chunk_chars = chunk_chars
+
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 10,
+        min_score: float = 0.35,
+    ) -> list[RetrievedChunk]:
+        time.sleep(self.latency_ms / 1000)
+
+        sentence = f"Simulated portfolio notes relevant to {query}. "
+        text = (sentence * (self.chunk_chars // len(sentence) + 1))[:self.chunk_chars]
+        chunks = [
+            RetrievedChunk(
+                text=f"[{index}] {text}",
+                score=round(0.95 - index * 0.05, 2),
+                metadata={"source": f"simulated/{index}.md", "chunk_index": index},
+            )
+            for index in range(min(self.chunk_count, top_k))
+        ]
+        return [chunk for chunk in chunks if chunk.score >= min_score]
@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for the web process.
+
+The app is imported once in the master (preload_app) so every worker forks
+with the modules already loaded. Services are created lazily, so nothing
+with a connection is shared across the fork; each worker warms its own
+before accepting connections.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+if worker_class == "gevent" and preload_app:
+    # The worker would patch after fork; the preloaded app must see the patched modules
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def post_worker_init(worker):
+    if os.getenv("WARM_ON_START", "true").lower() != "true":
+        return
+
+    from utils.warmup import warm_up
+
+    status = warm_up()
+    if not status["warm"]:
+        worker.log.warning("Worker started before all services warmed: %s", status["errors"])
@@ -7,6 +7,8 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from clients.retrieval.local_keyword_client import LocalKeywordRetrievalClient
 from clients.retrieval.upstash_vector_client import UpstashVectorRetrievalClient
+from utils.kb_version import bump_kb_version
+from utils.quick_start_pages import prerender_pages
 from utils.retrieval_config import create_retrieval_client
 
 
@@ -38,6 +40,11 @@ def main() -> None:
         action="store_true",
         help="Clear the target Upstash namespace before upserting chunks.",
     )
+    parser.add_argument(
+        "--skip-prerender",
+        action="store_true",
+        help="Do not regenerate the quick-start pages for the new knowledge base version.",
+    )
     args = parser.parse_args()
 
     chunks = build_chunks(args.data_dir)
@@ -58,6 +65,11 @@ def main() -> None:
 
     result = client.upsert_texts(chunks)
     print(result)
+    print(f"Knowledge base version is now {bump_kb_version()}")
+
+    if not args.skip_prerender:
+        print("Pre-rendering quick-start pages...")
+        prerender_pages()
 
 
 if __name__ == "__main__":
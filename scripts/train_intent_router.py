@@ -0,0 +1,59 @@
+import argparse
+import json
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from agents.orchestrator.intent_router import (
+    IntentRouter,
+    NaiveBayesIntentClassifier,
+    evaluate_router,
+    labelled_examples,
+    logged_decisions,
+    save_classifier,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Train the intent router's classifier from logged orchestrator decisions."
+    )
+    parser.add_argument(
+        "--holdout-every",
+        type=int,
+        default=5,
+        help="Hold out every Nth logged decision to measure accuracy.",
+    )
+    parser.add_argument("--min-examples", type=int, default=50)
+    parser.add_argument("--dry-run", action="store_true", help="Report without saving the model.")
+    args = parser.parse_args()
+
+    examples = labelled_examples(logged_decisions())
+    print(f"Loaded {len(examples)} logged decisions")
+    if len(examples) < args.min_examples:
+        print(f"Need at least {args.min_examples} decisions to train; keeping the current model")
+        return
+
+    train = [example for index, example in enumerate(examples) if index % args.holdout_every]
+    holdout = [example for index, example in enumerate(examples) if not index % args.holdout_every]
+
+    labels = {}
+    for _, label in examples:
+        labels[label] = labels.get(label, 0) + 1
+    print(f"Labels: {labels}")
+
+    rules_only = evaluate_router(IntentRouter(classifier=NaiveBayesIntentClassifier()), holdout)
+    candidate = evaluate_router(IntentRouter(classifier=NaiveBayesIntentClassifier.train(train)), holdout)
+    print(f"Held-out replay, rules only:       {json.dumps(rules_only)}")
+    print(f"Held-out replay, with classifier:  {json.dumps(candidate)}")
+
+    if args.dry_run:
+        return
+
+    save_classifier(NaiveBayesIntentClassifier.train(examples))
+    print("Saved classifier trained on all logged decisions")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,9 @@ document.addEventListener("DOMContentLoaded", () => {
    * ----------------------------- */
   let chatMode = "chat";
   let isGenerating = false;
+  // Local copy of the chat history; turns only send messages after historyVersion
+  let chatHistory = [];
+  let historyVersion = null;
 
   /* -----------------------------
    * Markdown Config
@@ -55,6 +58,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
     chatMessages.appendChild(wrapper);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return wrapper;
   }
 
   function addHistoryBubble(entry) {
@@ -102,13 +106,116 @@ document.addEventListener("DOMContentLoaded", () => {
     chatMessages.appendChild(progressEl);
     chatMessages.scrollTop = chatMessages.scrollHeight;
 
-    try {
-      const response = await fetch("/chat/stream", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ instruction: message, request_id: requestId })
+    // Partial HTML streamed while the model is still generating
+    const previousHtml = leftMain.innerHTML;
+    let streamedHtml = "";
+    let streamingHtml = false;
+    let renderScheduled = false;
+    // Sections of a multi-topic page, by outline position, as they finish
+    let sections = [];
+    // Chat reply shown before the page finished, if any
+    let earlyReplyEl = null;
+
+    function renderStreamedHtml() {
+      if (renderScheduled) return;
+      renderScheduled = true;
+      requestAnimationFrame(() => {
+        renderScheduled = false;
+        if (streamingHtml) {
+          leftMain.innerHTML = streamedHtml;
+        }
       });
+    }
+
+    // Id of the last SSE event handled, used to resume after a dropped connection
+    let lastEventId = null;
+    let finished = false;
+
+    function handleEvent(data) {
+      if (data.status === 'started' || data.status === 'orchestrating' || 
+          data.status === 'progress' || data.status === 'queued' ||
+          data.status === 'cached' ||
+          data.status === 'finalizing') {
+        progressEl.innerHTML = `<span class="progress-text">${data.message}</span>`;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+      }
+      
+      if (data.status === 'chat') {
+        // Reply shown while the page is generated; keep the progress bubble below it
+        earlyReplyEl = addChatMessage(data.message, "agent");
+        chatMessages.insertBefore(earlyReplyEl, progressEl);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+      }
 
+      if (data.status === 'retrying') {
+        // The turn restarts on another worker; drop what the lost run streamed
+        streamingHtml = false;
+        streamedHtml = "";
+        sections = [];
+        leftMain.innerHTML = previousHtml;
+        if (earlyReplyEl) {
+          earlyReplyEl.remove();
+          earlyReplyEl = null;
+        }
+        progressEl.innerHTML = `<span class="progress-text">${data.message}</span>`;
+      }
+
+      if (data.status === 'html_chunk') {
+        streamingHtml = true;
+        streamedHtml += data.html;
+        renderStreamedHtml();
+      }
+
+      if (data.status === 'html_outline') {
+        sections = new Array(data.count).fill("");
+      }
+
+      if (data.status === 'html_section') {
+        sections[data.index] = data.html;
+        streamingHtml = true;
+        streamedHtml = `<div class="spec-page">${sections.filter(Boolean).join("")}</div>`;
+        renderStreamedHtml();
+      }
+      
+      if (data.status === 'complete') {
+        streamingHtml = false;
+        progressEl.remove();
+        
+        if (data.timings) {
+          console.debug('Stage timings (ms)', data.timings);
+        }
+        
+        if (data.history_delta) {
+          mergeHistoryDelta(data.history_delta);
+          renderChatHistory(chatHistory);
+        }
+        
+        if (data.html) {
+          leftMain.innerHTML = data.html;
+        }
+      }
+      
+      // Handle error
+      if (data.status === 'error') {
+        if (streamedHtml) {
+          streamingHtml = false;
+          leftMain.innerHTML = previousHtml;
+        }
+        // The early reply described a page that was never produced
+        if (earlyReplyEl) {
+          earlyReplyEl.remove();
+          earlyReplyEl = null;
+        }
+        progressEl.remove();
+        addChatMessage(`Error: ${data.message}`, "agent");
+      }
+
+      if (data.status === 'complete' || data.status === 'error') {
+        finished = true;
+      }
+    }
+
+    async function readEvents(response) {
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       let buffer = '';
@@ -118,44 +225,62 @@ document.addEventListener("DOMContentLoaded", () => {
         if (done) break;
 
         buffer += decoder.decode(value, { stream: true });
-        const lines = buffer.split('\n\n');
-        buffer = lines.pop() || '';
-
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            try {
-              const data = JSON.parse(line.slice(6));
-              
-              if (data.status === 'started' || data.status === 'orchestrating' || 
-                  data.status === 'progress' || data.status === 'finalizing') {
-                progressEl.innerHTML = `<span class="progress-text">${data.message}</span>`;
-                chatMessages.scrollTop = chatMessages.scrollHeight;
-              }
-              
-              if (data.status === 'complete') {
-                progressEl.remove();
-                
-                if (data.history) {
-                  renderChatHistory(data.history);
-                }
-                
-                if (data.html) {
-                  leftMain.innerHTML = data.html;
-                }
-              }
-              
-              // Handle error
-              if (data.status === 'error') {
-                progressEl.remove();
-                addChatMessage(`Error: ${data.message}`, "agent");
-              }
-            } catch (parseError) {
-              console.error('Failed to parse SSE data:', parseError);
-            }
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop() || '';
+
+        for (const block of blocks) {
+          let eventId = null;
+          let payload = null;
+          for (const line of block.split('\n')) {
+            if (line.startsWith('id: ')) eventId = line.slice(4);
+            if (line.startsWith('data: ')) payload = line.slice(6);
           }
+          if (payload === null) continue;
+
+          try {
+            handleEvent(JSON.parse(payload));
+          } catch (parseError) {
+            console.error('Failed to parse SSE data:', parseError);
+          }
+          if (eventId) lastEventId = eventId;
+        }
+      }
+    }
+
+    try {
+      const response = await fetch("/chat/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          instruction: message,
+          request_id: requestId,
+          history_version: historyVersion
+        })
+      });
+
+      try {
+        await readEvents(response);
+      } catch (streamError) {
+        console.warn('Stream interrupted, reconnecting...', streamError);
+      }
+
+      // The turn keeps running on the server; pick up where the stream dropped
+      for (let attempt = 1; !finished && attempt <= 5; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+        try {
+          const headers = lastEventId ? { "Last-Event-ID": lastEventId } : {};
+          const resumed = await fetch(`/chat/stream/${encodeURIComponent(requestId)}`, { headers });
+          if (!resumed.ok) break;
+          await readEvents(resumed);
+        } catch (streamError) {
+          console.warn('Reconnect attempt failed', streamError);
         }
       }
 
+      if (!finished) {
+        throw new Error('Stream ended before the response completed');
+      }
+
       chatInput.disabled = false;
       submitBtn.disabled = false;
       isGenerating = false;
@@ -224,6 +349,9 @@ document.addEventListener("DOMContentLoaded", () => {
           return;
         }
 
+        chatHistory = data.entries || [];
+        historyVersion = data.version ?? null;
+
         if (!data.entries || data.entries.length === 0) {
           addChatMessage("Ask me about projects, experience, or skills—I'll generate what you want to see.", "agent");
           return;
@@ -233,6 +361,16 @@ document.addEventListener("DOMContentLoaded", () => {
       });
   }
 
+  function mergeHistoryDelta(delta) {
+    if (delta.reset) {
+      chatHistory = delta.messages;
+    } else {
+      const lastSeq = chatHistory.length ? chatHistory[chatHistory.length - 1].seq || 0 : 0;
+      chatHistory = chatHistory.concat(delta.messages.filter(msg => msg.seq > lastSeq));
+    }
+    historyVersion = delta.version;
+  }
+
   function renderChatHistory(history) {
     chatMessages.innerHTML = "";
     history.forEach(msg => {
@@ -284,6 +422,48 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  /* -----------------------------
+   * Quick-start cards
+   * ----------------------------- */
+
+  async function openQuickStart(card) {
+    if (isGenerating) return;
+
+    try {
+      const res = await fetch(`/quick-start/${encodeURIComponent(card.dataset.quickStart)}`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ history_version: historyVersion })
+      });
+      if (res.ok) {
+        const data = await res.json();
+        leftMain.innerHTML = data.html;
+        if (data.history_delta) {
+          mergeHistoryDelta(data.history_delta);
+        }
+        if (chatMode === "chat") {
+          renderChatHistory(chatHistory);
+        } else {
+          setMode("chat");
+        }
+        return;
+      }
+    } catch (err) {
+      console.warn('Quick-start page unavailable, generating live', err);
+    }
+
+    // Not pre-rendered yet: send the card's prompt through the live chat path
+    if (chatMode !== "chat") setMode("chat");
+    chatInput.value = card.dataset.prompt;
+    chatForm.requestSubmit();
+  }
+
+  // Cards are part of the welcome HTML, which is re-rendered into leftMain
+  leftMain.addEventListener("click", (e) => {
+    const card = e.target.closest("[data-quick-start]");
+    if (card) openQuickStart(card);
+  });
+
   /* -----------------------------
    * Init
    * ----------------------------- */
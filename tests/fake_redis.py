@@ -0,0 +1,307 @@
+import asyncio
+import fnmatch
+import queue
+import time
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue_command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue_command
+
+    def execute(self):
+        results = [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, *channels):
+        self.channels.update(channels)
+        self.client.subscribers.append(self)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self in self.client.subscribers:
+            self.client.subscribers.remove(self)
+
+
+class FakeRedis:
+    """In-memory subset of the redis-py API used by the stores under test."""
+
+    def __init__(self):
+        self.data = {}
+        self.subscribers = []
+        self.published = []
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        receivers = [subscriber for subscriber in self.subscribers if channel in subscriber.channels]
+        for subscriber in receivers:
+            subscriber.messages.put({"type": "message", "channel": channel, "data": message})
+        return len(receivers)
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if key in self.data)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # strings
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def incr(self, key, amount=1):
+        self.data[key] = str(int(self.data.get(key, 0)) + amount)
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self.data.pop(key, None) is not None:
+                removed += 1
+        return removed
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def keys(self, pattern="*"):
+        return [key for key in self.data if fnmatch.fnmatch(key, pattern)]
+
+    # hashes
+    def hincrby(self, key, field, amount=1):
+        bucket = self.data.setdefault(key, {})
+        bucket[field] = str(int(bucket.get(field, 0)) + amount)
+        return int(bucket[field])
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        bucket = self.data.setdefault(key, {})
+        bucket[field] = str(float(bucket.get(field, 0)) + amount)
+        return float(bucket[field])
+
+    def hset(self, key, field, value):
+        bucket = self.data.setdefault(key, {})
+        created = field not in bucket
+        bucket[field] = str(value)
+        return int(created)
+
+    def hdel(self, key, *fields):
+        bucket = self.data.get(key, {})
+        return sum(1 for field in fields if bucket.pop(field, None) is not None)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    # lists
+    def lpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+
+    def ltrim(self, key, start, end):
+        items = self.data.get(key, [])
+        self.data[key] = items[start:] if end == -1 else items[start:end + 1]
+        return True
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def lindex(self, key, index):
+        items = self.data.get(key, [])
+        return items[index] if -len(items) <= index < len(items) else None
+
+    def lrem(self, key, count, value):
+        items = self.data.get(key, [])
+        removed = 0
+        while value in items and (count == 0 or removed < abs(count)):
+            items.remove(value)
+            removed += 1
+        return removed
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def rpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def lmove(self, source, destination, src="LEFT", dest="RIGHT"):
+        items = self.data.get(source)
+        if not items:
+            return None
+        value = items.pop(0 if src == "LEFT" else -1)
+        target = self.data.setdefault(destination, [])
+        if dest == "LEFT":
+            target.insert(0, value)
+        else:
+            target.append(value)
+        return value
+
+    def blmove(self, source, destination, timeout, src="LEFT", dest="RIGHT"):
+        deadline = time.monotonic() + timeout
+        while True:
+            value = self.lmove(source, destination, src, dest)
+            if value is not None:
+                return value
+            if timeout and time.monotonic() >= deadline:
+                return None
+            time.sleep(0.01)
+
+    def brpop(self, key, timeout=0):
+        deadline = time.monotonic() + timeout
+        while True:
+            items = self.data.get(key)
+            if items:
+                return key, items.pop()
+            if timeout and time.monotonic() >= deadline:
+                return None
+            time.sleep(0.01)
+
+    # sets
+    def sadd(self, key, *members):
+        bucket = self.data.setdefault(key, set())
+        added = len(set(members) - bucket)
+        bucket.update(members)
+        return added
+
+    def srem(self, key, *members):
+        bucket = self.data.get(key, set())
+        removed = len(bucket & set(members))
+        bucket.difference_update(members)
+        return removed
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    # sorted sets
+    def zadd(self, key, mapping):
+        members = self.data.setdefault(key, {})
+        added = len([member for member in mapping if member not in members])
+        members.update({member: float(score) for member, score in mapping.items()})
+        return added
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zrange(self, key, start, end):
+        members = sorted(self.data.get(key, {}).items(), key=lambda item: item[1])
+        names = [member for member, _ in members]
+        return names[start:] if end == -1 else names[start:end + 1]
+
+    def zpopmin(self, key, count=1):
+        members = sorted(self.data.get(key, {}).items(), key=lambda item: item[1])[:count]
+        for member, _ in members:
+            del self.data[key][member]
+        return members
+
+    # streams
+    def xadd(self, key, fields, id="*", maxlen=None, approximate=True, minid=None):
+        entries = self.data.setdefault(key, [])
+        millis = int(time.time() * 1000)
+        if entries:
+            last_millis, last_seq = (int(part) for part in entries[-1][0].split("-"))
+            if millis <= last_millis:
+                millis, seq = last_millis, last_seq + 1
+            else:
+                seq = 0
+        else:
+            seq = 0
+        event_id = f"{millis}-{seq}"
+        entries.append((event_id, dict(fields)))
+        if maxlen is not None and len(entries) > maxlen:
+            del entries[:len(entries) - maxlen]
+        if minid is not None:
+            oldest = tuple(int(part) for part in minid.split("-"))
+            entries[:] = [entry for entry in entries if tuple(int(part) for part in entry[0].split("-")) >= oldest]
+        return event_id
+
+    def xrange(self, key, min="-", max="+", count=None):
+        def parse(event_id):
+            return tuple(int(part) for part in event_id.split("-"))
+
+        exclusive = min.startswith("(")
+        lower = None if min == "-" else parse(min.lstrip("("))
+        results = []
+        for event_id, fields in self.data.get(key, []):
+            position = parse(event_id)
+            if lower is not None and (position < lower or (exclusive and position == lower)):
+                continue
+            if max != "+" and position > parse(max):
+                continue
+            results.append((event_id, dict(fields)))
+        return results[:count] if count else results
+
+    def xread(self, streams, count=None, block=None):
+        deadline = time.monotonic() + (block or 0) / 1000
+        while True:
+            response = []
+            for key, last_id in streams.items():
+                entries = self.xrange(key, min=f"({last_id}", count=count)
+                if entries:
+                    response.append([key, entries])
+            if response or block is None or time.monotonic() >= deadline:
+                return response
+            time.sleep(0.01)
+
+
+class FakeAsyncPubSub:
+    """Awaitable view of a FakePubSub, like redis.asyncio's PubSub"""
+
+    def __init__(self, pubsub: FakePubSub):
+        self.pubsub = pubsub
+
+    async def subscribe(self, *channels):
+        self.pubsub.subscribe(*channels)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        return await asyncio.to_thread(self.pubsub.get_message, timeout=timeout)
+
+    async def aclose(self):
+        self.pubsub.close()
+
+
+class FakeAsyncRedis:
+    """Awaitable view of a FakeRedis, standing in for the redis.asyncio client"""
+
+    def __init__(self, client: FakeRedis):
+        self.client = client
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakeAsyncPubSub(self.client.pubsub(ignore_subscribe_messages))
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+import app as portfolio_app
+import asgi as portfolio_asgi
+from test_flask_streaming import FakeChatStore, FakeHTMLCache, parse_sse_events, patch_job_streams
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.chat_jobs import ChatJobEvents
+
+
+class AdmissionControllerTests(unittest.TestCase):
+    def test_queue_positions_advance_as_slots_free(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=2)
+        positions = {"second": [], "third": []}
+
+        first = controller.reserve()
+        second = controller.reserve(positions["second"].append)
+        third = controller.reserve(positions["third"].append)
+
+        self.assertTrue(controller.wait(first))
+        controller.release(first)
+        self.assertTrue(controller.wait(second))
+
+        self.assertEqual(positions["second"], [1])
+        self.assertEqual(positions["third"], [2, 1])
+        self.assertEqual(controller.stats()["waiting"], 1)
+
+        controller.release(second)
+        self.assertTrue(controller.wait(third))
+        controller.release(third)
+        self.assertEqual(controller.stats()["running"], 0)
+
+    def test_position_callbacks_run_without_the_lock(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=2)
+        lock_free = []
+
+        def on_queue_position(position):
+            # A callback that writes to Redis must not stall other requests
+            acquired = controller._lock.acquire(blocking=False)
+            if acquired:
+                controller._lock.release()
+            lock_free.append(acquired)
+
+        first = controller.reserve()
+        second = controller.reserve(on_queue_position)
+        controller.reserve(on_queue_position)
+        controller.cancel(second)
+        controller.release(first)
+
+        self.assertEqual(lock_free, [True, True, True])
+
+    def test_full_queue_is_rejected_immediately(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1)
+        controller.reserve()
+        controller.reserve()
+
+        with self.assertRaises(AdmissionRejected):
+            controller.reserve()
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=2)
+        first = controller.reserve()
+        second = controller.reserve()
+        third_positions = []
+        third = controller.reserve(third_positions.append)
+
+        controller.cancel(second)
+        self.assertFalse(controller.wait(second))
+        self.assertEqual(third_positions, [2, 1])
+
+        controller.release(first)
+        self.assertTrue(controller.wait(third))
+
+    def test_unstarted_granted_ticket_is_returned_on_cancel(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=0)
+        ticket = controller.reserve()
+
+        controller.cancel(ticket)
+
+        self.assertEqual(controller.stats()["running"], 0)
+        controller.reserve()
+
+    def test_async_waiters_run_in_fifo_order(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=3)
+        order = []
+
+        async def job(name):
+            ticket = controller.reserve()
+            await controller.wait_async(ticket)
+            order.append(name)
+            await asyncio.sleep(0)
+            controller.release(ticket)
+
+        async def run():
+            await asyncio.gather(*(job(name) for name in "abcd"))
+
+        asyncio.run(run())
+        self.assertEqual(order, list("abcd"))
+
+    def test_blocking_waiter_wakes_on_release(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1)
+        first = controller.reserve()
+        second = controller.reserve()
+        started = []
+
+        worker = threading.Thread(target=lambda: started.append(controller.wait(second)))
+        worker.start()
+        controller.release(first)
+        worker.join(timeout=5)
+
+        self.assertEqual(started, [True])
+
+
+class StreamingAdmissionTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        FakeChatStore.stores = {}
+        FakeHTMLCache.stores = {}
+        patch_job_streams(self)
+
+    def test_stream_rejected_with_503_when_queue_full(self):
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "agent_admission", AdmissionController(max_concurrency=0, max_queue=0)),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+            events = parse_sse_events(response)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "5")
+        self.assertEqual(events[0]["status"], "error")
+
+
+
+class BrokenChatStore(FakeChatStore):
+    def add(self, role: str, content: str) -> int:
+        raise ConnectionError("Redis unavailable")
+
+
+class FailedTurnAdmissionTests(unittest.TestCase):
+    """A turn that fails before claiming its slot still gives its ticket back"""
+
+    def setUp(self):
+        FakeChatStore.stores = {}
+        patch_job_streams(self)
+
+    def tickets(self, controller: AdmissionController):
+        held = controller.reserve()
+        # Queued behind `held`, then granted once it is released
+        return held, controller.reserve()
+
+    def test_sync_turn_returns_granted_and_waiting_tickets(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1)
+        held, waiting = self.tickets(controller)
+        with patch.object(portfolio_app, "agent_admission", controller):
+            for ticket in (waiting, held):
+                portfolio_app.run_chat_job(
+                    ChatJobEvents("session", "job"), BrokenChatStore("session"), FakeHTMLCache("session"),
+                    "Show projects", ticket,
+                )
+
+        self.assertEqual(controller.stats()["running"], 0)
+        self.assertEqual(controller.stats()["waiting"], 0)
+
+    def test_async_turn_returns_its_ticket(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1)
+        held, waiting = self.tickets(controller)
+
+        async def run(ticket):
+            await portfolio_asgi.run_chat_job(
+                ChatJobEvents("session", "job"), BrokenChatStore("session"), FakeHTMLCache("session"),
+                "Show projects", ticket, asyncio.Queue(),
+            )
+
+        with patch.object(portfolio_asgi, "agent_admission", controller):
+            asyncio.run(run(waiting))
+            asyncio.run(run(held))
+
+        self.assertEqual(controller.stats()["running"], 0)
+        self.assertEqual(controller.stats()["waiting"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from utils import agent_pool as agent_pool_module
+from utils.agent_pool import AgentPool, get_agent_pool, pooled_agent
+from utils.metrics import AGENT_POOL_IN_USE, AGENT_POOL_SIZE
+
+
+class FakeConversationManager:
+    removed_message_count = 0
+
+
+class FakeAgent:
+    def __init__(self):
+        self.messages = []
+        self.state = None
+        self.event_loop_metrics = None
+        self.callback_handler = "default-handler"
+        self.conversation_manager = FakeConversationManager()
+
+
+class AgentPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.built = []
+
+    def factory(self):
+        agent = FakeAgent()
+        self.built.append(agent)
+        return agent
+
+    def test_agents_are_reused_and_reset_between_requests(self):
+        pool = AgentPool("test_reuse", self.factory)
+
+        with pool.agent(callback_handler="stream-handler") as first:
+            self.assertEqual(first.callback_handler, "stream-handler")
+            first.messages.append({"role": "user"})
+            first.conversation_manager.removed_message_count = 3
+
+        with pool.agent() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.built), 1)
+        self.assertEqual(second.messages, [])
+        self.assertEqual(second.callback_handler, "default-handler")
+        self.assertEqual(second.conversation_manager.removed_message_count, 0)
+
+    def test_concurrent_checkouts_get_separate_agents_and_report_utilization(self):
+        pool = AgentPool("test_utilization", self.factory)
+
+        with pool.agent() as first, pool.agent() as second:
+            self.assertIsNot(first, second)
+            self.assertEqual(AGENT_POOL_IN_USE.snapshot()["values"][("test_utilization",)], 2)
+
+        self.assertEqual(pool.stats(), {"idle": 2, "in_use": 0})
+        self.assertEqual(AGENT_POOL_SIZE.snapshot()["values"][("test_utilization",)], 2)
+
+    def test_agent_from_failed_request_is_dropped(self):
+        pool = AgentPool("test_failure", self.factory)
+
+        with self.assertRaises(RuntimeError):
+            with pool.agent():
+                raise RuntimeError("model error")
+
+        self.assertEqual(pool.stats(), {"idle": 0, "in_use": 0})
+
+    def test_idle_agents_beyond_limit_are_discarded(self):
+        pool = AgentPool("test_idle", self.factory, max_idle=1)
+
+        with pool.agent(), pool.agent():
+            pass
+
+        self.assertEqual(pool.stats(), {"idle": 1, "in_use": 0})
+
+    def test_pools_are_keyed_by_model_settings(self):
+        with patch.dict(os.environ, {"AI_PROVIDER": "openai", "MODEL_ID": "a"}):
+            first = get_agent_pool("test_keyed", self.factory)
+        with patch.dict(os.environ, {"AI_PROVIDER": "openai", "MODEL_ID": "b"}):
+            second = get_agent_pool("test_keyed", self.factory)
+
+        self.assertIsNot(first, second)
+
+    def test_disabled_pool_builds_an_agent_per_request(self):
+        with patch.dict(os.environ, {"AGENT_POOL_ENABLED": "false"}):
+            with pooled_agent("test_disabled", self.factory):
+                pass
+            with pooled_agent("test_disabled", self.factory):
+                pass
+
+        self.assertEqual(len(self.built), 2)
+        self.assertFalse(any(key[0] == "test_disabled" for key in agent_pool_module._pools))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@ from clients.llm.bedrock_provider import BedrockLLMProvider
 from clients.llm.gemini_provider import GeminiLLMProvider
 from clients.llm.litellm_provider import LiteLLMProvider
 from clients.llm.openai_provider import OpenAILLMProvider
+from clients.llm.routing_provider import RoutingLLMProvider
 from utils.ai_config import create_model_provider
 
 
@@ -48,6 +49,27 @@ class AIConfigTests(unittest.TestCase):
 
         self.assertIsInstance(provider, BedrockLLMProvider)
 
+    def test_routing_provider_builds_each_routed_provider(self):
+        with patch.dict(
+            os.environ,
+            {
+                "AI_PROVIDER": "routing",
+                "ROUTING_PROVIDERS": "openai, gemini",
+                "MODEL_ID": "ignored",
+                "OPENAI_MODEL_ID": "gpt-test",
+                "GEMINI_API_KEY": "key",
+                "LLM_HEDGE_DELAY_MS": "750",
+            },
+            clear=True,
+        ):
+            provider = create_model_provider()
+
+        self.assertIsInstance(provider, RoutingLLMProvider)
+        self.assertEqual(list(provider.providers), ["openai", "gemini"])
+        self.assertEqual(provider.providers["openai"].model_id, "gpt-test")
+        self.assertEqual(provider.providers["gemini"].model_id, "gemini-flash-latest")
+        self.assertEqual(provider.hedge_delay_ms, 750)
+
 
 if __name__ == "__main__":
     unittest.main()
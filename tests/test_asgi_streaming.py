@@ -0,0 +1,99 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+from agents.orchestrator.orchestrator_agent import PortfolioAgentResult
+import app as portfolio_app
+import asgi as portfolio_asgi
+from test_flask_streaming import FakeChatStore, FakeHTMLCache, patch_job_streams
+
+
+def parse_sse_text(raw: str):
+    events = []
+    for block in raw.split("\n\n"):
+        for line in block.split("\n"):
+            if line.startswith("data: "):
+                events.append(json.loads(line[6:]))
+    return events
+
+
+class AsgiStreamingTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        FakeChatStore.stores = {}
+        FakeChatStore.session_ids = []
+        FakeHTMLCache.stores = {}
+        FakeHTMLCache.session_ids = []
+        patch_job_streams(self)
+
+    def test_streaming_endpoint_runs_agent_on_event_loop(self):
+        async def fake_run_portfolio_request_async(
+            user_action, html_cache=None, progress_callback=None, chat_history=None
+        ):
+            progress_callback("Synthetic progress")
+            return PortfolioAgentResult(
+                success=True,
+                chat_message=f"Handled {user_action}",
+                html="<section><h2>Synthetic HTML</h2></section>",
+            )
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_asgi, "run_portfolio_request_async", fake_run_portfolio_request_async),
+            TestClient(portfolio_asgi.app) as client,
+        ):
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+            events = parse_sse_text(response.text)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual(response.headers["cache-control"], "no-cache")
+
+        statuses = [event["status"] for event in events]
+        self.assertEqual(statuses[:2], ["started", "orchestrating"])
+        self.assertIn("progress", statuses)
+        self.assertEqual(events[-1]["status"], "complete")
+        self.assertIn("Synthetic HTML", events[-1]["html"])
+        self.assertEqual(events[-1]["history_delta"]["messages"][-1]["content"], "Handled Show projects")
+
+    def test_asgi_stream_shares_flask_session(self):
+        async def fake_run_portfolio_request_async(
+            user_action, html_cache=None, progress_callback=None, chat_history=None
+        ):
+            return PortfolioAgentResult(success=True, chat_message="ok", html="<p>ok</p>")
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_asgi, "run_portfolio_request_async", fake_run_portfolio_request_async),
+            TestClient(portfolio_asgi.app) as client,
+        ):
+            client.get("/chat/history")
+            client.post("/chat/stream", json={"instruction": "Show projects"})
+            client.post("/chat/stream", json={"instruction": "Show skills"})
+
+        self.assertEqual(len(set(FakeChatStore.session_ids)), 1)
+
+    def test_agent_errors_are_reported_as_sse_error(self):
+        async def failing_run_portfolio_request_async(
+            user_action, html_cache=None, progress_callback=None, chat_history=None
+        ):
+            raise RuntimeError("model unavailable")
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_asgi, "run_portfolio_request_async", failing_run_portfolio_request_async),
+            TestClient(portfolio_asgi.app) as client,
+        ):
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+            events = parse_sse_text(response.text)
+
+        self.assertEqual(events[-1], {"status": "error", "message": "model unavailable"})
+
+
+if __name__ == "__main__":
+    unittest.main()
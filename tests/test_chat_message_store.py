@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import patch
+
+from fake_redis import FakeRedis
+from utils import chat_message_store as chat_store_module
+from utils.chat_message_store import ChatStore
+
+
+class ChatStoreDeltaTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(chat_store_module, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_since_returns_only_messages_after_cursor(self):
+        store = ChatStore("session")
+        store.add("user", "Show projects")
+        cursor = store.add("agent", "Here are the projects")
+        store.add("user", "Show skills")
+        store.add("agent", "Here are the skills")
+
+        delta = store.since(cursor)
+
+        self.assertFalse(delta["reset"])
+        self.assertEqual(delta["version"], 4)
+        self.assertEqual([m["content"] for m in delta["messages"]], ["Show skills", "Here are the skills"])
+        self.assertEqual([m["seq"] for m in delta["messages"]], [3, 4])
+
+    def test_unknown_or_stale_cursor_resets_to_full_history(self):
+        store = ChatStore("session", max_size=2)
+        for index in range(4):
+            store.add("user", f"message {index}")
+
+        for cursor in (None, 0, 9):
+            delta = store.since(cursor)
+            self.assertTrue(delta["reset"])
+            self.assertEqual([m["content"] for m in delta["messages"]], ["message 2", "message 3"])
+
+    def test_recent_messages_reads_only_the_newest_entries(self):
+        store = ChatStore("session")
+        for index in range(5):
+            store.add("user", f"message {index}")
+
+        recent = store.recent_messages(2)
+
+        self.assertEqual([m["content"] for m in recent], ["message 3", "message 4"])
+        self.assertEqual(store.since(5), {"version": 5, "reset": False, "messages": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
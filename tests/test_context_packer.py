@@ -0,0 +1,104 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from clients.kb_client import KnowledgeBaseClient
+from clients.retrieval.base import RetrievedChunk
+from clients.retrieval.context_packer import (
+    SEPARATOR,
+    _truncate,
+    context_token_budget,
+    estimate_tokens,
+    pack_context,
+)
+from clients.retrieval.local_keyword_client import LocalKeywordRetrievalClient
+
+
+def words(start: int, count: int) -> str:
+    return " ".join(f"w{index}" for index in range(start, start + count))
+
+
+class ContextPackerTests(unittest.TestCase):
+    def test_splitter_overlap_is_trimmed(self):
+        splitter = LocalKeywordRetrievalClient(data_dir="missing", chunk_size=300, chunk_overlap=80)
+        text = words(0, 150)
+        parts = splitter._split_long_text(text)
+        chunks = [RetrievedChunk(text=part, score=0.9 - index * 0.01) for index, part in enumerate(parts)]
+
+        pack = pack_context(chunks, token_budget=10_000, mmr_lambda=1.0)
+
+        self.assertGreater(len(parts), 2)
+        self.assertEqual(pack.context.replace(SEPARATOR, "").replace(" ", ""), text.replace(" ", ""))
+        self.assertGreater(pack.tokens_saved, 0)
+
+    def test_repeated_and_contained_chunks_are_dropped(self):
+        pack = pack_context([
+            RetrievedChunk(text="Built a Flask portfolio with agents.", score=0.9),
+            RetrievedChunk(text="Built a Flask portfolio with agents.", score=0.8),
+            RetrievedChunk(text="Flask portfolio", score=0.7),
+        ], token_budget=1000)
+
+        self.assertEqual(pack.context, "Built a Flask portfolio with agents.")
+        self.assertEqual(pack.duplicates, 2)
+
+    def test_diverse_chunk_beats_near_duplicate(self):
+        pack = pack_context([
+            RetrievedChunk(text="chess engine written in c++ with alpha beta search", score=0.9),
+            RetrievedChunk(text="chess engine written in c++ using alpha beta search", score=0.85),
+            RetrievedChunk(text="kubernetes deployment pipeline for the portfolio", score=0.6),
+        ], token_budget=30)
+
+        self.assertEqual([chunk.score for chunk in pack.chunks], [0.9, 0.6])
+
+    def test_budget_is_respected(self):
+        chunks = [RetrievedChunk(text=words(index * 100, 100), score=1 - index / 10) for index in range(8)]
+
+        pack = pack_context(chunks, token_budget=400)
+
+        self.assertLessEqual(pack.tokens, 400)
+        self.assertEqual(pack.tokens + pack.tokens_saved, pack.candidate_tokens)
+        self.assertEqual(pack.chunks[0].score, 1)
+
+    def test_oversized_best_chunk_is_truncated(self):
+        pack = pack_context([RetrievedChunk(text="para one\n\n" + "x" * 4000, score=0.9)], token_budget=100)
+
+        self.assertLessEqual(estimate_tokens(pack.context), 100)
+        self.assertTrue(pack.context.startswith("para one"))
+
+    def test_truncation_prefers_a_paragraph_break_over_a_later_line_break(self):
+        text = "a" * 250 + "\n\n" + "b" * 100 + "\n" + "c" * 100
+
+        self.assertEqual(_truncate(text, 100), "a" * 250)
+        # A paragraph break in the first half is too early; the line break is used
+        self.assertEqual(_truncate("a" * 50 + "\n\n" + "b" * 300 + "\n" + "c" * 100, 100), "a" * 50 + "\n\n" + "b" * 300)
+
+    def test_budget_can_be_set_per_provider(self):
+        env = {"AI_PROVIDER": "gemini", "KB_CONTEXT_TOKEN_BUDGET": "2000", "KB_CONTEXT_TOKEN_BUDGET_GEMINI": "8000"}
+        with patch.dict(os.environ, env):
+            self.assertEqual(context_token_budget(), 8000)
+            self.assertEqual(context_token_budget("openai"), 2000)
+
+    def test_routing_uses_the_smallest_routed_budget(self):
+        env = {
+            "AI_PROVIDER": "routing",
+            "ROUTING_PROVIDERS": "gemini,openai",
+            "KB_CONTEXT_TOKEN_BUDGET": "3000",
+            "KB_CONTEXT_TOKEN_BUDGET_GEMINI": "8000",
+            "KB_CONTEXT_TOKEN_BUDGET_OPENAI": "1500",
+        }
+        with patch.dict(os.environ, env):
+            self.assertEqual(context_token_budget(), 1500)
+            os.environ["KB_CONTEXT_TOKEN_BUDGET_OPENAI"] = "9000"
+            self.assertEqual(context_token_budget(), 8000)
+
+    def test_knowledge_base_client_packs_dict_chunks(self):
+        context = KnowledgeBaseClient.build_kb_context(
+            [{"text": "second", "score": 0.2}, {"text": "first", "score": 0.9}, {"text": "first", "score": 0.5}],
+            token_budget=1000,
+        )
+
+        self.assertEqual(context, f"first{SEPARATOR}second")
+
+
+if __name__ == "__main__":
+    unittest.main()
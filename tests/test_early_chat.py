@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from agents.orchestrator import orchestrator_agent
+from agents.orchestrator.orchestrator_agent import OrchestrationDecision
+
+PAGE_JSON = json.dumps({"success": True, "html": "<section>Projects</section>", "error_message": None})
+
+
+def decision(**overrides) -> OrchestrationDecision:
+    fields = {
+        "success": True,
+        "chat_message": "Here are the projects.",
+        "needs_ui_change": True,
+        "instruction": "Display projects",
+        "refine_previous": False,
+        "requires_external_data": True,
+    }
+    fields.update(overrides)
+    return OrchestrationDecision(**fields)
+
+
+class EarlyChatReplyTests(unittest.TestCase):
+    def run_request(self, decided: OrchestrationDecision, env: dict | None = None, page_json: str = PAGE_JSON):
+        events = []
+        seen_by_generation = []
+
+        async def generate(**kwargs):
+            seen_by_generation.extend(events)
+            return page_json
+
+        with patch.dict(os.environ, env or {}), \
+             patch.object(orchestrator_agent, "_semantic_cache_result", return_value=None), \
+             patch.object(orchestrator_agent, "_decide", return_value=(decided, None)), \
+             patch.object(orchestrator_agent, "generate_html_from_request_async", side_effect=generate) as generate_html:
+            result = orchestrator_agent.run_portfolio_request("Show projects", progress_callback=events.append)
+        return result, events, seen_by_generation, generate_html
+
+    def test_chat_message_is_sent_before_generation(self):
+        result, events, seen_by_generation, _ = self.run_request(decision())
+
+        chat_event = {"status": "chat", "message": "Here are the projects."}
+        self.assertIn(chat_event, seen_by_generation)
+        self.assertEqual(result.chat_message, "Here are the projects.")
+        self.assertEqual(result.html, "<section>Projects</section>")
+
+    def test_failed_generation_replaces_the_early_reply(self):
+        failed_page = json.dumps({"success": False, "error_message": "Invalid HTML structure"})
+        result, events, _, _ = self.run_request(decision(), page_json=failed_page)
+
+        # chat.js removes the early reply on the error event that follows
+        self.assertIn({"status": "chat", "message": "Here are the projects."}, events)
+        self.assertFalse(result.success)
+        self.assertEqual(result.chat_message, "Invalid HTML structure")
+
+    def test_no_chat_event_without_generation(self):
+        result, events, _, generate_html = self.run_request(decision(needs_ui_change=False, instruction=None))
+
+        generate_html.assert_not_called()
+        self.assertFalse([event for event in events if isinstance(event, dict)])
+        self.assertEqual(result.chat_message, "Here are the projects.")
+
+    def test_disabled_by_env(self):
+        _, events, _, _ = self.run_request(decision(), env={"EARLY_CHAT_REPLY": "false"})
+
+        self.assertFalse([event for event in events if isinstance(event, dict)])
+
+    def test_async_request_sends_chat_before_generation(self):
+        events = []
+        seen_by_generation = []
+
+        async def generate(**kwargs):
+            seen_by_generation.extend(events)
+            return PAGE_JSON
+
+        async def decide(*args):
+            return decision(), None
+
+        with patch.object(orchestrator_agent, "_semantic_cache_result", return_value=None), \
+             patch.object(orchestrator_agent, "_decide", side_effect=decide), \
+             patch.object(orchestrator_agent, "generate_html_from_request_async", side_effect=generate):
+            result = asyncio.run(
+                orchestrator_agent.run_portfolio_request_async("Show projects", progress_callback=events.append)
+            )
+
+        self.assertIn({"status": "chat", "message": "Here are the projects."}, seen_by_generation)
+        self.assertTrue(result.success)
+
+
+if __name__ == "__main__":
+    unittest.main()
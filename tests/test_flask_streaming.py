@@ -4,6 +4,8 @@ from unittest.mock import patch
 
 from agents.orchestrator.orchestrator_agent import PortfolioAgentResult
 import app as portfolio_app
+from tests.fake_redis import FakeAsyncRedis, FakeRedis
+from utils import chat_jobs as chat_jobs_module
 from utils.html_cache import HTMLCacheEntry
 
 
@@ -16,8 +18,12 @@ class FakeChatStore:
         self.entries = self.stores.setdefault(session_id, [])
         self.session_ids.append(session_id)
 
-    def add(self, role: str, content: str) -> None:
+    def add(self, role: str, content: str) -> int:
         self.entries.append({"role": role, "content": content})
+        return len(self.entries)
+
+    def version(self) -> int:
+        return len(self.entries)
 
     def format_messages(self):
         return [
@@ -26,10 +32,19 @@ class FakeChatStore:
                 "role": entry["role"],
                 "content": entry["content"],
                 "timestamp": "2026-01-01T00:00:00+00:00",
+                "seq": idx + 1,
             }
             for idx, entry in enumerate(self.entries)
         ]
 
+    def recent_messages(self, limit: int):
+        return self.format_messages()[-limit:]
+
+    def since(self, cursor):
+        if cursor is None or cursor > len(self.entries):
+            return {"version": len(self.entries), "reset": True, "messages": self.format_messages()}
+        return {"version": len(self.entries), "reset": False, "messages": self.format_messages()[cursor:]}
+
     def __len__(self):
         return len(self.entries)
 
@@ -43,13 +58,14 @@ class FakeHTMLCache:
         self.entries = self.stores.setdefault(session_id, [])
         self.session_ids.append(session_id)
 
-    def add(self, query: str, html: str) -> None:
+    def add(self, query: str, html: str, duration_ms=None) -> None:
         self.entries.insert(
             0,
             HTMLCacheEntry(
                 query=query,
                 html=html,
                 timestamp="2026-01-01T00:00:00+00:00",
+                duration_ms=duration_ms,
             ),
         )
 
@@ -74,11 +90,22 @@ def parse_sse_events(response):
     raw = b"".join(response.response).decode("utf-8")
     events = []
     for block in raw.split("\n\n"):
-        if block.startswith("data: "):
-            events.append(json.loads(block[6:]))
+        for line in block.split("\n"):
+            if line.startswith("data: "):
+                events.append(json.loads(line[6:]))
     return events
 
 
+def patch_job_streams(test_case: unittest.TestCase) -> FakeRedis:
+    """Back chat job event streams with an in-memory Redis for one test"""
+    fake_redis = FakeRedis()
+    for name, client in (("redis_client", fake_redis), ("async_redis_client", FakeAsyncRedis(fake_redis))):
+        redis_patch = patch.object(chat_jobs_module, name, client)
+        redis_patch.start()
+        test_case.addCleanup(redis_patch.stop)
+    return fake_redis
+
+
 class FlaskStreamingTests(unittest.TestCase):
     def setUp(self):
         portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
@@ -86,6 +113,7 @@ class FlaskStreamingTests(unittest.TestCase):
         FakeChatStore.session_ids = []
         FakeHTMLCache.stores = {}
         FakeHTMLCache.session_ids = []
+        patch_job_streams(self)
 
     def test_streaming_endpoint_returns_sse_events_and_history(self):
         def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
@@ -115,7 +143,78 @@ class FlaskStreamingTests(unittest.TestCase):
         self.assertIn("progress", statuses)
         self.assertEqual(events[-1]["status"], "complete")
         self.assertIn("Synthetic HTML", events[-1]["html"])
-        self.assertEqual(events[-1]["history"][-1]["content"], "Handled Show projects")
+        self.assertEqual(events[-1]["history_delta"]["messages"][-1]["content"], "Handled Show projects")
+
+    def test_complete_event_sends_only_history_after_client_version(self):
+        def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
+            return PortfolioAgentResult(success=True, chat_message=f"Handled {user_action}", html="<p>ok</p>")
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", fake_run_portfolio_request),
+            portfolio_app.app.test_client() as client,
+        ):
+            first = parse_sse_events(client.post("/chat/stream", json={"instruction": "Show projects"}))
+            version = first[-1]["history_delta"]["version"]
+            second = parse_sse_events(
+                client.post("/chat/stream", json={"instruction": "Show skills", "history_version": version})
+            )
+
+        delta = second[-1]["history_delta"]
+        self.assertTrue(first[-1]["history_delta"]["reset"])
+        self.assertFalse(delta["reset"])
+        self.assertEqual(delta["version"], version + 2)
+        self.assertEqual([m["content"] for m in delta["messages"]], ["Show skills", "Handled Show skills"])
+
+    def test_streaming_endpoint_forwards_html_chunk_payloads(self):
+        def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
+            progress_callback({"status": "html_chunk", "html": "<section>"})
+            progress_callback({"status": "html_chunk", "html": "</section>"})
+            return PortfolioAgentResult(
+                success=True,
+                chat_message="Done",
+                html="<section></section>",
+            )
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", fake_run_portfolio_request),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+            events = parse_sse_events(response)
+
+        chunks = [event["html"] for event in events if event["status"] == "html_chunk"]
+        # Chunks arriving within CHAT_JOB_CHUNK_MS are appended as one event
+        self.assertEqual(chunks, ["<section></section>"])
+        self.assertEqual(events[-1]["status"], "complete")
+        self.assertEqual(events[-1]["html"], "<section></section>")
+
+    def test_cached_result_reports_cached_status_without_re_adding_page(self):
+        def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
+            return PortfolioAgentResult(
+                success=True,
+                chat_message="From earlier",
+                html="<section>cached</section>",
+                from_cache=True,
+            )
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", fake_run_portfolio_request),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+            events = parse_sse_events(response)
+
+        statuses = [event["status"] for event in events]
+        self.assertIn("cached", statuses)
+        self.assertTrue(events[-1]["from_cache"])
+        cache_entries = next(iter(FakeHTMLCache.stores.values()))
+        self.assertEqual([entry.query for entry in cache_entries], ["Quick Guide"])
 
     def test_same_client_reuses_session_for_context_stores(self):
         def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
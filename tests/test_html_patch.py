@@ -0,0 +1,130 @@
+import asyncio
+from contextlib import contextmanager
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agents.html_generation.html_generation_agent import (
+    HTMLGenerationResult,
+    HTMLPatchResult,
+    PatchOperation,
+)
+from agents.html_generation.html_patch import PatchError, apply_patch
+from agents.orchestrator.tools import orchestrator_tools
+from utils.html_cache import HTMLCacheEntry
+from utils.timing import StageTimer
+
+PAGE = (
+    '<section class="projects"><h2>Projects</h2>'
+    '<div class="card"><h3>Portfolio Site</h3><p>Flask app</p></div>'
+    '<div class="card"><h3>Chess Engine</h3><p>C++</p></div> footer</section>'
+)
+
+
+class ApplyPatchTests(unittest.TestCase):
+    def test_operations_edit_only_selected_elements(self):
+        patched = apply_patch(PAGE, [
+            PatchOperation(op="replace", selector="//h2", html='<h2 style="font-size: 2em">Projects</h2>'),
+            PatchOperation(op="remove", selector="//div[h3='Chess Engine']"),
+            PatchOperation(
+                op="insert",
+                selector="//div[@class='card']",
+                position="inside_end",
+                html="<span>2025</span>",
+            ),
+        ])
+
+        self.assertEqual(
+            patched,
+            '<section class="projects"><h2 style="font-size: 2em">Projects</h2>'
+            '<div class="card"><h3>Portfolio Site</h3><p>Flask app</p><span>2025</span></div> footer</section>',
+        )
+
+    def test_ambiguous_or_missing_selector_is_rejected(self):
+        for selector in ("//div[@class='card']", "//table", "//h2/text()", "//section["):
+            with self.subTest(selector=selector), self.assertRaises(PatchError):
+                apply_patch(PAGE, [PatchOperation(op="remove", selector=selector)])
+
+    def test_full_documents_are_rejected(self):
+        document = "<!DOCTYPE html><html><head><style>h2 { color: red }</style></head><body><h2>Projects</h2></body></html>"
+
+        with self.assertRaises(PatchError):
+            apply_patch(document, [PatchOperation(op="replace", selector="//h2", html="<h2>Work</h2>")])
+        with self.assertRaises(PatchError):
+            apply_patch(PAGE, [PatchOperation(op="replace", selector="//h2", html=document)])
+
+    def test_emptying_the_page_is_rejected(self):
+        with self.assertRaises(PatchError):
+            apply_patch("<section><h2>Projects</h2></section>", [PatchOperation(op="remove", selector="//section")])
+
+    def test_insert_keeps_surrounding_text(self):
+        patched = apply_patch("<p>a</p> tail", [
+            PatchOperation(op="insert", selector="//p", position="after", html="<p>b</p>"),
+        ])
+
+        self.assertEqual(patched, "<p>a</p><p>b</p> tail")
+
+
+class FakeHTMLCache:
+    def latest(self):
+        return HTMLCacheEntry(query="projects", html=PAGE, timestamp="2026-01-01T00:00:00+00:00")
+
+
+def fake_agent_context(structured_output):
+    """An agent context whose `invoke_async` answers with `structured_output`; returns the context and that mock"""
+    invoke = AsyncMock(return_value=MagicMock(
+        structured_output=structured_output,
+        metrics=MagicMock(accumulated_usage={"outputTokens": 10}),
+    ))
+
+    @contextmanager
+    def context(*args):
+        yield MagicMock(invoke_async=invoke)
+
+    return context, invoke
+
+
+class PatchRefinementTests(unittest.TestCase):
+    def generate(self, patch_result):
+        patch_context, patch_agent = fake_agent_context(patch_result)
+        generation_context, generation_agent = fake_agent_context(
+            HTMLGenerationResult(success=True, html="<p>regenerated</p>")
+        )
+        with (
+            patch.object(orchestrator_tools, "_patch_agent", patch_context),
+            patch.object(orchestrator_tools, "_generation_agent", generation_context),
+        ):
+            result = asyncio.run(orchestrator_tools._generate_page(
+                "Make the title bigger", True, False, FakeHTMLCache(), None, lambda message: None, StageTimer()
+            ))
+        return json.loads(result), patch_agent, generation_agent
+
+    def test_refinement_applies_edits_without_regenerating(self):
+        result, patch_agent, generation_agent = self.generate(HTMLPatchResult(
+            success=True,
+            operations=[PatchOperation(op="replace", selector="//h2", html="<h2>Big Projects</h2>")],
+        ))
+
+        self.assertIn("<h2>Big Projects</h2>", result["html"])
+        self.assertIn("Chess Engine", result["html"])
+        self.assertIn(PAGE, patch_agent.call_args.args[0])
+        generation_agent.assert_not_called()
+
+    def test_failed_patch_falls_back_to_full_regeneration(self):
+        for patch_result in (
+            HTMLPatchResult(success=False, error_message="redesign"),
+            HTMLPatchResult(success=True, operations=[PatchOperation(op="remove", selector="//p")]),
+            HTMLPatchResult(success=True, operations=[PatchOperation(
+                op="replace", selector="//h2", html="<html><head><style>h2 {}</style></head><body><h2>X</h2></body></html>",
+            )]),
+            HTMLPatchResult(success=True, operations=[PatchOperation(op="remove", selector="//section")]),
+        ):
+            with self.subTest(patch_result=patch_result):
+                result, _, generation_agent = self.generate(patch_result)
+
+                self.assertEqual(result["html"], "<p>regenerated</p>")
+                self.assertIn("PREVIOUS HTML", generation_agent.call_args.args[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
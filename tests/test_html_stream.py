@@ -0,0 +1,48 @@
+import json
+import unittest
+
+from agents.html_generation.html_stream import HTMLStreamExtractor, create_html_stream_handler
+
+
+def feed_in_chunks(extractor: HTMLStreamExtractor, payload: str, chunk_size: int) -> list[str]:
+    fragments = []
+    for end in range(chunk_size, len(payload) + chunk_size, chunk_size):
+        fragment = extractor.feed(payload[:end])
+        if fragment:
+            fragments.append(fragment)
+    return fragments
+
+
+class HTMLStreamExtractorTests(unittest.TestCase):
+    def test_decodes_html_field_across_arbitrary_chunk_boundaries(self):
+        html = '<section class="hero">\n  <h1>Café — "quoted" \\ path</h1>\n  <p>\U0001F680</p>\n</section>'
+        payload = json.dumps({"success": True, "html": html, "error_message": None})
+
+        for chunk_size in (1, 2, 3, 7, 64):
+            extractor = HTMLStreamExtractor()
+            fragments = feed_in_chunks(extractor, payload, chunk_size)
+
+            self.assertEqual("".join(fragments), html, f"chunk_size={chunk_size}")
+            self.assertEqual(extractor.html, html)
+
+    def test_ignores_input_before_html_field_and_after_closing_quote(self):
+        extractor = HTMLStreamExtractor()
+
+        self.assertEqual(extractor.feed('{"success": tr'), "")
+        self.assertEqual(extractor.feed('{"success": true, "html": "<p>hi'), "<p>hi")
+        self.assertEqual(extractor.feed('{"success": true, "html": "<p>hi</p>", "error_message": "x"}'), "</p>")
+        self.assertEqual(extractor.feed('{"success": true, "html": "<p>hi</p>", "error_message": "xyz"}'), "")
+
+    def test_stream_handler_only_forwards_tool_use_stream_events(self):
+        fragments = []
+        handler = create_html_stream_handler(fragments.append)
+
+        handler(data="plain text")
+        handler(type="tool_use_stream", current_tool_use={"input": '{"html": "<div>'})
+        handler(type="tool_use_stream", current_tool_use={"input": '{"html": "<div></div>"}'})
+
+        self.assertEqual(fragments, ["<div>", "</div>"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+from agents.orchestrator import intent_router as intent_router_module
+from agents.orchestrator import orchestrator_agent
+from agents.orchestrator.intent_router import (
+    IntentRouter,
+    NaiveBayesIntentClassifier,
+    decision_intent,
+    evaluate_router,
+    labelled_examples,
+    log_decision,
+    logged_decisions,
+    match_rule,
+)
+from agents.orchestrator.orchestrator_agent import OrchestrationDecision
+from fake_redis import FakeRedis
+
+
+def llm_decision(instruction: str | None, refine_previous: bool = False) -> OrchestrationDecision:
+    return OrchestrationDecision(
+        success=True,
+        chat_message="ok",
+        needs_ui_change=instruction is not None,
+        instruction=instruction,
+        refine_previous=refine_previous,
+        requires_external_data=True,
+    )
+
+
+class IntentRuleTests(unittest.TestCase):
+    def test_quick_start_prompts_match_rules(self):
+        self.assertEqual(match_rule("Show me your projects"), "projects")
+        self.assertEqual(match_rule("Tell me about your work experience"), "experience")
+        self.assertEqual(match_rule("Describe your education/coursework"), "education")
+        self.assertEqual(match_rule("What are your technical skills?"), "skills")
+
+    def test_specific_or_mixed_requests_fall_back(self):
+        self.assertIsNone(match_rule("Tell me about your ML experience"))
+        self.assertIsNone(match_rule("Show projects and skills"))
+        self.assertIsNone(match_rule("Make the projects bigger"))
+        self.assertIsNone(match_rule("Show me your work"))
+
+    def test_llm_decisions_are_labelled_by_instruction_subject(self):
+        self.assertEqual(decision_intent(llm_decision("Display all projects with technologies used")), "projects")
+        self.assertEqual(decision_intent(llm_decision("Increase font size", refine_previous=True)), "other")
+        self.assertEqual(decision_intent(llm_decision(None)), "other")
+
+
+class IntentClassifierTests(unittest.TestCase):
+    def setUp(self):
+        examples = [
+            ("what have you built", "projects"),
+            ("what have you built recently", "projects"),
+            ("where have you worked", "experience"),
+            ("where have you worked before", "experience"),
+            ("make it blue", "other"),
+            ("make the text bigger", "other"),
+        ]
+        self.router = IntentRouter(classifier=NaiveBayesIntentClassifier.train(examples), min_confidence=0.6)
+
+    def test_confident_paraphrase_is_routed(self):
+        result = self.router.classify("what have you built")
+
+        self.assertEqual((result.intent, result.source), ("projects", "classifier"))
+        self.assertEqual(result.decision.instruction, "Display all projects with descriptions and technologies used")
+
+    def test_zero_confidence_threshold_is_respected(self):
+        with patch.dict(os.environ, {"INTENT_ROUTER_MIN_CONFIDENCE": "0.9"}):
+            router = IntentRouter(classifier=self.router._classifier, min_confidence=0.0)
+
+        self.assertEqual(router.min_confidence, 0.0)
+
+    def test_unseen_words_fall_back(self):
+        self.assertIsNone(self.router.classify("what have you built with rust"))
+        self.assertIsNone(self.router.classify("make it blue"))
+
+    def test_replay_reports_hit_rate_and_accuracy(self):
+        report = evaluate_router(self.router, [
+            ("Show me your projects", "projects"),
+            ("where have you worked", "projects"),
+            ("make it blue", "other"),
+            ("something else entirely", "other"),
+        ])
+
+        self.assertEqual(report["hits"], 2)
+        self.assertEqual(report["hit_rate"], 0.5)
+        self.assertEqual(report["accuracy"], 0.5)
+        self.assertEqual(report["by_source"]["rule"], {"hits": 1, "correct": 1})
+
+
+class IntentRouterIntegrationTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(intent_router_module, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_routed_request_skips_orchestrator_agent(self):
+        with (
+            patch.dict(os.environ, {"INTENT_ROUTER_SHADOW_RATE": "0"}),
+            patch.object(orchestrator_agent, "_llm_decision") as llm,
+            patch.object(orchestrator_agent, "generate_html_from_request_async", return_value='{"success": true, "html": "<p>p</p>"}'),
+        ):
+            result = orchestrator_agent.run_portfolio_request("Show me your projects")
+
+        llm.assert_not_called()
+        self.assertEqual(result.html, "<p>p</p>")
+        self.assertIn("routing", result.timings)
+        self.assertNotIn("decision", result.timings)
+
+    def test_shadow_checks_beyond_the_worker_limit_are_skipped(self):
+        release = threading.Event()
+        started = []
+
+        async def slow_decision(prompt):
+            started.append(prompt)
+            await asyncio.to_thread(release.wait, 5)
+            return llm_decision("Display all projects")
+
+        route = IntentRouter().route("Show me your projects")
+        with (
+            patch.dict(os.environ, {"INTENT_ROUTER_SHADOW_WORKERS": "1"}),
+            patch.object(orchestrator_agent, "_shadow_executor", None),
+            patch.object(orchestrator_agent, "_shadow_slots", None),
+            patch.object(orchestrator_agent, "_llm_decision", slow_decision),
+        ):
+            for index in range(3):
+                orchestrator_agent._start_shadow_check(route, f"prompt {index}")
+            executor, slots = orchestrator_agent._get_shadow_executor()
+            release.set()
+            executor.shutdown(wait=True)
+
+        self.assertEqual(started, ["prompt 0"])
+        self.assertTrue(slots.acquire(blocking=False))
+
+    def test_llm_decisions_are_logged_for_training(self):
+        log_decision("where have you worked", llm_decision("Display work experience with dates"))
+
+        self.assertEqual(labelled_examples(logged_decisions()), [("where have you worked", "experience")])
+
+
+if __name__ == "__main__":
+    unittest.main()
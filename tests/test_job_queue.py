@@ -0,0 +1,153 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+from agents.orchestrator.orchestrator_agent import PortfolioAgentResult
+import app as portfolio_app
+from test_flask_streaming import FakeChatStore, FakeHTMLCache, parse_sse_events, patch_job_streams
+from utils.chat_jobs import (
+    JOB_QUEUE_KEY,
+    ChatJobEvents,
+    WorkerLease,
+    announce_queue_positions,
+    dequeue_chat_job,
+    enqueue_chat_job,
+    requeue_orphaned_jobs,
+)
+import worker
+
+
+class JobQueueTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        FakeChatStore.stores = {}
+        FakeChatStore.session_ids = []
+        FakeHTMLCache.stores = {}
+        FakeHTMLCache.session_ids = []
+        self.redis = patch_job_streams(self)
+
+        env_patch = patch.dict(os.environ, {"CHAT_EXECUTION": "queue"})
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+    def test_web_enqueues_and_worker_publishes_progress_and_result(self):
+        agent_threads = []
+
+        def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
+            agent_threads.append(threading.current_thread().name)
+            progress_callback("Synthetic progress")
+            return PortfolioAgentResult(success=True, chat_message=f"Handled {user_action}", html="<p>ok</p>")
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", fake_run_portfolio_request),
+            portfolio_app.app.test_client() as client,
+        ):
+            agent_worker = threading.Thread(target=worker.process_next_job, kwargs={"timeout": 5}, name="agent-worker")
+            agent_worker.start()
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+            events = parse_sse_events(response)
+            agent_worker.join(timeout=5)
+
+        statuses = [event["status"] for event in events]
+        self.assertEqual(statuses[:2], ["started", "queued"])
+        self.assertIn("progress", statuses)
+        self.assertEqual(events[-1]["status"], "complete")
+        self.assertEqual(events[-1]["chat_message"], "Handled Show projects")
+        self.assertEqual(agent_threads, ["agent-worker"])
+
+    def test_full_queue_is_rejected(self):
+        with (
+            patch.dict(os.environ, {"CHAT_QUEUE_MAX": "1"}),
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            portfolio_app.app.test_client() as client,
+        ):
+            self.redis.lpush(JOB_QUEUE_KEY, "{}")
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.redis.llen(JOB_QUEUE_KEY), 1)
+
+    def test_turn_of_a_lost_worker_is_requeued_and_retried(self):
+        enqueue_chat_job("session", "job-1", "Show projects")
+        ChatJobEvents("session", "job-1").claim()
+        # A worker takes the turn and dies before acknowledging it
+        WorkerLease("lost-worker", seconds=30).renew()
+        self.assertIsNotNone(dequeue_chat_job("lost-worker", timeout=1))
+        self.assertEqual(self.redis.llen(JOB_QUEUE_KEY), 0)
+
+        self.assertEqual(requeue_orphaned_jobs(), 0)
+        self.redis.delete("chat_jobs:lease:lost-worker")
+        self.assertEqual(requeue_orphaned_jobs(), 1)
+        self.assertEqual(self.redis.llen(JOB_QUEUE_KEY), 1)
+
+        runs = []
+
+        def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
+            runs.append(user_action)
+            return PortfolioAgentResult(success=True, chat_message="Recovered", html="<p>ok</p>")
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", fake_run_portfolio_request),
+        ):
+            # The lost worker's attempt counts
+            ChatJobEvents("session", "job-1").start_attempt()
+            # On its own thread, like a worker process, since a turn runs its own event loop
+            agent_worker = threading.Thread(
+                target=worker.process_next_job, kwargs={"timeout": 1, "worker": "healthy-worker"}
+            )
+            agent_worker.start()
+            agent_worker.join(timeout=5)
+
+        statuses = [payload["status"] for _, payload in ChatJobEvents("session", "job-1").read_after(None)]
+        self.assertEqual(runs, ["Show projects"])
+        self.assertEqual(statuses[0], "retrying")
+        self.assertEqual(statuses[-1], "complete")
+        # The user message was recorded by the first attempt
+        self.assertNotIn("Show projects", [m["content"] for m in FakeChatStore.stores.get("session", [])])
+        self.assertEqual(self.redis.llen("chat_jobs:processing:healthy-worker"), 0)
+
+    def test_waiting_turns_get_their_new_queue_position(self):
+        for job_id in ("job-1", "job-2", "job-3"):
+            ChatJobEvents("session", job_id).claim()
+            enqueue_chat_job("session", job_id, "Show projects")
+        dequeue_chat_job("worker", timeout=1)
+
+        announce_queue_positions(portfolio_app.queue_position_payload)
+
+        positions = {
+            job_id: [payload["position"] for _, payload in ChatJobEvents("session", job_id).read_after(None)]
+            for job_id in ("job-1", "job-2", "job-3")
+        }
+        self.assertEqual(positions, {"job-1": [], "job-2": [1], "job-3": [2]})
+
+    def test_queue_positions_go_only_to_live_turns_near_the_front(self):
+        for job_id in ("job-1", "job-2", "job-3", "job-4"):
+            ChatJobEvents("session", job_id).claim()
+            enqueue_chat_job("session", job_id, "Show projects")
+        # job-2's claim expired while it waited
+        self.redis.delete(ChatJobEvents("session", "job-2").claim_key)
+
+        with (
+            patch.dict(os.environ, {"CHAT_QUEUE_ANNOUNCE_MAX": "3"}),
+            patch.object(self.redis, "expire", wraps=self.redis.expire) as expire,
+        ):
+            announce_queue_positions(portfolio_app.queue_position_payload)
+
+        positions = {
+            job_id: [payload["position"] for _, payload in ChatJobEvents("session", job_id).read_after(None)]
+            for job_id in ("job-1", "job-2", "job-3", "job-4")
+        }
+        self.assertEqual(positions, {"job-1": [1], "job-2": [], "job-3": [3], "job-4": []})
+        self.assertFalse(self.redis.exists(ChatJobEvents("session", "job-2").key))
+        expired = {call.args[0] for call in expire.call_args_list}
+        self.assertEqual(expired, {ChatJobEvents("session", job_id).key for job_id in ("job-1", "job-3")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+import app as portfolio_app
+import clients.redis_client as redis_module
+from tests.fake_redis import FakeRedis
+from tests.test_flask_streaming import FakeChatStore, FakeHTMLCache
+from utils import metrics as metrics_module
+from utils.metrics import MetricsRegistry, merge_snapshots, render_prometheus
+
+
+class MetricsExpositionTests(unittest.TestCase):
+    def test_renders_counters_and_cumulative_histogram_buckets(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("demo_requests_total", "Requests.", labelnames=("endpoint",))
+        latency = registry.histogram("demo_seconds", "Latency.", buckets=(0.1, 1.0))
+        requests.inc(endpoint="/chat/history")
+        requests.inc(endpoint="/chat/history")
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(3.0)
+
+        text = render_prometheus(merge_snapshots([registry.snapshot()]))
+
+        self.assertIn("# TYPE demo_requests_total counter", text)
+        self.assertIn('demo_requests_total{endpoint="/chat/history"} 2', text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{le="1"} 2', text)
+        self.assertIn('demo_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("demo_seconds_count 3", text)
+        self.assertIn("demo_seconds_sum 3.55", text)
+
+    def test_merges_snapshots_from_several_workers(self):
+        first, second = MetricsRegistry(), MetricsRegistry()
+        for registry, hits in ((first, 2), (second, 3)):
+            registry.counter("demo_hits_total", "Hits.").inc(hits)
+            registry.histogram("demo_seconds", "Latency.", buckets=(1.0,)).observe(0.5)
+
+        merged = merge_snapshots([first.snapshot(), second.snapshot()])
+
+        self.assertEqual(merged["demo_hits_total"]["samples"][()], 5)
+        self.assertEqual(merged["demo_seconds"]["samples"][()], ([2, 0], 1.0))
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("demo_total", "Demo.", labelnames=("path",)).inc(path='a"b\\c')
+
+        text = render_prometheus(merge_snapshots([registry.snapshot()]))
+
+        self.assertIn('demo_total{path="a\\"b\\\\c"} 1', text)
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        FakeChatStore.stores = {}
+        FakeChatStore.session_ids = []
+        FakeHTMLCache.stores = {}
+        FakeHTMLCache.session_ids = []
+
+    def test_metrics_endpoint_includes_other_workers_snapshots(self):
+        other_worker = MetricsRegistry()
+        other_worker.counter(
+            "portfolio_http_requests_total",
+            "HTTP requests handled, by route, method and status code.",
+            labelnames=("endpoint", "method", "status"),
+        ).inc(41, endpoint="/chat/history", method="GET", status="200")
+
+        fake_redis = FakeRedis()
+        fake_redis.hset(
+            metrics_module.WORKERS_KEY,
+            "other-host:1",
+            metrics_module.json.dumps({"updated": metrics_module.time.time(), "metrics": other_worker.snapshot()}),
+        )
+
+        with (
+            patch.object(redis_module, "redis_client", fake_redis),
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            portfolio_app.app.test_client() as client,
+        ):
+            client.get("/chat/history")
+            response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        text = response.get_data(as_text=True)
+        local_count = metrics_module.HTTP_REQUESTS_TOTAL.snapshot()["values"][("/chat/history", "GET", "200")]
+        self.assertIn(
+            f'portfolio_http_requests_total{{endpoint="/chat/history",method="GET",status="200"}} {int(local_count) + 41}',
+            text,
+        )
+        self.assertIn("portfolio_redis_operation_seconds", text)
+
+
+class SnapshotPublisherTests(unittest.TestCase):
+    def test_one_publisher_thread_per_process(self):
+        published = threading.Semaphore(0)
+
+        with (
+            patch.object(metrics_module, "_publisher_pid", None),
+            patch.object(metrics_module, "_publish_periodically", side_effect=published.release) as publish,
+        ):
+            metrics_module.start_snapshot_publisher()
+            metrics_module.start_snapshot_publisher()
+            with patch.object(metrics_module.os, "getpid", return_value=os.getpid() + 1):
+                # A worker forked after the publisher started needs its own
+                metrics_module.start_snapshot_publisher()
+            for _ in range(2):
+                self.assertTrue(published.acquire(timeout=1))
+
+        self.assertEqual(publish.call_count, 2)
+
+    def test_workers_that_stopped_publishing_expire_after_a_few_intervals(self):
+        fake_redis = FakeRedis()
+        now = metrics_module.time.time()
+        for worker_id, age in (("live:1", 20), ("gone:2", 40)):
+            fake_redis.hset(
+                metrics_module.WORKERS_KEY,
+                worker_id,
+                metrics_module.json.dumps({"updated": now - age, "metrics": {}}),
+            )
+
+        with (
+            patch.dict(os.environ, {"METRICS_PUBLISH_INTERVAL": "10"}),
+            patch.object(redis_module, "redis_client", fake_redis),
+        ):
+            os.environ.pop("METRICS_WORKER_TTL", None)
+            self.assertEqual(len(metrics_module._worker_snapshots()), 1)
+
+        self.assertEqual(list(fake_redis.hgetall(metrics_module.WORKERS_KEY)), ["live:1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
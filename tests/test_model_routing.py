@@ -0,0 +1,175 @@
+import asyncio
+import unittest
+from typing import Any
+
+from strands.models import Model
+
+from clients.llm.routing_provider import ProviderRouter, RoutingModel
+from utils.metrics import LLM_HEDGES_TOTAL, LLM_PROVIDER_CALLS_TOTAL, LLM_PROVIDER_FIRST_EVENT_SECONDS
+
+
+class FakeModel(Model):
+    """Streams `text` after `delay` seconds, or raises `error` before streaming"""
+
+    def __init__(self, text: str, delay: float = 0.0, error: Exception | None = None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.config = {"model_id": text}
+        self.calls = 0
+        self.closed = False
+
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> Any:
+        return self.config
+
+    async def stream(self, *args: Any, **kwargs: Any):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise self.error
+            yield {"contentBlockDelta": {"delta": {"text": self.text}}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+        finally:
+            self.closed = True
+
+    async def structured_output(self, *args: Any, **kwargs: Any):
+        yield {"output": self.text}
+
+
+def routing_model(models: dict[str, FakeModel], hedge_delay: float | None = 0.02) -> RoutingModel:
+    return RoutingModel(ProviderRouter(list(models)), models, hedge_delay)
+
+
+def collect(model: RoutingModel) -> list[dict]:
+    async def run():
+        events = [event async for event in model.stream([], None, None)]
+        # Let cancelled attempts finish closing
+        await asyncio.sleep(0.05)
+        return events
+
+    return asyncio.run(run())
+
+
+def text_of(events: list[dict]) -> str:
+    return "".join(event["contentBlockDelta"]["delta"]["text"] for event in events if "contentBlockDelta" in event)
+
+
+class HedgingTests(unittest.TestCase):
+    def test_fast_primary_is_not_hedged(self):
+        models = {"fast": FakeModel("fast"), "backup": FakeModel("backup")}
+
+        self.assertEqual(text_of(collect(routing_model(models))), "fast")
+        self.assertEqual(models["backup"].calls, 0)
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        models = {"slow": FakeModel("slow", delay=1.0), "backup": FakeModel("backup")}
+        hedges_before = LLM_HEDGES_TOTAL.snapshot()["values"].get(("slow", "backup", "hedge"), 0)
+        cancelled_before = LLM_PROVIDER_CALLS_TOTAL.snapshot()["values"].get(("slow", "cancelled"), 0)
+
+        self.assertEqual(text_of(collect(routing_model(models))), "backup")
+        self.assertTrue(models["slow"].closed)
+        self.assertEqual(LLM_HEDGES_TOTAL.snapshot()["values"][("slow", "backup", "hedge")], hedges_before + 1)
+        self.assertEqual(LLM_PROVIDER_CALLS_TOTAL.snapshot()["values"][("slow", "cancelled")], cancelled_before + 1)
+
+    def test_hedging_disabled_waits_for_primary(self):
+        models = {"slow": FakeModel("slow", delay=0.05), "backup": FakeModel("backup")}
+
+        self.assertEqual(text_of(collect(routing_model(models, hedge_delay=None))), "slow")
+        self.assertEqual(models["backup"].calls, 0)
+
+
+class FailoverTests(unittest.TestCase):
+    def test_error_before_first_event_fails_over(self):
+        models = {"broken": FakeModel("broken", error=RuntimeError("throttled")), "backup": FakeModel("backup")}
+        model = routing_model(models, hedge_delay=None)
+
+        self.assertEqual(text_of(collect(model)), "backup")
+        self.assertEqual(model.router.stats["broken"].error_rate(), 1.0)
+
+    def test_every_provider_failing_raises_the_last_error(self):
+        models = {
+            "a": FakeModel("a", error=RuntimeError("a down")),
+            "b": FakeModel("b", error=RuntimeError("b down")),
+        }
+
+        with self.assertRaisesRegex(RuntimeError, "b down"):
+            collect(routing_model(models))
+
+    def test_structured_output_fails_over(self):
+        class BrokenStructured(FakeModel):
+            async def structured_output(self, *args: Any, **kwargs: Any):
+                raise RuntimeError("down")
+                yield
+
+        models = {"broken": BrokenStructured("broken"), "backup": FakeModel("backup")}
+
+        async def run():
+            return [event async for event in routing_model(models).structured_output(None, [])]
+
+        self.assertEqual(asyncio.run(run()), [{"output": "backup"}])
+
+
+class ProviderRouterTests(unittest.TestCase):
+    def test_unmeasured_providers_are_tried_before_measured_ones(self):
+        router = ProviderRouter(["a", "b"])
+        router.record_success("a", 0.5)
+
+        self.assertEqual(router.order(), ["b", "a"])
+
+    def test_faster_provider_is_preferred(self):
+        router = ProviderRouter(["a", "b"])
+        router.record_success("a", 0.9)
+        router.record_success("b", 0.2)
+
+        self.assertEqual(router.order(), ["b", "a"])
+
+    def test_failing_provider_is_demoted(self):
+        router = ProviderRouter(["a", "b"], min_calls=3)
+        router.record_success("b", 2.0)
+        for _ in range(3):
+            router.record_error("a")
+
+        self.assertFalse(router.healthy("a"))
+        self.assertEqual(router.order(), ["b", "a"])
+
+    def test_errors_age_out_of_the_window(self):
+        router = ProviderRouter(["a", "b"], window_seconds=0.0, min_calls=1)
+        router.record_error("a")
+
+        self.assertTrue(router.healthy("a"))
+
+    def test_first_event_times_are_observed_per_call(self):
+        before = LLM_PROVIDER_FIRST_EVENT_SECONDS.snapshot()
+        router = ProviderRouter(["timed"])
+        router.record_success("timed", 0.2)
+        router.record_success("timed", 0.4)
+        after = LLM_PROVIDER_FIRST_EVENT_SECONDS.snapshot()
+
+        self.assertEqual(sum(after["counts"][("timed",)]) - sum(before["counts"].get(("timed",), [])), 2)
+        self.assertAlmostEqual(after["sums"][("timed",)] - before["sums"].get(("timed",), 0), 0.6)
+
+
+class RoutingConfigTests(unittest.TestCase):
+    def test_shared_params_pass_through(self):
+        models = {"a": FakeModel("a"), "b": FakeModel("b")}
+        models["a"].config.update(params={"temperature": 0, "max_tokens": 100})
+        models["b"].config.update(temperature=0, params={"max_tokens": 200})
+
+        self.assertEqual(routing_model(models).get_config(), {"model_id": "routing:a,b", "params": {"temperature": 0}})
+
+    def test_response_cache_sees_the_temperature(self):
+        from clients.llm.response_cache import sampling_temperature
+
+        models = {"a": FakeModel("a"), "b": FakeModel("b")}
+        model = routing_model(models)
+        model.update_config(params={"temperature": 0})
+
+        self.assertEqual(sampling_temperature(model.get_config()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
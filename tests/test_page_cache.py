@@ -0,0 +1,91 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from agents.orchestrator.tools import orchestrator_tools
+from fake_redis import FakeRedis
+from utils import page_cache as page_cache_module
+from utils.page_cache import PageCache, normalize_instruction
+
+
+class PageCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(page_cache_module, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_normalized_instructions_share_an_entry(self):
+        cache = PageCache()
+        cache.add("Display all projects.", "7", "<section>projects</section>")
+
+        entry = cache.get("  display ALL projects ", "7")
+
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry.html, "<section>projects</section>")
+        self.assertEqual(normalize_instruction("Show   me, your SKILLS!"), "show me your skills")
+
+    def test_kb_version_change_misses(self):
+        cache = PageCache()
+        cache.add("Display all projects", "1", "<p>old</p>")
+
+        self.assertIsNone(cache.get("Display all projects", "2"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = PageCache(max_entries=2)
+        cache.add("first", "1", "<p>1</p>")
+        cache.add("second", "1", "<p>2</p>")
+        cache.get("first", "1")
+        cache.add("third", "1", "<p>3</p>")
+
+        self.assertIsNotNone(cache.get("first", "1"))
+        self.assertIsNone(cache.get("second", "1"))
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["hits"], 2)
+
+
+class SharedPageGenerationTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(page_cache_module, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cache_hit_skips_agent_creation_and_retrieval(self):
+        page_cache = PageCache()
+        page_cache.add("Display all projects", "3", "<section>cached</section>")
+
+        with (
+            patch.object(orchestrator_tools, "page_cache", page_cache),
+            patch.object(orchestrator_tools, "get_kb_version", return_value="3"),
+            patch.object(orchestrator_tools, "create_html_generation_agent") as create_agent,
+            patch.object(orchestrator_tools, "get_retrieval_client") as get_retrieval_client,
+        ):
+            result = json.loads(
+                orchestrator_tools.generate_html_from_request(
+                    instruction="display all projects",
+                    refine_previous=False,
+                    requires_external_data=True,
+                )
+            )
+
+        self.assertEqual(result, {"success": True, "html": "<section>cached</section>"})
+        create_agent.assert_not_called()
+        get_retrieval_client.assert_not_called()
+
+    def test_refinements_bypass_shared_cache(self):
+        with patch.object(orchestrator_tools, "get_kb_version") as get_kb_version:
+            kb_version, cached = orchestrator_tools._lookup_shared_page(
+                "Make it blue", True, False, lambda message: None
+            )
+
+        self.assertIsNone(kb_version)
+        self.assertIsNone(cached)
+        get_kb_version.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
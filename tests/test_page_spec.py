@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from lxml import html as lxml_html
+
+from agents.html_generation.html_generation_agent import (
+    HTMLGenerationResult,
+    PageSection,
+    PageSpec,
+    PageSpecResult,
+    SpecItem,
+    SpecLink,
+)
+from agents.html_generation.page_renderer import render_page_spec
+from agents.orchestrator.tools import orchestrator_tools
+from test_html_patch import FakeHTMLCache, fake_agent_context
+from utils.metrics import HTML_FIRST_PAINT_SECONDS, HTML_GENERATION_OUTPUT_TOKENS
+from utils.timing import StageTimer
+
+SPEC = PageSpec(
+    title="Projects",
+    subtitle="Things I have built",
+    sections=[
+        PageSection(
+            component="cards",
+            heading="Machine learning",
+            items=[
+                SpecItem(
+                    title="Portfolio <Agent>",
+                    description="An agentic portfolio site.",
+                    tags=["Python", "Strands"],
+                    links=[
+                        SpecLink(label="Code", url="https://github.com/example/portfolio"),
+                        SpecLink(label="Bad", url="javascript:alert(1)"),
+                    ],
+                )
+            ],
+        ),
+        PageSection(component="timeline", heading="Experience", items=[SpecItem(title="Engineer", meta="2022 - 2024")]),
+    ],
+)
+
+
+class PageRendererTests(unittest.TestCase):
+    def test_spec_renders_each_component(self):
+        page = lxml_html.fromstring(render_page_spec(SPEC))
+
+        self.assertEqual(page.xpath("//h1/text()"), ["Projects"])
+        self.assertEqual(len(page.xpath("//article[@class='spec-card']")), 1)
+        self.assertEqual(page.xpath("//span[@class='spec-tag']/text()"), ["Python", "Strands"])
+        self.assertEqual(page.xpath("//li[@class='spec-timeline-entry']//p[@class='spec-item-meta']/text()"), ["2022 - 2024"])
+
+    def test_text_is_escaped_and_unsafe_links_dropped(self):
+        html = render_page_spec(SPEC)
+
+        self.assertIn("Portfolio &lt;Agent&gt;", html)
+        self.assertIn('href="https://github.com/example/portfolio"', html)
+        self.assertNotIn("javascript:", html)
+
+    def test_leading_hero_replaces_the_page_header(self):
+        spec = PageSpec(title="About", sections=[PageSection(component="hero", heading="Hi, I'm Ambri", body="One\n\nTwo")])
+        page = lxml_html.fromstring(render_page_spec(spec))
+
+        self.assertEqual(page.xpath("//h1/text()"), ["Hi, I'm Ambri"])
+        self.assertEqual(page.xpath("//p[@class='tagline']/text()"), ["One", "Two"])
+
+
+class SpecGenerationTests(unittest.TestCase):
+    def generate(self, spec_result, refine_previous=False, mode="spec"):
+        spec_context, spec_agent = fake_agent_context(spec_result)
+        generation_context, generation_agent = fake_agent_context(
+            HTMLGenerationResult(success=True, html="<p>free-form</p>")
+        )
+        with (
+            patch.dict(os.environ, {"HTML_GENERATION_MODE": mode, "HTML_PATCH_REFINEMENT": "false"}),
+            patch.object(orchestrator_tools, "_page_spec_agent", spec_context),
+            patch.object(orchestrator_tools, "_generation_agent", generation_context),
+        ):
+            result = asyncio.run(orchestrator_tools._generate_page(
+                "Show projects", refine_previous, False, FakeHTMLCache(), None, lambda message: None, StageTimer()
+            ))
+        return json.loads(result), spec_agent, generation_agent
+
+    def test_fresh_page_is_rendered_from_the_spec(self):
+        before = HTML_GENERATION_OUTPUT_TOKENS.snapshot()["sums"].get(("spec",), 0)
+
+        result, _, generation_agent = self.generate(PageSpecResult(success=True, page=SPEC))
+
+        self.assertTrue(result["success"])
+        self.assertIn('class="spec-page"', result["html"])
+        generation_agent.assert_not_called()
+        self.assertEqual(HTML_GENERATION_OUTPUT_TOKENS.snapshot()["sums"][("spec",)], before + 10)
+
+    def test_declined_or_failed_spec_falls_back_to_free_form_html(self):
+        for spec_result in (
+            PageSpecResult(success=False, error_message="needs a custom layout"),
+            PageSpecResult(success=True, page=PageSpec(title="Empty", sections=[])),
+        ):
+            with self.subTest(spec_result=spec_result):
+                result, _, generation_agent = self.generate(spec_result)
+
+                self.assertEqual(result["html"], "<p>free-form</p>")
+                generation_agent.assert_called_once()
+
+    def test_refinements_and_html_mode_skip_the_spec(self):
+        for kwargs in ({"refine_previous": True}, {"mode": "html"}):
+            with self.subTest(**kwargs):
+                result, spec_agent, _ = self.generate(PageSpecResult(success=True, page=SPEC), **kwargs)
+
+                self.assertEqual(result["html"], "<p>free-form</p>")
+                spec_agent.assert_not_called()
+
+    def test_html_is_the_default_mode(self):
+        with patch.dict(os.environ):
+            os.environ.pop("HTML_GENERATION_MODE", None)
+            self.assertEqual(orchestrator_tools._html_generation_mode(), "html")
+
+    def test_first_paint_is_recorded_by_how_the_page_was_made(self):
+        def paints(mode):
+            return sum(HTML_FIRST_PAINT_SECONDS.snapshot()["counts"].get((mode,), []))
+
+        before = {mode: paints(mode) for mode in ("spec", "spec_fallback", "html")}
+        self.generate(PageSpecResult(success=True, page=SPEC))
+        self.generate(PageSpecResult(success=False, error_message="needs a custom layout"))
+        self.generate(PageSpecResult(success=True, page=SPEC), mode="html")
+
+        self.assertEqual({mode: paints(mode) - count for mode, count in before.items()},
+                         {"spec": 1, "spec_fallback": 1, "html": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from strands import Agent
+
+from agents.html_generation.html_generation_agent import HTMLGenerationResult
+from clients.llm.base import CACHE_POINT
+from clients.llm.bedrock_provider import BedrockLLMProvider
+from clients.llm.gemini_provider import GeminiLLMProvider
+from clients.llm.litellm_provider import LiteLLMProvider
+from clients.llm.openai_provider import OpenAILLMProvider
+from clients.llm.simulated_provider import SimulatedModel
+from utils.metrics import LLM_CALL_SECONDS, LLM_INPUT_TOKENS_TOTAL
+from utils.model_usage import UsageReportingModel
+
+
+class PromptCacheMarkingTests(unittest.TestCase):
+    def test_explicit_providers_add_a_cache_point_after_the_system_prompt(self):
+        self.assertEqual(BedrockLLMProvider().system_prompt("static"), [{"text": "static"}, CACHE_POINT])
+        self.assertEqual(
+            LiteLLMProvider(model_id="anthropic/claude-haiku").system_prompt("static"),
+            [{"text": "static"}, CACHE_POINT],
+        )
+
+    def test_implicit_providers_and_disabled_caching_send_plain_prompts(self):
+        self.assertEqual(OpenAILLMProvider().system_prompt("static"), "static")
+        self.assertEqual(GeminiLLMProvider(api_key="key").system_prompt("static"), "static")
+        self.assertEqual(LiteLLMProvider(model_id="gemini/gemini-2.5-flash").system_prompt("static"), "static")
+        with patch.dict(os.environ, {"PROMPT_CACHE_ENABLED": "false"}):
+            self.assertEqual(BedrockLLMProvider().system_prompt("static"), "static")
+
+    def test_openai_cached_prompt_tokens_are_reported(self):
+        model = OpenAILLMProvider().create_model()
+        usage = SimpleNamespace(
+            prompt_tokens=2000,
+            completion_tokens=10,
+            total_tokens=2010,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=1536),
+        )
+
+        chunk = model.format_chunk({"chunk_type": "metadata", "data": usage})
+
+        self.assertEqual(chunk["metadata"]["usage"]["cacheReadInputTokens"], 1536)
+
+
+class UsageReportingTests(unittest.TestCase):
+    def test_repeated_system_prompt_reads_from_cache(self):
+        system_prompt = [{"text": "You generate portfolio pages. " * 20}, CACHE_POINT]
+        reads_before = LLM_INPUT_TOKENS_TOTAL.snapshot()["values"].get(("simulated", "cache_read"), 0)
+
+        usages = []
+        for _ in range(2):
+            model = UsageReportingModel(SimulatedModel(latency_ms=0, tokens_per_second=0), "simulated")
+            result = Agent(model=model, system_prompt=system_prompt, callback_handler=None)(
+                "Create a page",
+                structured_output_model=HTMLGenerationResult,
+            )
+            usages.append(result.metrics.accumulated_usage)
+
+        self.assertNotIn("cacheReadInputTokens", usages[0])
+        self.assertGreater(usages[1]["cacheReadInputTokens"], 0)
+        self.assertEqual(
+            LLM_INPUT_TOKENS_TOTAL.snapshot()["values"][("simulated", "cache_read")],
+            reads_before + usages[1]["cacheReadInputTokens"],
+        )
+        self.assertIn(("simulated", "first_token", "hit"), LLM_CALL_SECONDS.snapshot()["sums"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import app as portfolio_app
+from fake_redis import FakeRedis
+from tests.test_flask_streaming import FakeChatStore, FakeHTMLCache
+from utils.admission import AdmissionController
+from utils import kb_version as kb_version_module
+from utils import quick_start_pages as quick_start_module
+from utils.quick_start_pages import (
+    QUICK_START_PROMPTS,
+    get_quick_start_page,
+    load_page,
+    prerender_pages,
+    schedule_prerender,
+)
+
+
+def fake_generation(instruction, refine_previous, requires_external_data):
+    return json.dumps({"success": True, "html": f"<section>{instruction}</section>"})
+
+
+class QuickStartPagesTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        for module in (quick_start_module, kb_version_module):
+            patcher = patch.object(module, "redis_client", self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        generation = patch(
+            "agents.orchestrator.tools.orchestrator_tools.generate_html_from_request",
+            side_effect=fake_generation,
+        )
+        self.generation = generation.start()
+        self.addCleanup(generation.stop)
+
+    def test_prerender_stores_every_card_for_current_kb_version(self):
+        outcomes = prerender_pages()
+
+        self.assertEqual(outcomes, {name: "rendered" for name in QUICK_START_PROMPTS})
+        page = load_page("projects", "0")
+        self.assertEqual(page.prompt, "Show me your projects")
+        self.assertIn("Display all projects", page.html)
+
+    def test_pages_are_only_rerendered_after_reindex(self):
+        prerender_pages()
+        self.assertEqual(set(prerender_pages().values()), {"current"})
+
+        kb_version_module.bump_kb_version()
+
+        self.assertEqual(set(prerender_pages().values()), {"rendered"})
+        self.assertEqual(self.generation.call_count, 2 * len(QUICK_START_PROMPTS))
+
+    def test_failed_page_is_reported_and_not_stored(self):
+        self.generation.side_effect = lambda **kwargs: json.dumps({"success": False, "error_message": "boom"})
+
+        self.assertEqual(prerender_pages()["skills"], "failed: boom")
+        self.assertIsNone(load_page("skills", "0"))
+
+    def test_missing_page_schedules_a_single_background_render(self):
+        with patch.object(quick_start_module.threading, "Thread") as thread:
+            self.assertIsNone(get_quick_start_page("projects"))
+            self.assertFalse(schedule_prerender())
+
+        thread.assert_called_once()
+        self.assertIsNone(get_quick_start_page("unknown"))
+
+    def test_background_render_takes_an_admission_slot_per_page(self):
+        admission = AdmissionController(max_concurrency=1, max_queue=0)
+        running = []
+        self.generation.side_effect = lambda **kwargs: running.append(admission.stats()["running"]) or fake_generation(**kwargs)
+
+        self.assertEqual(set(prerender_pages(admission=admission).values()), {"rendered"})
+        self.assertEqual(running, [1] * len(QUICK_START_PROMPTS))
+        self.assertEqual(admission.stats()["running"], 0)
+
+    def test_background_render_stops_when_admission_is_full(self):
+        busy = AdmissionController(max_concurrency=0, max_queue=0)
+
+        outcomes = prerender_pages(admission=busy)
+
+        self.assertEqual(list(outcomes.values()), ["busy"])
+        self.generation.assert_not_called()
+
+    def test_render_lock_is_released_only_by_its_owner(self):
+        with patch.object(quick_start_module.threading, "Thread") as thread:
+            self.assertTrue(schedule_prerender())
+        token = thread.call_args.kwargs["args"][0]
+
+        # Our lock expired and another worker took it
+        self.redis.set(quick_start_module.LOCK_KEY, "other-worker")
+        quick_start_module._release_lock(token)
+        self.assertEqual(self.redis.get(quick_start_module.LOCK_KEY), "other-worker")
+
+        self.redis.set(quick_start_module.LOCK_KEY, token)
+        quick_start_module._release_lock(token)
+        self.assertIsNone(self.redis.get(quick_start_module.LOCK_KEY))
+
+
+class QuickStartEndpointTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        FakeChatStore.stores = {}
+        FakeHTMLCache.stores = {}
+
+    def test_prerendered_page_is_served_and_recorded_in_history(self):
+        page = quick_start_module.QuickStartPage(
+            name="projects",
+            prompt="Show me your projects",
+            chat_message="Here are the projects from the portfolio.",
+            html="<section>Projects</section>",
+            kb_version="0",
+            timestamp="2026-01-01T00:00:00+00:00",
+        )
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "get_quick_start_page", return_value=page),
+            portfolio_app.app.test_client() as client,
+        ):
+            data = client.post("/quick-start/projects", json={"history_version": 1}).get_json()
+
+        self.assertEqual(data["html"], "<section>Projects</section>")
+        self.assertEqual(
+            [m["content"] for m in data["history_delta"]["messages"]],
+            ["Show me your projects", "Here are the projects from the portfolio."],
+        )
+        html_cache = next(iter(FakeHTMLCache.stores.values()))
+        self.assertEqual(html_cache[0].query, "Show me your projects")
+
+    def test_missing_page_returns_404_for_live_fallback(self):
+        with (
+            patch.object(portfolio_app, "get_quick_start_page", return_value=None),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.post("/quick-start/projects")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_does_not_record_a_turn(self):
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.get("/quick-start/projects")
+
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(FakeChatStore.stores, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+from strands.models import Model
+
+from clients.llm import response_cache
+from clients.llm.response_cache import (
+    DiskResponseCache,
+    RedisResponseCache,
+    ResponseCachingModel,
+    response_key,
+)
+from fake_redis import FakeRedis
+from utils.metrics import LLM_RESPONSE_CACHE_SECONDS
+
+
+class CountingModel(Model):
+    def __init__(self, temperature: float | None = 0.0, fail: bool = False):
+        self.config = {"model_id": "counting", "params": {} if temperature is None else {"temperature": temperature}}
+        self.fail = fail
+        self.calls = 0
+
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> Any:
+        return self.config
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs: Any):
+        self.calls += 1
+        yield {"contentBlockDelta": {"delta": {"text": f"answer {self.calls}"}}}
+        if self.fail:
+            raise RuntimeError("connection reset")
+        yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {"metadata": {"usage": {"inputTokens": 100, "outputTokens": 5, "totalTokens": 105}, "metrics": {"latencyMs": 900}}}
+
+    async def structured_output(self, *args: Any, **kwargs: Any):
+        yield {"output": None}
+
+
+def call(model: Model, text: str = "Show me your projects", system_prompt: str = "You are an agent") -> list[dict]:
+    async def run():
+        messages = [{"role": "user", "content": [{"text": text}]}]
+        return [event async for event in model.stream(messages, None, system_prompt)]
+
+    return asyncio.run(run())
+
+
+def text_of(events: list[dict]) -> str:
+    return "".join(event["contentBlockDelta"]["delta"]["text"] for event in events if "contentBlockDelta" in event)
+
+
+class ResponseKeyTests(unittest.TestCase):
+    def test_key_covers_model_prompt_and_schema(self):
+        config = {"model_id": "m", "params": {"temperature": 0}}
+        messages = [{"role": "user", "content": [{"text": "hi"}]}]
+        schema = [{"name": "HTMLGenerationResult", "inputSchema": {"json": {"type": "object"}}}]
+        key = response_key(config, messages, schema, "system")
+
+        self.assertEqual(key, response_key(dict(reversed(list(config.items()))), messages, schema, "system"))
+        self.assertNotEqual(key, response_key({**config, "model_id": "other"}, messages, schema, "system"))
+        self.assertNotEqual(key, response_key(config, messages, schema, "other system"))
+        self.assertNotEqual(key, response_key(config, messages, None, "system"))
+
+
+class ResponseCachingModelTests(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(response_cache, "redis_client", FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = RedisResponseCache(max_entries=10)
+
+    def test_identical_call_is_replayed_without_usage(self):
+        inner = CountingModel()
+        model = ResponseCachingModel(inner, self.cache)
+        hits_before = sum(LLM_RESPONSE_CACHE_SECONDS.snapshot()["counts"].get(("hit",), [0]))
+
+        first = call(model)
+        second = call(model)
+
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(text_of(second), text_of(first))
+        self.assertEqual(second[-1]["metadata"]["usage"]["inputTokens"], 0)
+        self.assertEqual(sum(LLM_RESPONSE_CACHE_SECONDS.snapshot()["counts"][("hit",)]), hits_before + 1)
+
+    def test_different_messages_miss(self):
+        inner = CountingModel()
+        model = ResponseCachingModel(inner, self.cache)
+
+        call(model, "Show me your projects")
+        call(model, "Show me your skills")
+
+        self.assertEqual(inner.calls, 2)
+
+    def test_sampled_calls_bypass_unless_enabled(self):
+        for temperature in (0.7, None):
+            inner = CountingModel(temperature=temperature)
+            model = ResponseCachingModel(inner, self.cache)
+            call(model)
+            call(model)
+            self.assertEqual(inner.calls, 2)
+
+        inner = CountingModel(temperature=0.7)
+        with patch.dict(os.environ, {"LLM_RESPONSE_CACHE_SAMPLED": "true"}):
+            model = ResponseCachingModel(inner, self.cache)
+            call(model)
+            call(model)
+        self.assertEqual(inner.calls, 1)
+
+    def test_failed_stream_is_not_cached(self):
+        inner = CountingModel(fail=True)
+        model = ResponseCachingModel(inner, self.cache)
+
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                call(model)
+
+        self.assertEqual(inner.calls, 2)
+
+    def test_redis_cache_evicts_least_recently_used(self):
+        cache = RedisResponseCache(max_entries=2)
+        cache.set("a", [{"n": 1}])
+        cache.set("b", [{"n": 2}])
+        cache.get("a")
+        cache.set("c", [{"n": 3}])
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [{"n": 1}])
+
+
+class DiskResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_responses_survive_a_new_cache_instance(self):
+        DiskResponseCache(self.directory).set("key", [{"n": 1}])
+
+        self.assertEqual(DiskResponseCache(self.directory).get("key"), [{"n": 1}])
+
+    def test_expired_entries_are_dropped(self):
+        cache = DiskResponseCache(self.directory, ttl=60)
+        cache.set("key", [{"n": 1}])
+
+        with patch.object(response_cache.time, "time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("key"))
+        self.assertFalse(os.listdir(self.directory))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = DiskResponseCache(self.directory, max_entries=2)
+        cache.set("a", [{"n": 1}])
+        cache.set("b", [{"n": 2}])
+        os.utime(os.path.join(self.directory, "a.json"), (time.time() + 5, time.time() + 5))
+        cache.set("c", [{"n": 3}])
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ["a.json", "c.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
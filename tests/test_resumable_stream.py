@@ -0,0 +1,192 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+from agents.orchestrator.orchestrator_agent import PortfolioAgentResult
+import app as portfolio_app
+import asgi as portfolio_asgi
+from test_asgi_streaming import parse_sse_text
+from test_flask_streaming import FakeChatStore, FakeHTMLCache, patch_job_streams
+from utils.chat_jobs import ChatJobEvents, follow_job_events
+
+
+def parse_sse_ids(raw: str) -> list[str]:
+    return [
+        line[4:]
+        for block in raw.split("\n\n")
+        for line in block.split("\n")
+        if line.startswith("id: ")
+    ]
+
+
+class ResumableStreamTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        FakeChatStore.stores = {}
+        FakeChatStore.session_ids = []
+        FakeHTMLCache.stores = {}
+        FakeHTMLCache.session_ids = []
+        patch_job_streams(self)
+        self.calls = []
+
+    def fake_run_portfolio_request(self, user_action, html_cache=None, progress_callback=None, chat_history=None):
+        self.calls.append(user_action)
+        progress_callback("Synthetic progress")
+        return PortfolioAgentResult(success=True, chat_message="Done", html="<section>page</section>")
+
+    def patched_app(self):
+        return (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", self.fake_run_portfolio_request),
+        )
+
+    def test_every_event_has_an_id_and_resume_replays_after_last_event_id(self):
+        chat_patch, cache_patch, run_patch = self.patched_app()
+        with chat_patch, cache_patch, run_patch, portfolio_app.app.test_client() as client:
+            first = client.post("/chat/stream", json={"instruction": "Show projects", "request_id": "req-1"})
+            first_raw = first.get_data(as_text=True)
+            event_ids = parse_sse_ids(first_raw)
+
+            resumed = client.get(
+                "/chat/stream/req-1",
+                headers={"Last-Event-ID": event_ids[1]},
+            )
+            resumed_raw = resumed.get_data(as_text=True)
+
+        self.assertEqual(first.headers["X-Chat-Job-Id"], "req-1")
+        self.assertEqual(len(event_ids), len(parse_sse_text(first_raw)))
+        self.assertEqual(parse_sse_ids(resumed_raw), event_ids[2:])
+        self.assertEqual(parse_sse_text(resumed_raw)[-1]["status"], "complete")
+
+    def test_resubmitting_same_request_id_does_not_run_agent_again(self):
+        chat_patch, cache_patch, run_patch = self.patched_app()
+        with chat_patch, cache_patch, run_patch, portfolio_app.app.test_client() as client:
+            client.post("/chat/stream", json={"instruction": "Show projects", "request_id": "req-2"}).get_data()
+            again = client.post("/chat/stream", json={"instruction": "Show projects", "request_id": "req-2"})
+            events = parse_sse_text(again.get_data(as_text=True))
+
+        self.assertEqual(self.calls, ["Show projects"])
+        self.assertEqual(events[0]["status"], "started")
+        self.assertEqual(events[-1]["status"], "complete")
+
+    def test_job_finishes_after_client_disconnects(self):
+        release_agent = threading.Event()
+
+        def slow_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
+            release_agent.wait(timeout=5)
+            return PortfolioAgentResult(success=True, chat_message="Finished anyway", html="<p>ok</p>")
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", slow_run_portfolio_request),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.post(
+                "/chat/stream",
+                json={"instruction": "Show projects", "request_id": "req-3"},
+                buffered=False,
+            )
+            next(iter(response.response))
+            response.close()
+            release_agent.set()
+
+            resumed = client.get("/chat/stream/req-3")
+            events = parse_sse_text(resumed.get_data(as_text=True))
+
+        self.assertEqual(events[-1]["status"], "complete")
+        self.assertEqual(events[-1]["chat_message"], "Finished anyway")
+        history = next(iter(FakeChatStore.stores.values()))
+        self.assertEqual(history[-1]["content"], "Finished anyway")
+
+    def test_unknown_job_is_not_found(self):
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.get("/chat/stream/missing")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_asgi_stream_can_be_resumed_after_completion(self):
+        async def fake_run_portfolio_request_async(
+            user_action, html_cache=None, progress_callback=None, chat_history=None
+        ):
+            progress_callback("Synthetic progress")
+            return PortfolioAgentResult(success=True, chat_message="Done", html="<p>ok</p>")
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_asgi, "run_portfolio_request_async", fake_run_portfolio_request_async),
+            TestClient(portfolio_asgi.app) as client,
+        ):
+            first = client.post("/chat/stream", json={"instruction": "Show projects", "request_id": "req-4"})
+            event_ids = parse_sse_ids(first.text)
+            resumed = client.get("/chat/stream/req-4", headers={"Last-Event-ID": event_ids[-2]})
+
+        self.assertEqual(parse_sse_ids(resumed.text), event_ids[-1:])
+        self.assertEqual(parse_sse_text(resumed.text)[0]["status"], "complete")
+
+
+class ChatJobEventsTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = patch_job_streams(self)
+
+    def test_html_chunks_are_coalesced_before_other_events(self):
+        job_events = ChatJobEvents("session", "job", chunk_ms=10_000)
+        for fragment in ("<section>", "<p>hi</p>", "</section>"):
+            self.assertIsNone(job_events.append({"status": "html_chunk", "html": fragment}))
+        job_events.append({"status": "progress", "message": "Validating"})
+
+        payloads = [payload for _, payload in job_events.read_after(None)]
+        self.assertEqual(payloads, [
+            {"status": "html_chunk", "html": "<section><p>hi</p></section>"},
+            {"status": "progress", "message": "Validating"},
+        ])
+
+    def test_buffered_chunks_are_flushed_by_size_and_by_time(self):
+        job_events = ChatJobEvents("session", "job", chunk_ms=30, chunk_bytes=8)
+        self.assertIsNotNone(job_events.append({"status": "html_chunk", "html": "12345678"}))
+        job_events.append({"status": "html_chunk", "html": "tail"})
+
+        deadline = time.monotonic() + 2
+        while len(job_events.read_after(None)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([payload["html"] for _, payload in job_events.read_after(None)], ["12345678", "tail"])
+
+    def test_stream_is_trimmed_by_age_not_length(self):
+        job_events = ChatJobEvents("session", "job", ttl=60)
+        self.redis.data[job_events.key] = [("1000-0", {"data": "{}"})]
+        for index in range(20):
+            job_events.append({"status": "progress", "message": str(index)})
+
+        self.assertEqual(len(job_events.read_after(None)), 20)
+
+    def test_follower_of_another_workers_job_blocks_on_xread(self):
+        job_events = ChatJobEvents("session", "remote")
+        job_events.claim()
+        job_events.append({"status": "started", "message": "Processing request..."})
+        events = follow_job_events(job_events)
+        next(events)
+
+        def finish_on_other_worker():
+            time.sleep(0.2)
+            job_events.append({"status": "complete", "chat_message": "Done"})
+
+        threading.Thread(target=finish_on_other_worker).start()
+        started = time.monotonic()
+        with patch.object(self.redis, "xread", wraps=self.redis.xread) as xread:
+            _, payload = next(events)
+
+        self.assertEqual(payload["status"], "complete")
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(xread.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
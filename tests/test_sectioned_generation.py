@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import time
+import unittest
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agents.html_generation.html_generation_agent import (
+    HTMLGenerationResult,
+    PageSection,
+    PageSpec,
+    PageSpecResult,
+    SpecItem,
+)
+from agents.orchestrator.page_outline import page_outline
+from agents.orchestrator.tools import orchestrator_tools
+from test_html_patch import fake_agent_context
+from utils.admission import AdmissionController
+from utils.timing import StageTimer
+
+INSTRUCTION = "Display projects, work experience and technical skills"
+
+
+class PageOutlineTests(unittest.TestCase):
+    def test_multi_topic_instruction_is_split_in_order(self):
+        outline = page_outline(INSTRUCTION)
+
+        self.assertEqual([section.topic for section in outline.sections], ["projects", "experience", "skills"])
+        self.assertEqual([section.component for section in outline.sections], ["cards", "timeline", "tags"])
+        self.assertEqual(outline.title, "Projects, Experience and Skills")
+
+    def test_broad_request_covers_every_topic(self):
+        outline = page_outline("Give me an overview of everything")
+
+        self.assertEqual(len(outline.sections), 4)
+        self.assertEqual(len(page_outline("Give me an overview of everything", max_sections=2).sections), 2)
+
+    def test_single_topic_requests_are_not_split(self):
+        self.assertIsNone(page_outline("Display all projects with descriptions and technologies used"))
+        self.assertIsNone(page_outline("Make the header blue"))
+
+
+def section_agent_context(delay: float = 0.0, fail_topics: tuple[str, ...] = ()):
+    """A spec agent answering each section prompt with a one-item section after `delay`"""
+    async def invoke_async(prompt, structured_output_model=None):
+        await asyncio.sleep(delay)
+        heading = prompt.split("Describe only the ", 1)[1].split(" section", 1)[0]
+        if heading.lower() in fail_topics:
+            raise RuntimeError("model unavailable")
+        page = PageSpec(title=heading, sections=[PageSection(component="cards", items=[SpecItem(title=f"{heading} item")])])
+        return MagicMock(
+            structured_output=PageSpecResult(success=True, page=page),
+            metrics=MagicMock(accumulated_usage={"outputTokens": 25}),
+        )
+
+    @contextmanager
+    def context(*args):
+        yield MagicMock(invoke_async=invoke_async)
+
+    return context
+
+
+class SectionedGenerationTests(unittest.TestCase):
+    def generate(self, spec_context, instruction=INSTRUCTION, speculation=None):
+        events = []
+        generation_context, generation_agent = fake_agent_context(
+            HTMLGenerationResult(success=True, html="<p>one pass</p>")
+        )
+        with (
+            patch.dict(os.environ, {"HTML_GENERATION_MODE": "spec", "SECTIONED_GENERATION": "true"}),
+            patch.object(orchestrator_tools, "_page_spec_agent", spec_context),
+            patch.object(orchestrator_tools, "_generation_agent", generation_context),
+        ):
+            result = asyncio.run(orchestrator_tools._generate_page(
+                instruction, False, False, None, None, events.append, StageTimer(), speculation
+            ))
+        return json.loads(result), events, generation_agent
+
+    def test_sections_generate_concurrently_and_stream_as_they_finish(self):
+        started = time.perf_counter()
+        result, events, _ = self.generate(section_agent_context(delay=0.2))
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.5)
+        streamed = [event for event in events if isinstance(event, dict) and event["status"] == "html_section"]
+        self.assertEqual(sorted(event["index"] for event in streamed), [0, 1, 2])
+        self.assertIn({"status": "html_outline", "count": 3}, events)
+
+        html = result["html"]
+        self.assertLess(html.index("Projects item"), html.index("Experience item"))
+        self.assertLess(html.index("Experience item"), html.index("Skills item"))
+        self.assertIn("<h2>Skills</h2>", html)
+
+    def test_sections_share_a_global_concurrency_limit(self):
+        with patch.object(orchestrator_tools, "section_admission", AdmissionController("section", 1, 8)) as limit:
+            started = time.perf_counter()
+            result, _, _ = self.generate(section_agent_context(delay=0.1))
+            elapsed = time.perf_counter() - started
+
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertIn("Skills item", result["html"])
+        self.assertEqual(limit.stats()["running"], 0)
+
+    def test_speculative_retrieval_is_discarded(self):
+        speculation = MagicMock()
+
+        self.generate(section_agent_context(), speculation=speculation)
+
+        speculation.discard.assert_called_once()
+        speculation.resolve_async.assert_not_called()
+
+    def test_failed_section_is_left_out(self):
+        result, _, generation_agent = self.generate(section_agent_context(fail_topics=("experience",)))
+
+        self.assertTrue(result["success"])
+        self.assertNotIn("Experience item", result["html"])
+        self.assertIn("Skills item", result["html"])
+        generation_agent.assert_not_called()
+
+    def test_all_sections_failing_falls_back_to_one_pass(self):
+        context = section_agent_context(fail_topics=("projects", "experience", "skills"))
+        with patch.object(orchestrator_tools, "_generate_from_spec", AsyncMock(return_value=None)):
+            result, _, generation_agent = self.generate(context)
+
+        self.assertEqual(result["html"], "<p>one pass</p>")
+        generation_agent.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
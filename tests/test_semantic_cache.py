@@ -0,0 +1,68 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from agents.orchestrator import orchestrator_agent
+from fake_redis import FakeRedis
+from utils import html_cache as html_cache_module
+from utils.html_cache import HTMLCache, semantic_cache_stats
+
+
+class SemanticShortCircuitTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(html_cache_module, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cache = HTMLCache("session-1")
+        self.cache.add("Show me your projects", "<section>projects</section>", duration_ms=4200.0)
+        self.cache.add("What are your technical skills?", "<section>skills</section>", duration_ms=3100.0)
+
+    def test_similar_request_is_served_without_orchestrator(self):
+        progress = []
+
+        with patch.object(orchestrator_agent, "create_orchestrator_agent") as create_agent:
+            result = orchestrator_agent.run_portfolio_request(
+                "show me your projects!",
+                html_cache=self.cache,
+                progress_callback=progress.append,
+            )
+
+        create_agent.assert_not_called()
+        self.assertTrue(result.from_cache)
+        self.assertEqual(result.html, "<section>projects</section>")
+        self.assertEqual(self.cache.latest().query, "Show me your projects")
+        self.assertEqual(len(self.cache), 2)
+
+        stats = semantic_cache_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["saved_ms"], 4200.0)
+
+    def test_threshold_is_configurable(self):
+        with patch.dict(os.environ, {"SEMANTIC_CACHE_THRESHOLD": "0.99"}):
+            result = orchestrator_agent._semantic_cache_result(
+                "show me your projects please", self.cache, lambda message: None
+            )
+
+        self.assertIsNone(result)
+        self.assertEqual(semantic_cache_stats()["misses"], 1)
+
+    def test_near_misses_are_not_served(self):
+        for query in ("show me your python projects", "don't show me your projects"):
+            with self.subTest(query=query):
+                result = orchestrator_agent._semantic_cache_result(query, self.cache, lambda message: None)
+
+                self.assertIsNone(result)
+
+    def test_can_be_disabled(self):
+        with patch.dict(os.environ, {"SEMANTIC_CACHE_ENABLED": "false"}):
+            result = orchestrator_agent._semantic_cache_result(
+                "Show me your projects", self.cache, lambda message: None
+            )
+
+        self.assertIsNone(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from strands import Agent
+
+from agents.html_generation.html_generation_agent import HTMLGenerationResult
+from agents.orchestrator.orchestrator_agent import OrchestrationDecision
+from clients.llm.simulated_provider import SimulatedLLMProvider, SimulatedModel
+from clients.retrieval.simulated_client import SimulatedRetrievalClient
+from utils.ai_config import create_model_provider
+from utils.retrieval_config import create_retrieval_client
+
+
+class SimulatedBackendTests(unittest.TestCase):
+    def test_simulated_provider_selected_from_env(self):
+        with patch.dict(
+            os.environ,
+            {"AI_PROVIDER": "simulated", "SIMULATED_LLM_LATENCY_MS": "5", "SIMULATED_LLM_TOKENS_PER_SECOND": "0"},
+            clear=False,
+        ):
+            provider = create_model_provider()
+
+        self.assertIsInstance(provider, SimulatedLLMProvider)
+        self.assertEqual(provider.latency_ms, 5.0)
+        self.assertIsInstance(provider.create_model(), SimulatedModel)
+
+    def test_simulated_model_answers_structured_output_through_tool_use(self):
+        model = SimulatedModel(latency_ms=0, tokens_per_second=0)
+
+        decision = Agent(model=model, callback_handler=None)(
+            "Current user chat request: Show projects",
+            structured_output_model=OrchestrationDecision,
+        ).structured_output
+        page = Agent(model=model, callback_handler=None)(
+            "Create a page",
+            structured_output_model=HTMLGenerationResult,
+        ).structured_output
+
+        self.assertTrue(decision.needs_ui_change)
+        self.assertEqual(decision.instruction, "Create a page about Show projects")
+        self.assertTrue(page.success)
+        self.assertTrue(page.html.startswith("<section"))
+
+    def test_simulated_retrieval_client_returns_scored_chunks(self):
+        with patch.dict(os.environ, {"RETRIEVAL_PROVIDER": "simulated", "SIMULATED_RETRIEVAL_LATENCY_MS": "0"}):
+            client = create_retrieval_client()
+
+        chunks = client.retrieve("projects", top_k=3)
+
+        self.assertIsInstance(client, SimulatedRetrievalClient)
+        self.assertEqual(len(chunks), 3)
+        self.assertIn("projects", chunks[0].text)
+        self.assertGreater(chunks[0].score, chunks[-1].score)
+
+
+if __name__ == "__main__":
+    unittest.main()
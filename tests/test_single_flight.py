@@ -0,0 +1,248 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+from fake_redis import FakeAsyncRedis, FakeRedis
+from utils import single_flight as single_flight_module
+from utils.single_flight import SharedFlightError, SingleFlight
+
+
+class SingleFlightTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        for name, client in (("redis_client", self.redis), ("async_redis_client", FakeAsyncRedis(self.redis))):
+            patcher = patch.object(single_flight_module, name, client)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_concurrent_callers_share_one_execution_and_progress(self):
+        flight = SingleFlight(distributed=False)
+        leader_started = threading.Event()
+        release_leader = threading.Event()
+        calls = []
+
+        def job(progress):
+            calls.append(1)
+            progress("step 1")
+            leader_started.set()
+            release_leader.wait(timeout=5)
+            progress("step 2")
+            return "<p>shared</p>"
+
+        results = {}
+        progress_by_caller = {name: [] for name in ("a", "b", "c")}
+
+        def caller(name):
+            results[name] = flight.do("key", job, progress_by_caller[name].append)
+
+        leader = threading.Thread(target=caller, args=("a",))
+        leader.start()
+        leader_started.wait(timeout=5)
+        followers = [threading.Thread(target=caller, args=(name,)) for name in ("b", "c")]
+        for thread in followers:
+            thread.start()
+        while flight.stats()["followers"] < 2:
+            pass
+        release_leader.set()
+        for thread in [leader, *followers]:
+            thread.join(timeout=5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(set(results.values()), {"<p>shared</p>"})
+        for messages in progress_by_caller.values():
+            self.assertEqual(messages, ["step 1", "step 2"])
+
+    def test_async_followers_receive_leader_result(self):
+        flight = SingleFlight(distributed=False)
+        calls = []
+
+        async def job(progress):
+            calls.append(1)
+            progress("working")
+            await asyncio.sleep(0.01)
+            return "done"
+
+        async def run():
+            return await asyncio.gather(*(flight.do_async("key", job) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(run()), ["done"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_leader_failure_is_raised_in_followers(self):
+        flight = SingleFlight(distributed=False)
+
+        async def job(progress):
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(
+                *(flight.do_async("key", job) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        errors = asyncio.run(run())
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+
+    def test_distributed_leader_publishes_progress_and_result(self):
+        flight = SingleFlight(namespace="sf")
+
+        result = flight.do("key", lambda progress: progress("hello") or "value")
+
+        self.assertEqual(result, "value")
+        events = [json.loads(message) for channel, message in self.redis.published]
+        self.assertEqual(events, [
+            {"type": "progress", "message": "hello"},
+            {"type": "result", "result": "value"},
+        ])
+        self.assertIsNone(self.redis.get("sf:lock:key"))
+
+    def test_streamed_html_is_not_published_to_other_workers(self):
+        flight = SingleFlight(namespace="sf")
+        local = []
+
+        def job(progress):
+            progress("Generating HTML...")
+            progress({"status": "html_chunk", "html": "<p>"})
+            return "value"
+
+        flight.do("key", job, local.append)
+
+        events = [json.loads(message) for channel, message in self.redis.published]
+        self.assertEqual(len(local), 2)
+        self.assertEqual(events, [
+            {"type": "progress", "message": "Generating HTML..."},
+            {"type": "result", "result": "value"},
+        ])
+
+    def test_async_leader_publishes_off_the_event_loop(self):
+        flight = SingleFlight(namespace="sf")
+        publishing_threads = []
+        publish = self.redis.publish
+
+        def recording_publish(channel, message):
+            publishing_threads.append(threading.current_thread())
+            return publish(channel, message)
+
+        async def job(progress):
+            progress("step 1")
+            progress("step 2")
+            return "value"
+
+        async def run():
+            return await flight.do_async("key", job), threading.current_thread()
+
+        with patch.object(self.redis, "publish", recording_publish):
+            result, loop_thread = asyncio.run(run())
+
+        self.assertEqual(result, "value")
+        self.assertNotIn(loop_thread, publishing_threads)
+        events = [json.loads(message) for channel, message in self.redis.published]
+        self.assertEqual([event["type"] for event in events], ["progress", "progress", "result"])
+
+    def test_late_subscriber_gets_history_in_order_without_blocking_publishers(self):
+        flight = SingleFlight(distributed=False)
+        flight_state, _ = flight._join("key")
+        flight_state.publish("step 1")
+        in_callback = threading.Event()
+        release_callback = threading.Event()
+        received = []
+
+        def slow_callback(message):
+            received.append(message)
+            in_callback.set()
+            release_callback.wait(timeout=5)
+
+        subscriber = threading.Thread(target=flight_state.subscribe, args=(slow_callback,))
+        subscriber.start()
+        in_callback.wait(timeout=5)
+        # The flight lock is free while the subscriber replays its history
+        self.assertTrue(flight_state.lock.acquire(timeout=1))
+        flight_state.lock.release()
+        publisher = threading.Thread(target=flight_state.publish, args=("step 2",))
+        publisher.start()
+        release_callback.set()
+        for thread in (subscriber, publisher):
+            thread.join(timeout=5)
+
+        self.assertEqual(received, ["step 1", "step 2"])
+
+    def test_other_worker_relays_remote_leader(self):
+        flight = SingleFlight(namespace="sf")
+        self.redis.set("sf:lock:key", "other-worker")
+        progress = []
+
+        def remote_leader():
+            while not self.redis.subscribers:
+                pass
+            self.redis.publish("sf:events:key", json.dumps({"type": "progress", "message": "remote step"}))
+            self.redis.publish("sf:events:key", json.dumps({"type": "result", "result": "remote html"}))
+
+        thread = threading.Thread(target=remote_leader)
+        thread.start()
+        result = flight.do("key", lambda progress: self.fail("job must not run locally"), progress.append)
+        thread.join(timeout=5)
+
+        self.assertEqual(result, "remote html")
+        self.assertEqual(progress, ["remote step"])
+        self.assertEqual(flight.stats()["remote_followers"], 1)
+
+    def test_async_follower_relays_remote_leader_without_a_worker_thread(self):
+        flight = SingleFlight(namespace="sf")
+        self.redis.set("sf:lock:key", "other-worker")
+        progress = []
+
+        async def job(progress):
+            self.fail("job must not run locally")
+
+        def remote_leader():
+            while not self.redis.subscribers:
+                pass
+            self.redis.publish("sf:events:key", json.dumps({"type": "progress", "message": "remote step"}))
+            self.redis.publish("sf:events:key", json.dumps({"type": "result", "result": "remote html"}))
+
+        async def follow():
+            threading.Thread(target=remote_leader).start()
+            with patch.object(flight, "_wait_for_remote", side_effect=AssertionError("blocking follower used")):
+                return await flight.do_async("key", job, progress.append)
+
+        self.assertEqual(asyncio.run(follow()), "remote html")
+        self.assertEqual(progress, ["remote step"])
+
+    def test_result_of_an_earlier_flight_is_not_returned(self):
+        flight = SingleFlight(namespace="sf")
+        self.redis.set("sf:result:key", json.dumps({"token": "earlier-leader", "result": "old html"}))
+        self.redis.set("sf:lock:key", "current-leader")
+
+        def remote_leader():
+            while not self.redis.subscribers:
+                pass
+            self.redis.publish("sf:events:key", json.dumps({"type": "result", "result": "new html"}))
+
+        thread = threading.Thread(target=remote_leader)
+        thread.start()
+        result = flight.do("key", lambda progress: self.fail("job must not run locally"))
+        thread.join(timeout=5)
+
+        self.assertEqual(result, "new html")
+
+    def test_remote_error_is_raised(self):
+        flight = SingleFlight(namespace="sf")
+        self.redis.set("sf:lock:key", "other-worker")
+
+        def remote_leader():
+            while not self.redis.subscribers:
+                pass
+            self.redis.publish("sf:events:key", json.dumps({"type": "error", "message": "provider down"}))
+
+        thread = threading.Thread(target=remote_leader)
+        thread.start()
+        with self.assertRaises(SharedFlightError):
+            flight.do("key", lambda progress: "unused")
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
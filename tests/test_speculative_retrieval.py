@@ -0,0 +1,85 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+
+from clients.retrieval.base import RetrievedChunk
+from utils import speculative_retrieval as speculative_module
+from utils.metrics import SPECULATIVE_RETRIEVAL_TOTAL
+from utils.speculative_retrieval import merge_chunks, start_speculative_retrieval
+
+
+class FakeRetrievalClient:
+    def __init__(self):
+        self.queries = []
+
+    def retrieve(self, query: str, top_k: int = 10):
+        self.queries.append(query)
+        return [RetrievedChunk(text=f"chunk for {query}", score=0.5)]
+
+
+def outcome_count(outcome: str) -> float:
+    return SPECULATIVE_RETRIEVAL_TOTAL.snapshot()["values"].get((outcome,), 0)
+
+
+class SpeculativeRetrievalTests(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeRetrievalClient()
+        patcher = patch.object(speculative_module, "get_retrieval_client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_speculation_is_reused_when_message_names_the_subject(self):
+        before = outcome_count("reused")
+        speculation = start_speculative_retrieval("Tell me about your ML projects")
+
+        chunks = speculation.resolve("Display ML projects with technologies used")
+
+        self.assertEqual(chunks, [RetrievedChunk(text="chunk for Tell me about your ML projects", score=0.5)])
+        self.assertEqual(self.client.queries, ["Tell me about your ML projects"])
+        self.assertEqual(outcome_count("reused"), before + 1)
+
+    def test_unrelated_instruction_requeries_and_merges(self):
+        speculation = start_speculative_retrieval("What did you build at Acme?")
+
+        chunks = asyncio.run(speculation.resolve_async("Display work experience with dates"))
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(self.client.queries[-1], "Display work experience with dates")
+        self.assertEqual(speculation.outcome, "merged")
+
+    def test_discarded_speculation_counts_as_wasted_once(self):
+        before = outcome_count("wasted")
+        speculation = start_speculative_retrieval("Make the background darker")
+        speculation.future.result()
+
+        speculation.discard()
+        speculation.discard()
+
+        self.assertEqual(outcome_count("wasted"), before + 1)
+
+    def test_resolved_speculation_is_not_wasted(self):
+        speculation = start_speculative_retrieval("Show me your projects")
+        speculation.resolve("Display all projects")
+        wasted = outcome_count("wasted")
+
+        speculation.discard()
+
+        self.assertEqual(outcome_count("wasted"), wasted)
+
+    def test_messages_without_content_or_disabled_do_not_speculate(self):
+        self.assertIsNone(start_speculative_retrieval("Can you show me more?"))
+        with patch.dict(os.environ, {"SPECULATIVE_RETRIEVAL_ENABLED": "false"}):
+            self.assertIsNone(start_speculative_retrieval("Show me your projects"))
+
+    def test_merge_keeps_best_score_per_chunk(self):
+        merged = merge_chunks(
+            [RetrievedChunk(text="a", score=0.2), RetrievedChunk(text="b", score=0.9)],
+            [RetrievedChunk(text="a", score=0.7)],
+        )
+
+        self.assertEqual([(chunk.text, chunk.score) for chunk in merged], [("b", 0.9), ("a", 0.7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+
+from agents.orchestrator.orchestrator_agent import PortfolioAgentResult
+import app as portfolio_app
+from tests.test_flask_streaming import FakeChatStore, FakeHTMLCache, parse_sse_events, patch_job_streams
+from utils.timing import StageTimer, server_timing_header
+
+
+class StageTimerTests(unittest.TestCase):
+    def test_repeated_stages_accumulate_and_format_as_server_timing(self):
+        timer = StageTimer()
+        timer.record("retrieval", 10.04)
+        timer.record("retrieval", 5.0)
+        timer.record("generation", 120.26)
+
+        self.assertEqual(timer.as_dict(), {"retrieval": 15.0, "generation": 120.3})
+        self.assertEqual(timer.server_timing_header(), "retrieval;dur=15.0, generation;dur=120.3")
+
+    def test_stage_is_recorded_when_block_raises(self):
+        timer = StageTimer()
+
+        with self.assertRaises(ValueError):
+            with timer.stage("validation"):
+                raise ValueError("bad html")
+
+        self.assertIn("validation", timer.as_dict())
+
+    def test_header_is_empty_without_durations(self):
+        self.assertEqual(server_timing_header({}), "")
+
+
+class TimingEndpointTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        FakeChatStore.stores = {}
+        FakeChatStore.session_ids = []
+        FakeHTMLCache.stores = {}
+        FakeHTMLCache.session_ids = []
+        patch_job_streams(self)
+
+    def test_complete_event_carries_stage_timings_and_total(self):
+        def fake_run_portfolio_request(user_action, html_cache=None, progress_callback=None, chat_history=None):
+            return PortfolioAgentResult(
+                success=True,
+                chat_message="Done",
+                html="<section></section>",
+                timings={"decision": 812.5, "retrieval": 40.2, "generation": 2301.0},
+            )
+
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            patch.object(portfolio_app, "run_portfolio_request", fake_run_portfolio_request),
+            portfolio_app.app.test_client() as client,
+        ):
+            response = client.post("/chat/stream", json={"instruction": "Show projects"})
+            events = parse_sse_events(response)
+
+        timings = events[-1]["timings"]
+        self.assertEqual(timings["decision"], 812.5)
+        self.assertEqual(timings["generation"], 2301.0)
+        self.assertIn("total", timings)
+        self.assertNotIn("Server-Timing", response.headers)
+
+    def test_non_streaming_endpoints_send_server_timing_header(self):
+        with (
+            patch.object(portfolio_app, "ChatStore", FakeChatStore),
+            patch.object(portfolio_app, "HTMLCache", FakeHTMLCache),
+            portfolio_app.app.test_client() as client,
+        ):
+            history = client.get("/chat/history")
+            ui_history = client.get("/ui/history")
+            restored = client.get("/ui/history/0")
+
+        self.assertIn("chat_store;dur=", history.headers["Server-Timing"])
+        self.assertIn("total;dur=", history.headers["Server-Timing"])
+        self.assertIn("html_cache;dur=", ui_history.headers["Server-Timing"])
+        self.assertIn("promote;dur=", restored.headers["Server-Timing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import app as portfolio_app
+from utils import warmup
+
+
+class LazyImportTests(unittest.TestCase):
+    def test_importing_app_defers_sdks_and_service_clients(self):
+        probe = (
+            "import sys\n"
+            "import app\n"
+            "import clients.redis_client as redis_module\n"
+            "import utils.retrieval_config as retrieval_config\n"
+            "print(sorted(name for name in ('strands', 'boto3', 'litellm', 'redis') if name in sys.modules))\n"
+            "print(redis_module.redis_client._client is None, retrieval_config._retrieval_client is None)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", probe],
+            cwd=Path(__file__).resolve().parents[1],
+            env={**os.environ, "AI_PROVIDER": "bedrock", "RETRIEVAL_PROVIDER": "local"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        lines = result.stdout.strip().splitlines()
+
+        self.assertTrue(lines[0].startswith("App imported in"))
+        self.assertEqual(lines[1], "[]")
+        self.assertEqual(lines[2], "True True")
+
+
+class WarmEndpointTests(unittest.TestCase):
+    def setUp(self):
+        portfolio_app.app.config.update(TESTING=True, SECRET_KEY="test-secret")
+        patcher = patch.multiple(warmup, _warm=False, _timings={}, _errors={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_warm_runs_each_step_once_and_reports_timings(self):
+        calls = []
+        steps = (("redis", lambda: calls.append("redis")), ("retrieval", lambda: calls.append("retrieval")))
+
+        with patch.object(warmup, "WARM_STEPS", steps), portfolio_app.app.test_client() as client:
+            first = client.get("/healthz/warm")
+            second = client.get("/healthz/warm")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(set(first.get_json()["timings"]), {"redis", "retrieval"})
+        self.assertIsNotNone(second.get_json()["import_ms"])
+        self.assertEqual(calls, ["redis", "retrieval"])
+
+    def test_failed_step_answers_503_and_is_retried(self):
+        attempts = []
+
+        def flaky_redis():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("refused")
+
+        with patch.object(warmup, "WARM_STEPS", (("redis", flaky_redis),)), portfolio_app.app.test_client() as client:
+            failed = client.get("/healthz/warm")
+            recovered = client.get("/healthz/warm")
+
+        self.assertEqual(failed.status_code, 503)
+        self.assertEqual(failed.get_json()["errors"], {"redis": "refused"})
+        self.assertEqual(recovered.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import asyncio
+from collections import deque
+import os
+import threading
+import time
+from typing import Callable
+
+from utils.metrics import (
+    AGENT_QUEUE_DEPTH,
+    AGENT_QUEUE_WAIT_SECONDS,
+    AGENT_REJECTED_TOTAL,
+    AGENT_RUNNING,
+)
+
+QueuePositionCallback = Callable[[int], None]
+
+_WAITING = "waiting"
+_GRANTED = "granted"
+_RUNNING = "running"
+_DONE = "done"
+
+
+class AdmissionRejected(Exception):
+    """Raised when every execution slot is busy and the wait queue is full."""
+
+
+class AdmissionTicket:
+    """A request's place in the admission queue."""
+
+    def __init__(self, on_queue_position: QueuePositionCallback | None = None):
+        self.on_queue_position = on_queue_position
+        self.state = _WAITING
+        self.position = 0
+        self.enqueued_at = time.perf_counter()
+        self.granted = threading.Event()
+        self._waiter: tuple[asyncio.AbstractEventLoop, asyncio.Future] | None = None
+
+    def _wake(self) -> None:
+        self.granted.set()
+        if self._waiter:
+            loop, future = self._waiter
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+    def _move_to(self, position: int) -> bool:
+        """Record a new queue position; True if it changed. Caller holds the lock."""
+        if position == self.position:
+            return False
+        self.position = position
+        return True
+
+
+class AdmissionController:
+    """
+    Bound how many agent pipelines run at once.
+
+    At most `max_concurrency` tickets hold a slot; up to `max_queue` more wait
+    in FIFO order and are told their queue position whenever it changes.
+    Anything beyond that is rejected immediately so a traffic spike cannot fan
+    out into unbounded LLM calls. Position callbacks may write to Redis, so
+    they run after the lock is released.
+
+    Usage: `reserve()` on the request path (fast rejection), then `wait()` or
+    `wait_async()` where the work runs, then `release()` when it finishes.
+    `cancel()` gives the ticket back if the client goes away first, and
+    `finish()` in a `finally` covers failures at any point in between.
+    """
+
+    def __init__(self, stage: str = "agent", max_concurrency: int = 4, max_queue: int = 16):
+        self.stage = stage
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting: deque[AdmissionTicket] = deque()
+
+    def reserve(self, on_queue_position: QueuePositionCallback | None = None) -> AdmissionTicket:
+        ticket = AdmissionTicket(on_queue_position)
+
+        with self._lock:
+            if self._running < self.max_concurrency and not self._waiting:
+                self._running += 1
+                ticket.state = _GRANTED
+            elif len(self._waiting) >= self.max_queue:
+                AGENT_REJECTED_TOTAL.inc(stage=self.stage)
+                raise AdmissionRejected(
+                    "The portfolio agent is busy right now. Please try again in a moment."
+                )
+            else:
+                self._waiting.append(ticket)
+                ticket._move_to(len(self._waiting))
+            self._update_gauges()
+
+        if ticket.state == _GRANTED:
+            self._record_wait(ticket)
+            ticket._wake()
+        else:
+            self._notify_positions([(ticket, ticket.position)])
+        return ticket
+
+    def wait(self, ticket: AdmissionTicket) -> bool:
+        """Block until the ticket holds a slot. False if it was cancelled."""
+        ticket.granted.wait()
+        return self._claim(ticket)
+
+    async def wait_async(self, ticket: AdmissionTicket) -> bool:
+        """Await a slot without blocking the event loop. False if cancelled."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            ticket._waiter = (loop, future)
+            already_woken = ticket.state != _WAITING
+        if already_woken:
+            future.set_result(None)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            self.cancel(ticket)
+            raise
+        return self._claim(ticket)
+
+    def _claim(self, ticket: AdmissionTicket) -> bool:
+        with self._lock:
+            if ticket.state != _GRANTED:
+                return False
+            ticket.state = _RUNNING
+            return True
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        with self._lock:
+            if ticket.state not in (_GRANTED, _RUNNING):
+                return
+            ticket.state = _DONE
+            moved = self._hand_off_slot()
+        self._notify_positions(moved)
+
+    def finish(self, ticket: AdmissionTicket) -> None:
+        """
+        Give back whatever the ticket still holds, whether it failed before
+        claiming its slot or after. A no-op once it was released.
+        """
+        if ticket.state == _RUNNING:
+            self.release(ticket)
+        else:
+            self.cancel(ticket)
+
+    def cancel(self, ticket: AdmissionTicket) -> None:
+        """Withdraw a ticket that has not started running."""
+        with self._lock:
+            if ticket.state == _WAITING:
+                self._waiting.remove(ticket)
+                ticket.state = _DONE
+                moved = self._move_queue()
+            elif ticket.state == _GRANTED:
+                ticket.state = _DONE
+                moved = self._hand_off_slot()
+            else:
+                return
+            self._update_gauges()
+        ticket._wake()
+        self._notify_positions(moved)
+
+    def _hand_off_slot(self) -> list[tuple[AdmissionTicket, int]]:
+        """
+        Pass a freed slot to the head of the queue. Caller holds the lock.
+        Returns the waiting tickets whose position changed.
+        """
+        moved = []
+        if self._waiting:
+            head = self._waiting.popleft()
+            head.state = _GRANTED
+            self._record_wait(head)
+            head._wake()
+            moved = self._move_queue()
+        else:
+            self._running -= 1
+        self._update_gauges()
+        return moved
+
+    def _move_queue(self) -> list[tuple[AdmissionTicket, int]]:
+        """Renumber the waiting tickets. Caller holds the lock."""
+        return [
+            (waiting_ticket, index + 1)
+            for index, waiting_ticket in enumerate(self._waiting)
+            if waiting_ticket._move_to(index + 1)
+        ]
+
+    @staticmethod
+    def _notify_positions(moved: list[tuple[AdmissionTicket, int]]) -> None:
+        """Tell tickets their new positions. Called without the lock."""
+        for waiting_ticket, position in moved:
+            if waiting_ticket.on_queue_position:
+                waiting_ticket.on_queue_position(position)
+
+    def _record_wait(self, ticket: AdmissionTicket) -> None:
+        AGENT_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - ticket.enqueued_at, stage=self.stage)
+
+    def _update_gauges(self) -> None:
+        AGENT_QUEUE_DEPTH.set(len(self._waiting), stage=self.stage)
+        AGENT_RUNNING.set(self._running, stage=self.stage)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "waiting": len(self._waiting),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            }
+
+
+agent_admission = AdmissionController(
+    stage="agent",
+    max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("AGENT_MAX_QUEUE", "16")),
+)
+
+# Sections of multi-topic pages each make their own model call, on top of the
+# agent slot their request holds, so they are bounded separately
+section_admission = AdmissionController(
+    stage="section",
+    max_concurrency=int(os.getenv("SECTION_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("SECTION_MAX_QUEUE", "32")),
+)
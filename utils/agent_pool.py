@@ -0,0 +1,129 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from utils.ai_config import model_config_key
+from utils.metrics import AGENT_POOL_CHECKOUTS_TOTAL, AGENT_POOL_IN_USE, AGENT_POOL_SIZE
+
+if TYPE_CHECKING:
+    from strands import Agent
+
+
+def agent_pool_enabled() -> bool:
+    return os.getenv("AGENT_POOL_ENABLED", "true").lower() == "true"
+
+
+def reset_agent(agent: "Agent") -> None:
+    """Clear everything one request leaves on an agent so the next starts fresh"""
+    from strands.agent.state import AgentState
+    from strands.telemetry.metrics import EventLoopMetrics
+
+    agent.messages = []
+    agent.state = AgentState()
+    agent.event_loop_metrics = EventLoopMetrics()
+    if hasattr(agent.conversation_manager, "removed_message_count"):
+        agent.conversation_manager.removed_message_count = 0
+
+
+class AgentPool:
+    """
+    Pre-built agents of one kind, each checked out by a single request.
+
+    Building an agent constructs its model and provider client (e.g. the
+    boto3 Bedrock client and its connection pool). Reusing agents keeps those
+    clients, and their keep-alive connections, across requests. Agents are
+    reset when returned; an agent whose request raised is dropped instead.
+
+    The pool grows to whatever concurrency admission control allows and keeps
+    at most `max_idle` agents between requests.
+    """
+
+    def __init__(self, kind: str, factory: Callable[[], "Agent"], max_idle: int | None = None):
+        self.kind = kind
+        self.factory = factory
+        self.max_idle = max_idle if max_idle is not None else int(os.getenv("AGENT_POOL_MAX_IDLE", "8"))
+        self._lock = threading.Lock()
+        # (agent, the callback handler it was built with)
+        self._idle: list[tuple["Agent", Any]] = []
+        self._in_use: dict[int, Any] = {}
+
+    def _report(self) -> None:
+        AGENT_POOL_SIZE.set(len(self._idle) + len(self._in_use), agent=self.kind)
+        AGENT_POOL_IN_USE.set(len(self._in_use), agent=self.kind)
+
+    def checkout(self) -> "Agent":
+        with self._lock:
+            if self._idle:
+                agent, default_handler = self._idle.pop()
+                self._in_use[id(agent)] = default_handler
+                self._report()
+                AGENT_POOL_CHECKOUTS_TOTAL.inc(agent=self.kind, result="reused")
+                return agent
+
+        # Build outside the lock; construction can take a while
+        agent = self.factory()
+        with self._lock:
+            self._in_use[id(agent)] = agent.callback_handler
+            self._report()
+        AGENT_POOL_CHECKOUTS_TOTAL.inc(agent=self.kind, result="created")
+        return agent
+
+    def release(self, agent: "Agent", reusable: bool = True) -> None:
+        with self._lock:
+            default_handler = self._in_use.pop(id(agent))
+            if reusable and len(self._idle) < self.max_idle:
+                reset_agent(agent)
+                agent.callback_handler = default_handler
+                self._idle.append((agent, default_handler))
+            self._report()
+
+    @contextmanager
+    def agent(self, callback_handler=None) -> Iterator["Agent"]:
+        """Check out an agent, optionally observing its events with `callback_handler`"""
+        agent = self.checkout()
+        if callback_handler is not None:
+            agent.callback_handler = callback_handler
+        succeeded = False
+        try:
+            yield agent
+            succeeded = True
+        finally:
+            self.release(agent, reusable=succeeded)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "in_use": len(self._in_use)}
+
+
+_pools: dict[tuple, AgentPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_agent_pool(kind: str, factory: Callable[[], "Agent"]) -> AgentPool:
+    """The pool of `kind` agents built by `factory` for the current model settings"""
+    key = (kind, factory, model_config_key())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = AgentPool(kind, factory)
+    return pool
+
+
+@contextmanager
+def pooled_agent(kind: str, factory: Callable[[], "Agent"], callback_handler=None) -> Iterator["Agent"]:
+    """
+    An agent from the `kind` pool, or a freshly built one when
+    AGENT_POOL_ENABLED is false.
+    """
+    if not agent_pool_enabled():
+        agent = factory()
+        if callback_handler is not None:
+            agent.callback_handler = callback_handler
+        yield agent
+        return
+
+    with get_agent_pool(kind, factory).agent(callback_handler=callback_handler) as agent:
+        yield agent
@@ -1,18 +1,30 @@
 import os
+import threading
 
 from clients.llm.base import LLMProvider
-from clients.llm.bedrock_provider import BedrockLLMProvider
-from clients.llm.gemini_provider import GeminiLLMProvider
-from clients.llm.litellm_provider import LiteLLMProvider
-from clients.llm.openai_provider import OpenAILLMProvider
 
 
-def create_model_provider() -> LLMProvider:
-    provider = os.getenv("AI_PROVIDER", "bedrock").lower()
-    model_id = os.getenv("MODEL_ID")
+def routing_provider_names() -> list[str]:
+    """The providers AI_PROVIDER=routing spreads calls across, from ROUTING_PROVIDERS"""
+    return [name.strip().lower() for name in os.getenv("ROUTING_PROVIDERS", "bedrock,openai").split(",") if name.strip()]
+
+
+def create_model_provider(provider: str | None = None) -> LLMProvider:
+    """
+    The provider selected by AI_PROVIDER, or the named one. A named provider
+    is one routed to, and only takes a model from <NAME>_MODEL_ID so each
+    routed provider can run its own model.
+    """
+    if provider is None:
+        provider = os.getenv("AI_PROVIDER", "bedrock").lower()
+        model_id = os.getenv("MODEL_ID")
+    else:
+        model_id = os.getenv(f"{provider.upper()}_MODEL_ID")
     temperature = float(os.getenv("MODEL_TEMPERATURE", "0.3"))
 
     if provider == "gemini":
+        from clients.llm.gemini_provider import GeminiLLMProvider
+
         return GeminiLLMProvider(
             api_key=os.getenv("GEMINI_API_KEY"),
             model_id=model_id or "gemini-flash-latest",
@@ -20,22 +32,89 @@ def create_model_provider() -> LLMProvider:
         )
 
     if provider == "litellm":
+        from clients.llm.litellm_provider import LiteLLMProvider
+
         return LiteLLMProvider(
             model_id=model_id or "gemini/gemini-2.5-flash",
             temperature=temperature,
         )
 
     if provider == "openai":
+        from clients.llm.openai_provider import OpenAILLMProvider
+
         return OpenAILLMProvider(
             model_id=model_id or "gpt-4o-mini",
             temperature=temperature,
         )
 
+    if provider == "simulated":
+        from clients.llm.simulated_provider import SimulatedLLMProvider
+
+        return SimulatedLLMProvider(
+            latency_ms=float(os.getenv("SIMULATED_LLM_LATENCY_MS", "500")),
+            tokens_per_second=float(os.getenv("SIMULATED_LLM_TOKENS_PER_SECOND", "80")),
+            html_chars=int(os.getenv("SIMULATED_LLM_HTML_CHARS", "6000")),
+        )
+
     if provider == "bedrock":
+        from clients.llm.bedrock_provider import BedrockLLMProvider
+
         return BedrockLLMProvider()
 
+    if provider == "routing":
+        from clients.llm.routing_provider import RoutingLLMProvider
+
+        names = routing_provider_names()
+        if "routing" in names:
+            raise ValueError("ROUTING_PROVIDERS cannot include routing")
+        hedging = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+        return RoutingLLMProvider(
+            {name: create_model_provider(name) for name in names},
+            hedge_delay_ms=float(os.getenv("LLM_HEDGE_DELAY_MS", "2000")) if hedging else None,
+            window_seconds=float(os.getenv("LLM_ROUTING_WINDOW_SECONDS", "300")),
+            max_error_rate=float(os.getenv("LLM_ROUTING_MAX_ERROR_RATE", "0.5")),
+        )
+
     raise ValueError(f"Unsupported AI_PROVIDER: {provider}")
 
 
+def model_config_key() -> tuple[str, str, str]:
+    """The settings that select a model, so pooled agents never cross configs"""
+    return (
+        os.getenv("AI_PROVIDER", "bedrock").lower(),
+        os.getenv("MODEL_ID", ""),
+        os.getenv("MODEL_TEMPERATURE", "0.3"),
+    )
+
+
+_model_providers: dict[tuple[str, str, str], LLMProvider] = {}
+_model_provider_lock = threading.Lock()
+
+
+def get_model_provider() -> LLMProvider:
+    """Shared provider for the current model settings, created on first use"""
+    key = model_config_key()
+    provider = _model_providers.get(key)
+    if provider is None:
+        with _model_provider_lock:
+            provider = _model_providers.get(key)
+            if provider is None:
+                provider = _model_providers[key] = create_model_provider()
+    return provider
+
+
 def create_model():
-    return create_model_provider().create_model()
+    from clients.llm.response_cache import ResponseCachingModel
+    from utils.model_usage import UsageReportingModel
+
+    model = get_model_provider().create_model()
+    if not getattr(model, "reports_usage", False):
+        # The routing model reports each provider's calls under its own name
+        model = UsageReportingModel(model, model_config_key()[0])
+    # Outermost, so replayed responses are not reported as provider usage
+    return ResponseCachingModel(model)
+
+
+def cacheable_system_prompt(prompt: str) -> str | list[dict]:
+    """An agent's static system prompt, marked for provider-side prompt caching"""
+    return get_model_provider().system_prompt(prompt)
@@ -0,0 +1,19 @@
+"""
+Run the async agent pipeline from synchronous callers.
+
+The pipeline has a single implementation written as coroutines. Flask
+request threads, agent workers and scripts call it through `run_sync`, which
+gives each call a private event loop. That works whether or not the thread
+has a loop of its own (nest_asyncio's `asyncio.run` needs one) and leaves any
+such loop untouched.
+"""
+import asyncio
+from typing import Any, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """Run `coro` to completion on a new event loop and return its result"""
+    with asyncio.Runner(loop_factory=asyncio.new_event_loop) as runner:
+        return runner.run(coro)
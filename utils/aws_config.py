@@ -1,16 +1,23 @@
-import boto3
 import os
-from clients.kb_client import KnowledgeBaseClient
-from strands.models import BedrockModel
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+  from clients.kb_client import KnowledgeBaseClient
+  from strands.models import BedrockModel
 
 def create_boto3_session():
+  import boto3
+
   return boto3.Session(
       aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
       aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
       region_name=os.getenv("AWS_REGION"),
   )
 
-def create_bedrock_model() -> BedrockModel:
+def create_bedrock_model() -> "BedrockModel":
+  from strands.models import BedrockModel
+
   session = create_boto3_session()
 
   bedrock_model = BedrockModel(
@@ -20,7 +27,9 @@ def create_bedrock_model() -> BedrockModel:
 
   return bedrock_model
 
-def create_kb_client() -> KnowledgeBaseClient:
+def create_kb_client() -> "KnowledgeBaseClient":
+  from clients.kb_client import KnowledgeBaseClient
+
   session = create_boto3_session()
 
   kb_client = KnowledgeBaseClient(
@@ -31,5 +40,19 @@ def create_kb_client() -> KnowledgeBaseClient:
 
   return kb_client
 
-# Singleton instance (shared everywhere)
-kb_client_singleton = create_kb_client()
+_kb_client = None
+_kb_client_lock = threading.Lock()
+
+def get_kb_client() -> "KnowledgeBaseClient":
+  """Singleton instance (shared everywhere), created on first use"""
+  global _kb_client
+  if _kb_client is None:
+    with _kb_client_lock:
+      if _kb_client is None:
+        _kb_client = create_kb_client()
+  return _kb_client
+
+def __getattr__(name: str):
+  if name == "kb_client_singleton":
+    return get_kb_client()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,504 @@
+import asyncio
+import json
+import os
+import re
+import socket
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from clients.redis_client import async_redis_client, redis_client
+
+TERMINAL_STATUSES = ("complete", "error")
+
+JOB_QUEUE_KEY = "chat_jobs:queue"
+# Turns a worker has taken and not finished, per worker
+JOB_PROCESSING_PREFIX = "chat_jobs:processing:"
+JOB_LEASE_PREFIX = "chat_jobs:lease:"
+JOB_WORKERS_KEY = "chat_jobs:workers"
+
+# Yielded by the followers in place of an event when a heartbeat is due
+HEARTBEAT = (None, None)
+
+_EVENT_ID = re.compile(r"^\d+-\d+$")
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[str]:
+    """Accept a Redis Stream entry id from a Last-Event-ID header, else None"""
+    if value and _EVENT_ID.match(value.strip()):
+        return value.strip()
+    return None
+
+
+class ChatJobEvents:
+    """
+    Redis Stream holding the SSE payloads of one chat turn.
+
+    The job appends every progress, chunk and closing payload; SSE responses
+    on any worker replay the stream after the last event id they delivered.
+    The stream outlives the job for `ttl` seconds so a client that reconnects
+    after the turn finished still receives the result.
+
+    `html_chunk` payloads are buffered and appended as one event once
+    `chunk_bytes` of HTML or `chunk_ms` milliseconds have accumulated, or
+    before the next payload of any other kind.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        job_id: str,
+        ttl: Optional[int] = None,
+        chunk_ms: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+    ):
+        self.session_id = session_id
+        self.job_id = job_id
+        self.key = f"chat_job:{session_id}:{job_id}"
+        self.claim_key = f"{self.key}:claim"
+        self.ttl = ttl or int(os.getenv("CHAT_JOB_TTL", "3600"))
+        self.chunk_seconds = (
+            chunk_ms if chunk_ms is not None else int(os.getenv("CHAT_JOB_CHUNK_MS", "50"))
+        ) / 1000
+        self.chunk_bytes = chunk_bytes or int(os.getenv("CHAT_JOB_CHUNK_BYTES", "2048"))
+        # Serializes appends so a delayed flush never reorders events
+        self._lock = threading.Lock()
+        self._pending_html: list[str] = []
+        self._pending_bytes = 0
+
+    def claim(self) -> bool:
+        """True for the first request that starts this job"""
+        return bool(redis_client.set(self.claim_key, "1", nx=True, ex=self.ttl))
+
+    def discard(self) -> None:
+        """Forget a job that was never run, e.g. when admission rejected it"""
+        redis_client.delete(self.claim_key, self.key, f"{self.key}:attempts")
+
+    def exists(self) -> bool:
+        return bool(redis_client.exists(self.claim_key))
+
+    def start_attempt(self) -> int:
+        """Count a run of this job; above 1 it is a retry after a lost worker"""
+        pipe = redis_client.pipeline()
+        pipe.incr(f"{self.key}:attempts")
+        pipe.expire(f"{self.key}:attempts", self.ttl)
+        return int(pipe.execute()[0])
+
+    def _min_id(self) -> str:
+        """
+        Oldest entry id kept. The claim expires `ttl` seconds after the job
+        starts and no resume is accepted after that, so trimming by age never
+        drops an event a follower can still ask for.
+        """
+        return f"{int((time.time() - self.ttl) * 1000)}-0"
+
+    def _add(self, payload: dict) -> str:
+        pipe = redis_client.pipeline()
+        pipe.xadd(self.key, {"data": json.dumps(payload)}, minid=self._min_id(), approximate=True)
+        pipe.expire(self.key, self.ttl)
+        event_id = pipe.execute()[0]
+        job_notifier.notify(self.key)
+        return event_id
+
+    def _flush_locked(self) -> Optional[str]:
+        if not self._pending_html:
+            return None
+        html = "".join(self._pending_html)
+        self._pending_html = []
+        self._pending_bytes = 0
+        delayed_flushes.cancel(self)
+        return self._add({"status": "html_chunk", "html": html})
+
+    def flush(self) -> Optional[str]:
+        """Append any buffered HTML now"""
+        with self._lock:
+            return self._flush_locked()
+
+    def append(self, payload: dict) -> Optional[str]:
+        """
+        Append a payload and return its event id, or None while an
+        `html_chunk` is buffered.
+        """
+        with self._lock:
+            if payload.get("status") != "html_chunk" or self.chunk_seconds <= 0:
+                self._flush_locked()
+                return self._add(payload)
+
+            if not self._pending_html:
+                delayed_flushes.schedule(self, time.monotonic() + self.chunk_seconds)
+            self._pending_html.append(payload["html"])
+            self._pending_bytes += len(payload["html"].encode("utf-8"))
+            if self._pending_bytes >= self.chunk_bytes:
+                return self._flush_locked()
+            return None
+
+    @staticmethod
+    def _decode(entries) -> list[tuple[str, dict]]:
+        return [(event_id, json.loads(fields["data"])) for event_id, fields in entries]
+
+    def read_after(self, last_event_id: Optional[str]) -> list[tuple[str, dict]]:
+        start = f"({last_event_id}" if last_event_id else "-"
+        return self._decode(redis_client.xrange(self.key, min=start, max="+"))
+
+    def _xread_args(self, last_event_id: Optional[str], timeout: float) -> tuple[dict, int]:
+        # BLOCK 0 would wait forever
+        return {self.key: last_event_id or "0-0"}, max(1, int(timeout * 1000))
+
+    def wait_after(self, last_event_id: Optional[str], timeout: float) -> list[tuple[str, dict]]:
+        """Events after `last_event_id`, blocking up to `timeout` seconds for the next one"""
+        streams, block_ms = self._xread_args(last_event_id, timeout)
+        response = redis_client.xread(streams, block=block_ms)
+        return [event for _, entries in response or [] for event in self._decode(entries)]
+
+    async def wait_after_async(self, last_event_id: Optional[str], timeout: float) -> list[tuple[str, dict]]:
+        streams, block_ms = self._xread_args(last_event_id, timeout)
+        response = await async_redis_client.xread(streams, block=block_ms)
+        return [event for _, entries in response or [] for event in self._decode(entries)]
+
+
+class DelayedFlushes:
+    """
+    One daemon thread appending each job's buffered HTML once its `chunk_ms`
+    window has passed, so the tail of a stream that pauses is not held back
+    until the next payload.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._due: dict[ChatJobEvents, float] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, job_events: ChatJobEvents, due_at: float) -> None:
+        with self._condition:
+            self._due.setdefault(job_events, due_at)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-job-flushes", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, job_events: ChatJobEvents) -> None:
+        with self._condition:
+            self._due.pop(job_events, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                ready = [job_events for job_events, due_at in self._due.items() if due_at <= now]
+                if not ready:
+                    timeout = min(self._due.values()) - now if self._due else None
+                    self._condition.wait(timeout)
+                    continue
+                for job_events in ready:
+                    del self._due[job_events]
+            for job_events in ready:
+                try:
+                    job_events.flush()
+                except Exception as e:
+                    print(f"Could not append buffered HTML for {job_events.key}: {e}")
+
+
+delayed_flushes = DelayedFlushes()
+
+
+def job_queue_enabled() -> bool:
+    """True when chat turns run on the separate agent worker pool"""
+    return os.getenv("CHAT_EXECUTION", "inline").lower() == "queue"
+
+
+def enqueue_chat_job(
+    session_id: str,
+    job_id: str,
+    instruction: str,
+    history_cursor: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Queue a chat turn for the agent workers. Returns its position in the
+    queue, or None when CHAT_QUEUE_MAX jobs are already waiting.
+    """
+    if redis_client.llen(JOB_QUEUE_KEY) >= int(os.getenv("CHAT_QUEUE_MAX", "100")):
+        return None
+
+    job = {
+        "session_id": session_id,
+        "job_id": job_id,
+        "instruction": instruction,
+        "history_cursor": history_cursor,
+    }
+    return redis_client.lpush(JOB_QUEUE_KEY, json.dumps(job))
+
+
+def worker_id() -> str:
+    """Identifies this agent worker process in the queue's bookkeeping"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _processing_key(worker: str) -> str:
+    return f"{JOB_PROCESSING_PREFIX}{worker}"
+
+
+def _lease_key(worker: str) -> str:
+    return f"{JOB_LEASE_PREFIX}{worker}"
+
+
+def dequeue_chat_job(worker: str, timeout: int = 1) -> Optional[tuple[dict, str]]:
+    """
+    Oldest queued chat turn, waiting up to `timeout` seconds. The turn moves
+    to the worker's processing list rather than leaving Redis, so it can be
+    requeued if the worker dies; acknowledge it with `acknowledge_chat_job`.
+    Returns the job and its raw queue entry.
+    """
+    item = redis_client.blmove(JOB_QUEUE_KEY, _processing_key(worker), timeout, "RIGHT", "LEFT")
+    if not item:
+        return None
+    return json.loads(item), item
+
+
+def acknowledge_chat_job(worker: str, item: str) -> None:
+    """Drop a finished turn from the worker's processing list"""
+    redis_client.lrem(_processing_key(worker), 1, item)
+
+
+class WorkerLease:
+    """
+    Marks an agent worker alive while it runs. A daemon thread renews the
+    lease every third of its length; when the process dies the lease
+    expires and `requeue_orphaned_jobs` hands its turns to other workers.
+    """
+
+    def __init__(self, worker: str, seconds: Optional[int] = None):
+        self.worker = worker
+        self.seconds = seconds or int(os.getenv("CHAT_WORKER_LEASE_SECONDS", "30"))
+        self._stopped = threading.Event()
+
+    def renew(self) -> None:
+        pipe = redis_client.pipeline()
+        pipe.sadd(JOB_WORKERS_KEY, self.worker)
+        pipe.set(_lease_key(self.worker), "1", ex=self.seconds)
+        pipe.execute()
+
+    def start(self) -> None:
+        self.renew()
+        threading.Thread(target=self._run, name="chat-worker-lease", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.seconds / 3):
+            try:
+                self.renew()
+            except Exception as e:
+                print(f"Could not renew worker lease for {self.worker}: {e}")
+
+
+def requeue_orphaned_jobs() -> int:
+    """
+    Move turns held by workers whose lease expired back to the front of the
+    queue. Each entry moves atomically, so concurrent reapers never requeue
+    a turn twice. Returns the number of turns requeued.
+    """
+    requeued = 0
+    for worker in redis_client.smembers(JOB_WORKERS_KEY):
+        if redis_client.exists(_lease_key(worker)):
+            continue
+        while redis_client.lmove(_processing_key(worker), JOB_QUEUE_KEY, "RIGHT", "RIGHT"):
+            requeued += 1
+        redis_client.srem(JOB_WORKERS_KEY, worker)
+    if requeued:
+        print(f"Requeued {requeued} chat jobs from lost agent workers")
+    return requeued
+
+
+def announce_queue_positions(payload_for: Callable[[int], dict]) -> None:
+    """
+    Append the current queue position to the event streams of the
+    CHAT_QUEUE_ANNOUNCE_MAX turns next in line, called whenever a worker
+    takes a turn off the queue. Turns further back keep the position they
+    were given when queued until they move up.
+    """
+    limit = int(os.getenv("CHAT_QUEUE_ANNOUNCE_MAX", "10"))
+    if limit <= 0:
+        return
+    # LPUSH puts the newest turn first; workers take from the end
+    waiting = redis_client.lrange(JOB_QUEUE_KEY, -limit, -1)
+    jobs = []
+    for index, item in enumerate(waiting):
+        try:
+            job = json.loads(item)
+            jobs.append((len(waiting) - index, ChatJobEvents(job["session_id"], job["job_id"])))
+        except (ValueError, KeyError, TypeError):
+            continue
+    if not jobs:
+        return
+
+    pipe = redis_client.pipeline()
+    for _, job_events in jobs:
+        pipe.exists(job_events.claim_key)
+    claimed = pipe.execute()
+
+    pipe = redis_client.pipeline()
+    for (position, job_events), live in zip(jobs, claimed):
+        # A turn whose claim expired can no longer be followed
+        if not live:
+            continue
+        pipe.xadd(
+            job_events.key, {"data": json.dumps(payload_for(position))},
+            minid=job_events._min_id(), approximate=True,
+        )
+        pipe.expire(job_events.key, job_events.ttl)
+    pipe.execute()
+
+
+class JobNotifier:
+    """
+    In-process wake-ups for SSE responses following a job.
+
+    Followers of a job running in this process sleep until the job appends
+    an event. Followers of a job running on another worker block on XREAD.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: dict[str, set[Callable[[], None]]] = {}
+        self._running: set[str] = set()
+
+    def subscribe(self, key: str, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._waiters.setdefault(key, set()).add(callback)
+
+    def unsubscribe(self, key: str, callback: Callable[[], None]) -> None:
+        with self._lock:
+            waiters = self._waiters.get(key)
+            if waiters:
+                waiters.discard(callback)
+                if not waiters:
+                    del self._waiters[key]
+
+    def notify(self, key: str) -> None:
+        with self._lock:
+            waiters = list(self._waiters.get(key, ()))
+        for callback in waiters:
+            callback()
+
+    def mark_running(self, key: str) -> None:
+        with self._lock:
+            self._running.add(key)
+
+    def mark_done(self, key: str) -> None:
+        with self._lock:
+            self._running.discard(key)
+        self.notify(key)
+
+    def is_running(self, key: str) -> bool:
+        with self._lock:
+            return key in self._running
+
+
+job_notifier = JobNotifier()
+
+
+def _follow_settings() -> tuple[float, float]:
+    return (
+        float(os.getenv("SSE_HEARTBEAT_SECONDS", "15")),
+        float(os.getenv("CHAT_JOB_STALL_SECONDS", "300")),
+    )
+
+
+def _lost_job_event() -> tuple[None, dict]:
+    return None, {"status": "error", "message": "The request was interrupted. Please try again."}
+
+
+def follow_job_events(
+    job_events: ChatJobEvents,
+    last_event_id: Optional[str] = None,
+) -> Iterator[tuple[Optional[str], Optional[dict]]]:
+    """
+    Yield (event_id, payload) for every event after `last_event_id` until the
+    job's closing event, and HEARTBEAT while idle.
+
+    A job running in this process wakes its followers when it appends; for
+    any other job the follower blocks on XREAD, which returns as soon as an
+    event is added or the heartbeat is due.
+    """
+    heartbeat_seconds, stall_seconds = _follow_settings()
+    wake = threading.Event()
+    job_notifier.subscribe(job_events.key, wake.set)
+    try:
+        last_event_at = last_beat_at = time.monotonic()
+        wake.clear()
+        entries = job_events.read_after(last_event_id)
+        while True:
+            for event_id, payload in entries:
+                last_event_id = event_id
+                yield event_id, payload
+                if payload.get("status") in TERMINAL_STATUSES:
+                    return
+
+            now = time.monotonic()
+            if entries:
+                last_event_at = last_beat_at = now
+            elif not job_events.exists() or now - last_event_at > stall_seconds:
+                yield _lost_job_event()
+                return
+
+            if job_notifier.is_running(job_events.key):
+                wake.wait(heartbeat_seconds)
+                wake.clear()
+                entries = job_events.read_after(last_event_id)
+            else:
+                entries = job_events.wait_after(last_event_id, heartbeat_seconds)
+
+            if not entries and time.monotonic() - last_beat_at >= heartbeat_seconds:
+                last_beat_at = time.monotonic()
+                yield HEARTBEAT
+    finally:
+        job_notifier.unsubscribe(job_events.key, wake.set)
+
+
+async def follow_job_events_async(
+    job_events: ChatJobEvents,
+    last_event_id: Optional[str] = None,
+) -> AsyncIterator[tuple[Optional[str], Optional[dict]]]:
+    """Coroutine variant of follow_job_events for the ASGI app."""
+    heartbeat_seconds, stall_seconds = _follow_settings()
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+
+    def notify():
+        loop.call_soon_threadsafe(wake.set)
+
+    job_notifier.subscribe(job_events.key, notify)
+    try:
+        last_event_at = last_beat_at = time.monotonic()
+        wake.clear()
+        entries = await asyncio.to_thread(job_events.read_after, last_event_id)
+        while True:
+            for event_id, payload in entries:
+                last_event_id = event_id
+                yield event_id, payload
+                if payload.get("status") in TERMINAL_STATUSES:
+                    return
+
+            now = time.monotonic()
+            if entries:
+                last_event_at = last_beat_at = now
+            elif not await asyncio.to_thread(job_events.exists) or now - last_event_at > stall_seconds:
+                yield _lost_job_event()
+                return
+
+            if job_notifier.is_running(job_events.key):
+                try:
+                    await asyncio.wait_for(wake.wait(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+                entries = await asyncio.to_thread(job_events.read_after, last_event_id)
+            else:
+                entries = await job_events.wait_after_async(last_event_id, heartbeat_seconds)
+
+            if not entries and time.monotonic() - last_beat_at >= heartbeat_seconds:
+                last_beat_at = time.monotonic()
+                yield HEARTBEAT
+    finally:
+        job_notifier.unsubscribe(job_events.key, notify)
@@ -1,8 +1,9 @@
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Dict, List, Literal
+from typing import Dict, List, Literal, Optional
 import json
 from clients.redis_client import redis_client
+from utils.metrics import observe_redis
 
 Role = Literal["user", "agent"]
 
@@ -12,69 +13,138 @@ class ChatMessage:
     role: Role
     content: str
     timestamp: str
+    seq: Optional[int] = None
     
     def to_dict(self):
-        return {
+        data = {
             "role": self.role,
             "content": self.content,
             "timestamp": self.timestamp
         }
+        if self.seq is not None:
+            data["seq"] = self.seq
+        return data
     
     @staticmethod
     def from_dict(data):
         return ChatMessage(
             role=data["role"],
             content=data["content"],
-            timestamp=data["timestamp"]
+            timestamp=data["timestamp"],
+            seq=data.get("seq")
         )
 
 
 class ChatStore:
+    """
+    A session's chat messages, newest first in a Redis list.
+
+    Every message gets a sequence number from the session's history version
+    counter, so clients that know a version can fetch only newer messages.
+    """
+
+    # Extra entries read past the expected count when computing a delta, so
+    # messages added concurrently by another turn are not skipped
+    DELTA_MARGIN = 4
+
     def __init__(self, session_id: str, max_size: int = 100):
         self.session_id = session_id
         self.max_size = max_size
         self.key = f"chat:{session_id}"
+        self.version_key = f"chat:{session_id}:version"
         self.ttl = 86400  # 24 hours
 
-    def add(self, role: str, content: str) -> None:
+    @observe_redis("chat_store")
+    def add(self, role: str, content: str) -> int:
+        """Append a message and return the new history version"""
+        version = redis_client.incr(self.version_key)
         entry = ChatMessage(
             role=role,
             content=content,
-            timestamp=datetime.now(timezone.utc).isoformat()
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            seq=version
         )
         
+        pipe = redis_client.pipeline()
         # Add to Redis list
-        redis_client.lpush(self.key, json.dumps(entry.to_dict()))
-        
+        pipe.lpush(self.key, json.dumps(entry.to_dict()))
         # Trim to max size
-        redis_client.ltrim(self.key, 0, self.max_size - 1)
-        
+        pipe.ltrim(self.key, 0, self.max_size - 1)
         # Reset expiration
-        redis_client.expire(self.key, self.ttl)
+        pipe.expire(self.key, self.ttl)
+        pipe.expire(self.version_key, self.ttl)
+        pipe.execute()
+        return version
 
-    def all(self) -> List[ChatMessage]:
-        """Get all messages as ChatMessage objects (newest first in Redis)"""
-        messages_json = redis_client.lrange(self.key, 0, -1)
+    @observe_redis("chat_store")
+    def version(self) -> int:
+        return int(redis_client.get(self.version_key) or 0)
+
+    def _load(self, start: int, end: int) -> List[ChatMessage]:
+        """Messages in a newest-first index range, returned oldest first"""
+        messages_json = redis_client.lrange(self.key, start, end)
         messages = [ChatMessage.from_dict(json.loads(msg)) for msg in messages_json]
-        # Reverse to get oldest first (matching original behavior)
         messages.reverse()
         return messages
 
+    @observe_redis("chat_store")
+    def all(self) -> List[ChatMessage]:
+        """Get all messages as ChatMessage objects (newest first in Redis)"""
+        # Reverse to get oldest first (matching original behavior)
+        return self._load(0, -1)
+
+    @observe_redis("chat_store")
+    def recent_messages(self, limit: int) -> List[Dict]:
+        """The latest `limit` messages, oldest first, without reading the whole list"""
+        return [self._format(entry) for entry in self._load(0, limit - 1)]
+
+    @observe_redis("chat_store")
+    def since(self, cursor: Optional[int]) -> Dict:
+        """
+        Messages added after history version `cursor`.
+
+        Reads only the new messages. Falls back to the full history with
+        `reset: True` when the cursor is missing, from a different history
+        (e.g. expired), or older than the retained messages.
+        """
+        version = self.version()
+        if cursor is None or cursor < 0 or cursor > version or version - cursor > self.max_size:
+            return {"version": version, "reset": True, "messages": self.format_messages()}
+
+        count = version - cursor
+        if count == 0:
+            return {"version": version, "reset": False, "messages": []}
+
+        messages = [
+            entry for entry in self._load(0, count + self.DELTA_MARGIN - 1)
+            if entry.seq is not None and entry.seq > cursor
+        ]
+        return {
+            "version": max([version] + [entry.seq for entry in messages]),
+            "reset": False,
+            "messages": [self._format(entry) for entry in messages],
+        }
+
+    @observe_redis("chat_store")
     def clear(self) -> None:
-        redis_client.delete(self.key)
+        redis_client.delete(self.key, self.version_key)
 
+    @observe_redis("chat_store", "len")
     def __len__(self) -> int:
         return redis_client.llen(self.key)
     
+    @staticmethod
+    def _format(entry: ChatMessage, idx: Optional[int] = None) -> Dict:
+        formatted = {
+            "role": entry.role,
+            "content": entry.content,
+            "timestamp": entry.timestamp
+        }
+        if idx is not None:
+            formatted = {"id": idx, **formatted}
+        if entry.seq is not None:
+            formatted["seq"] = entry.seq
+        return formatted
+    
     def format_messages(self) -> List[Dict]:
-        entries = []
-        
-        for idx, entry in enumerate(self.all()):
-            entries.append({
-                "id": idx,
-                "role": entry.role,
-                "content": entry.content,
-                "timestamp": entry.timestamp
-            })
-        
-        return entries
\ No newline at end of file
+        return [self._format(entry, idx) for idx, entry in enumerate(self.all())]
@@ -7,6 +7,11 @@ import re
 from typing import List, Optional
 import json
 from clients.redis_client import redis_client
+from utils.metrics import observe_redis, record_cache_lookup
+from utils.speculative_retrieval import content_terms
+
+# A negated request asks for something else than the words it shares with a query
+_NEGATION = re.compile(r"\b(?:not|no|never|without|except|nor|dont|doesnt|isnt)\b|n['’]t\b", re.IGNORECASE)
 
 
 @dataclass
@@ -14,23 +19,55 @@ class HTMLCacheEntry:
     query: str
     html: str
     timestamp: str
+    duration_ms: Optional[float] = None
     
     def to_dict(self):
-        return {
+        data = {
             "query": self.query,
             "html": self.html,
             "timestamp": self.timestamp
         }
+        # Omitted when unknown so entries written before timings existed
+        # serialize identically and can still be found by promote().
+        if self.duration_ms is not None:
+            data["duration_ms"] = self.duration_ms
+        return data
     
     @staticmethod
     def from_dict(data):
         return HTMLCacheEntry(
             query=data["query"],
             html=data["html"],
-            timestamp=data["timestamp"]
+            timestamp=data["timestamp"],
+            duration_ms=data.get("duration_ms")
         )
 
 
+SEMANTIC_CACHE_STATS_KEY = "semantic_cache:stats"
+
+
+def record_semantic_cache_lookup(hit: bool, saved_ms: float = 0.0) -> None:
+    """Count a pre-orchestrator cache lookup and the latency a hit saved"""
+    record_cache_lookup("semantic", hit)
+    pipe = redis_client.pipeline()
+    pipe.hincrby(SEMANTIC_CACHE_STATS_KEY, "hits" if hit else "misses", 1)
+    if hit and saved_ms:
+        pipe.hincrbyfloat(SEMANTIC_CACHE_STATS_KEY, "saved_ms", saved_ms)
+    pipe.execute()
+
+
+def semantic_cache_stats() -> dict:
+    raw = redis_client.hgetall(SEMANTIC_CACHE_STATS_KEY) or {}
+    hits = int(raw.get("hits", 0))
+    misses = int(raw.get("misses", 0))
+    return {
+        "hits": hits,
+        "misses": misses,
+        "saved_ms": float(raw.get("saved_ms", 0.0)),
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
 class HTMLCache:
     def __init__(self, session_id: str, max_size: int = 10):
         self.session_id = session_id
@@ -75,23 +112,33 @@ class HTMLCache:
         return len(intersection) / len(union)
     
     def find_similar_query(self, new_query: str, threshold: float = 0.8) -> Optional[HTMLCacheEntry]:
+        """
+        The most similar earlier query scoring above `threshold`. Similar
+        wording is not enough: the new query must not name anything the
+        earlier one did not, and neither may be negated.
+        """
+        if _NEGATION.search(new_query):
+            return None
+
         all_entries = self.all()
         
         if not all_entries:
             return None
         
         new_tokens = self._tokenize(new_query)
+        new_terms = content_terms(new_query)
         
         best_score = -1
         best_entry = None
         
         for entry in all_entries:
+            if _NEGATION.search(entry.query) or not new_terms <= content_terms(entry.query):
+                continue
             old_tokens = self._tokenize(entry.query)
             
             cosine_sim = self._cosine_similarity(new_tokens, old_tokens)
             jaccard_sim = self._jaccard_similarity(new_tokens, old_tokens)
             combined_score = 0.7 * cosine_sim + 0.3 * jaccard_sim
-            print(f"Similarity score: {combined_score}")
             
             if combined_score > threshold and combined_score > best_score:
                 best_score = combined_score
@@ -99,11 +146,13 @@ class HTMLCache:
         
         return best_entry
     
-    def add(self, query: str, html: str) -> None:
+    @observe_redis("html_cache")
+    def add(self, query: str, html: str, duration_ms: Optional[float] = None) -> None:
         entry = HTMLCacheEntry(
             query=query,
             html=html,
-            timestamp=datetime.now(timezone.utc).isoformat()
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            duration_ms=duration_ms
         )
         
         # Add to Redis list (newest first)
@@ -115,11 +164,13 @@ class HTMLCache:
         # Reset expiration
         redis_client.expire(self.key, self.ttl)
     
+    @observe_redis("html_cache")
     def all(self) -> List[HTMLCacheEntry]:
         """Get all entries as HTMLCacheEntry objects"""
         entries_json = redis_client.lrange(self.key, 0, -1)
         return [HTMLCacheEntry.from_dict(json.loads(e)) for e in entries_json]
     
+    @observe_redis("html_cache")
     def get(self, index: int) -> Optional[HTMLCacheEntry]:
         """Get entry by index (0 = most recent)"""
         entry_json = redis_client.lindex(self.key, index)
@@ -131,6 +182,7 @@ class HTMLCache:
         """Get most recent entry"""
         return self.get(0)
     
+    @observe_redis("html_cache")
     def promote(self, entry: HTMLCacheEntry) -> None:
         """Move entry to the front of the cache"""
         try:
@@ -144,9 +196,11 @@ class HTMLCache:
             # Entry might not exist, that's okay
             pass
     
+    @observe_redis("html_cache")
     def clear(self) -> None:
         redis_client.delete(self.key)
     
+    @observe_redis("html_cache", "len")
     def __len__(self) -> int:
         return redis_client.llen(self.key)
     
@@ -222,8 +276,7 @@ WELCOME_HTML = '''
 <div class="quick-links">
   <h2>Quick Start</h2>
   <div class="link-cards">
-    <button class="link-card"
-      onclick="document.getElementById('chat-input').value='Show me your projects'; document.getElementById('chat-input').focus();">
+    <button class="link-card" data-quick-start="projects" data-prompt="Show me your projects">
       <svg class="card-icon" xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none"
         stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
         <path d="M22 19a2 2 0 0 1-2 2H4a2 2 0 0 1-2-2V5a2 2 0 0 1 2-2h5l2 3h9a2 2 0 0 1 2 2z"></path>
@@ -231,8 +284,7 @@ WELCOME_HTML = '''
       <span class="card-title">View Projects</span>
     </button>
     
-    <button class="link-card"
-      onclick="document.getElementById('chat-input').value='Tell me about your work experience'; document.getElementById('chat-input').focus();">
+    <button class="link-card" data-quick-start="experience" data-prompt="Tell me about your work experience">
       <svg class="card-icon" xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none"
         stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
         <rect x="2" y="7" width="20" height="14" rx="2" ry="2"></rect>
@@ -241,8 +293,7 @@ WELCOME_HTML = '''
       <span class="card-title">Experience</span>
     </button>
     
-    <button class="link-card"
-      onclick="document.getElementById('chat-input').value='Describe your education/coursework'; document.getElementById('chat-input').focus();">
+    <button class="link-card" data-quick-start="education" data-prompt="Describe your education/coursework">
       <svg class="card-icon" xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none"
         stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
         <path d="M22 10v6M2 10l10-5 10 5-10 5z"></path>
@@ -251,8 +302,7 @@ WELCOME_HTML = '''
       <span class="card-title">Education</span>
     </button>
     
-    <button class="link-card"
-      onclick="document.getElementById('chat-input').value='What are your technical skills?'; document.getElementById('chat-input').focus();">
+    <button class="link-card" data-quick-start="skills" data-prompt="What are your technical skills?">
       <svg class="card-icon" xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none"
         stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
         <polygon points="13 2 3 14 12 14 11 22 21 10 12 10 13 2"></polygon>
@@ -0,0 +1,24 @@
+import os
+
+from clients.redis_client import redis_client
+
+KB_VERSION_KEY = "kb:version"
+
+
+def get_kb_version() -> str:
+    """
+    Current knowledge-base version stamp.
+
+    The stamp is bumped by scripts/index_portfolio.py after every reindex so
+    caches keyed on it stop serving pages built from stale portfolio data.
+    KB_VERSION can pin it for deployments without an indexing step.
+    """
+    version = redis_client.get(KB_VERSION_KEY)
+    if version:
+        return str(version)
+    return os.getenv("KB_VERSION", "0")
+
+
+def bump_kb_version() -> str:
+    """Advance the knowledge-base version after the corpus changes"""
+    return str(redis_client.incr(KB_VERSION_KEY))
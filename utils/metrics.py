@@ -0,0 +1,571 @@
+import bisect
+import functools
+import json
+import os
+import socket
+import threading
+import time
+from typing import Iterable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict) -> tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"values": dict(self._values)}
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"values": dict(self._values)}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+                self._counts[key] = counts
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counts": {key: list(counts) for key, counts in self._counts.items()},
+                "sums": dict(self._sums),
+            }
+
+
+class MetricsRegistry:
+    """
+    Process-local metric registry. Updates are a lock and a dict write.
+
+    The locks are `threading` locks, which gevent's monkey patching turns into
+    cooperative locks, so recording is safe under both thread and gevent
+    workers. Cross-process aggregation happens at scrape time, see
+    `collect_metrics`.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def metrics(self) -> list[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> dict:
+        """JSON-serializable view of every metric, used to share across workers."""
+        snapshot = {}
+        for metric in self.metrics():
+            data = metric.snapshot()
+            entry = {
+                "kind": metric.kind,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+            }
+            if metric.kind == "histogram":
+                entry["buckets"] = list(metric.buckets)
+                entry["samples"] = [
+                    [list(key), counts, data["sums"].get(key, 0.0)]
+                    for key, counts in data["counts"].items()
+                ]
+            else:
+                entry["samples"] = [[list(key), value] for key, value in data["values"].items()]
+            snapshot[metric.name] = entry
+        return snapshot
+
+
+registry = MetricsRegistry()
+
+AGENT_QUEUE_WAIT_SECONDS = registry.histogram(
+    "portfolio_agent_queue_wait_seconds",
+    "Time requests waited for an execution slot before running, by stage.",
+    labelnames=("stage",),
+)
+AGENT_QUEUE_DEPTH = registry.gauge(
+    "portfolio_agent_queue_depth",
+    "Requests currently waiting for an execution slot, by stage.",
+    labelnames=("stage",),
+)
+AGENT_RUNNING = registry.gauge(
+    "portfolio_agent_running",
+    "Requests currently holding an execution slot, by stage.",
+    labelnames=("stage",),
+)
+AGENT_REJECTED_TOTAL = registry.counter(
+    "portfolio_agent_rejected_total",
+    "Requests rejected because the wait queue was full, by stage.",
+    labelnames=("stage",),
+)
+LLM_CALLS_PER_REQUEST = registry.histogram(
+    "portfolio_llm_calls_per_request",
+    "LLM calls made by the agent pipeline for one chat turn.",
+    buckets=(0, 1, 2, 3, 4, 6, 8),
+)
+HTTP_REQUESTS_TOTAL = registry.counter(
+    "portfolio_http_requests_total",
+    "HTTP requests handled, by route, method and status code.",
+    labelnames=("endpoint", "method", "status"),
+)
+SSE_STREAM_SECONDS = registry.histogram(
+    "portfolio_sse_stream_seconds",
+    "Lifetime of /chat/stream responses, by server and how the stream ended.",
+    labelnames=("server", "outcome"),
+)
+STAGE_SECONDS = registry.histogram(
+    "portfolio_stage_seconds",
+    "Time spent in each agent pipeline stage.",
+    labelnames=("stage",),
+)
+RETRIEVAL_CHUNKS = registry.histogram(
+    "portfolio_retrieval_chunks",
+    "Knowledge-base chunks returned per retrieval, by provider.",
+    labelnames=("provider",),
+    buckets=(0, 1, 2, 3, 5, 8, 10, 15, 20),
+)
+RETRIEVAL_SCORE = registry.histogram(
+    "portfolio_retrieval_score",
+    "Relevance scores of retrieved knowledge-base chunks, by provider.",
+    labelnames=("provider",),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+REDIS_OPERATION_SECONDS = registry.histogram(
+    "portfolio_redis_operation_seconds",
+    "Latency of Redis-backed store operations, by store and operation.",
+    labelnames=("store", "operation"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+CACHE_LOOKUPS_TOTAL = registry.counter(
+    "portfolio_cache_lookups_total",
+    "Cache lookups, by cache and result (hit or miss).",
+    labelnames=("cache", "result"),
+)
+AGENT_POOL_SIZE = registry.gauge(
+    "portfolio_agent_pool_size",
+    "Pooled agents built, idle or in use, by agent kind.",
+    labelnames=("agent",),
+)
+AGENT_POOL_IN_USE = registry.gauge(
+    "portfolio_agent_pool_in_use",
+    "Pooled agents currently checked out by a request, by agent kind.",
+    labelnames=("agent",),
+)
+AGENT_POOL_CHECKOUTS_TOTAL = registry.counter(
+    "portfolio_agent_pool_checkouts_total",
+    "Agent checkouts, by agent kind and whether an idle agent was reused or a new one built.",
+    labelnames=("agent", "result"),
+)
+INTENT_ROUTER_REQUESTS_TOTAL = registry.counter(
+    "portfolio_intent_router_requests_total",
+    "Orchestration decisions by who made them: rule, classifier, or fallback to the LLM.",
+    labelnames=("result",),
+)
+INTENT_ROUTER_SHADOW_TOTAL = registry.counter(
+    "portfolio_intent_router_shadow_total",
+    "Sampled routed requests also decided by the LLM, by router source and whether they agreed.",
+    labelnames=("source", "agreed"),
+)
+SPECULATIVE_RETRIEVAL_TOTAL = registry.counter(
+    "portfolio_speculative_retrieval_total",
+    "Speculative retrievals started during the orchestration decision, by outcome "
+    "(reused, merged, wasted, failed).",
+    labelnames=("outcome",),
+)
+QUICK_START_REQUESTS_TOTAL = registry.counter(
+    "portfolio_quick_start_requests_total",
+    "Quick-start card requests by page and whether a pre-rendered page was served (hit) or not (miss).",
+    labelnames=("page", "result"),
+)
+HTML_PATCH_TOTAL = registry.counter(
+    "portfolio_html_patch_total",
+    "Patch-based refinements by result: applied, declined by the model, rejected by "
+    "validation, or failed; all but applied fall back to full regeneration.",
+    labelnames=("result",),
+)
+KB_CONTEXT_TOKENS = registry.histogram(
+    "portfolio_kb_context_tokens",
+    "Estimated knowledge-base context tokens per generation: packed into the prompt, "
+    "or saved against including every retrieved chunk.",
+    labelnames=("kind",),
+    buckets=(0, 250, 500, 1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000),
+)
+LLM_INPUT_TOKENS_TOTAL = registry.counter(
+    "portfolio_llm_input_tokens_total",
+    "Prompt tokens sent to the model, by provider and kind: input as reported by the "
+    "provider, cache_read served from the provider's prompt cache, cache_write newly cached.",
+    labelnames=("provider", "kind"),
+)
+LLM_CALL_SECONDS = registry.histogram(
+    "portfolio_llm_call_seconds",
+    "Model call latency to the first streamed event and to completion, by provider "
+    "and whether any prompt tokens were read from the provider's cache.",
+    labelnames=("provider", "phase", "cache"),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_ROUTING_DECISIONS_TOTAL = registry.counter(
+    "portfolio_llm_routing_decisions_total",
+    "Model calls by the provider the router tried first.",
+    labelnames=("provider",),
+)
+LLM_HEDGES_TOTAL = registry.counter(
+    "portfolio_llm_hedges_total",
+    "Hedged model calls, sent to a second provider when the first had not answered "
+    "within the hedge delay, by provider pair and which one answered first.",
+    labelnames=("primary", "hedge", "winner"),
+)
+LLM_PROVIDER_CALLS_TOTAL = registry.counter(
+    "portfolio_llm_provider_calls_total",
+    "Routed model calls by provider and result: ok, error, or cancelled after "
+    "losing a hedge.",
+    labelnames=("provider", "result"),
+)
+LLM_PROVIDER_FIRST_EVENT_SECONDS = registry.histogram(
+    "portfolio_llm_provider_first_event_seconds",
+    "Time to a routed provider's first streamed event, per successful call; routing "
+    "orders providers by the rolling median of these.",
+    labelnames=("provider",),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30),
+)
+LLM_RESPONSE_CACHE_SECONDS = registry.histogram(
+    "portfolio_llm_response_cache_seconds",
+    "Duration of cacheable model calls, replayed from the response cache (hit) "
+    "or sent to the provider (miss).",
+    labelnames=("result",),
+    buckets=(0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+HTML_SPEC_TOTAL = registry.counter(
+    "portfolio_html_spec_total",
+    "Fresh pages generated as a page spec, by result: rendered through the component "
+    "templates, declined by the model, rejected by rendering or validation, or failed; "
+    "all but rendered fall back to free-form HTML.",
+    labelnames=("result",),
+)
+HTML_GENERATION_OUTPUT_TOKENS = registry.histogram(
+    "portfolio_html_generation_output_tokens",
+    "Model output tokens per generated page, by mode: spec (rendered from a page spec) "
+    "or html (free-form markup).",
+    labelnames=("mode",),
+    buckets=(50, 100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000),
+)
+HTML_GENERATION_SECONDS = registry.histogram(
+    "portfolio_html_generation_seconds",
+    "Time from the generation call to a validated page, by mode.",
+    labelnames=("mode",),
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+HTML_FIRST_PAINT_SECONDS = registry.histogram(
+    "portfolio_html_first_paint_seconds",
+    "Time from the start of page generation to the first page content sent to the client "
+    "(an html_chunk or html_section event, or else the finished page), by how the page was "
+    "made: html, spec, spec_fallback (spec declined, then free-form HTML), sections or patch.",
+    labelnames=("mode",),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+HTML_SECTIONS_TOTAL = registry.counter(
+    "portfolio_html_sections_total",
+    "Sections of multi-topic pages generated concurrently, by result: rendered, declined "
+    "by the model, rejected by rendering, or failed; failed sections are left out of the page.",
+    labelnames=("result",),
+)
+HTML_SECTION_SECONDS = registry.histogram(
+    "portfolio_html_section_seconds",
+    "Time to retrieve for, generate and render one section of a multi-topic page.",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+STARTUP_SECONDS = registry.histogram(
+    "portfolio_startup_seconds",
+    "Time spent importing the app and warming each service, by phase.",
+    labelnames=("phase",),
+)
+
+
+def observe_redis(store: str, operation: str | None = None):
+    """Decorate a store method to record its latency, labelled by method name."""
+    def decorator(fn):
+        name = operation or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REDIS_OPERATION_SECONDS.observe(
+                    time.perf_counter() - started, store=store, operation=name
+                )
+        return wrapper
+    return decorator
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS_TOTAL.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_stage_timings(timings: dict[str, float]) -> None:
+    """Observe a StageTimer's millisecond durations in the stage histogram."""
+    for stage, duration_ms in timings.items():
+        STAGE_SECONDS.observe(duration_ms / 1000, stage=stage)
+
+
+# ----------------------------
+# Multi-worker aggregation
+# ----------------------------
+
+WORKERS_KEY = "metrics:workers"
+
+
+def shared_metrics_enabled() -> bool:
+    return os.getenv("METRICS_SHARED", "true").lower() == "true"
+
+
+def _worker_id() -> str:
+    # Read on every call: gunicorn --preload forks workers after import.
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+_publish_lock = threading.Lock()
+_last_published = 0.0
+
+
+def publish_worker_snapshot(force: bool = False) -> None:
+    """
+    Store this worker's snapshot in Redis so any worker can answer a scrape
+    with totals for the whole deployment. Throttled to once per
+    METRICS_PUBLISH_INTERVAL seconds unless `force` is set.
+    """
+    global _last_published
+
+    if not shared_metrics_enabled():
+        return
+
+    interval = _publish_interval()
+    now = time.monotonic()
+    with _publish_lock:
+        if not force and now - _last_published < interval:
+            return
+        _last_published = now
+
+    from clients.redis_client import redis_client
+
+    try:
+        redis_client.hset(
+            WORKERS_KEY,
+            _worker_id(),
+            json.dumps({"updated": time.time(), "metrics": registry.snapshot()}),
+        )
+    except Exception as e:
+        print(f"Could not publish metrics snapshot: {e}")
+
+
+_publisher_pid: int | None = None
+
+
+def start_snapshot_publisher() -> None:
+    """
+    Publish this worker's snapshot every METRICS_PUBLISH_INTERVAL seconds from
+    a daemon thread, so an idle worker stays current and a dead one ages out.
+    Cheap enough to call per request; starts one thread per process,
+    including in workers forked after it ran.
+    """
+    global _publisher_pid
+
+    if not shared_metrics_enabled():
+        return
+    with _publish_lock:
+        if _publisher_pid == os.getpid():
+            return
+        _publisher_pid = os.getpid()
+    threading.Thread(target=_publish_periodically, name="metrics-publisher", daemon=True).start()
+
+
+def _publish_periodically() -> None:
+    interval = _publish_interval()
+    while True:
+        publish_worker_snapshot(force=True)
+        time.sleep(interval)
+
+
+def _publish_interval() -> float:
+    return float(os.getenv("METRICS_PUBLISH_INTERVAL", "15"))
+
+
+def _worker_snapshots() -> list[dict]:
+    from clients.redis_client import redis_client
+
+    # Live workers republish every interval, so a few missed ones means the worker is gone
+    max_age = float(os.getenv("METRICS_WORKER_TTL") or 3 * _publish_interval())
+    snapshots = []
+    stale = []
+    for worker_id, raw in (redis_client.hgetall(WORKERS_KEY) or {}).items():
+        data = json.loads(raw)
+        if time.time() - data["updated"] > max_age:
+            stale.append(worker_id)
+        else:
+            snapshots.append(data["metrics"])
+    if stale:
+        redis_client.hdel(WORKERS_KEY, *stale)
+    return snapshots
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    """Sum counters, gauges and histogram buckets across worker snapshots."""
+    merged: dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, entry in snapshot.items():
+            target = merged.setdefault(name, {**entry, "samples": {}})
+            for sample in entry["samples"]:
+                key = tuple(sample[0])
+                if entry["kind"] == "histogram":
+                    counts, total = target["samples"].get(key, ([0] * len(sample[1]), 0.0))
+                    target["samples"][key] = (
+                        [a + b for a, b in zip(counts, sample[1])],
+                        total + sample[2],
+                    )
+                else:
+                    target["samples"][key] = target["samples"].get(key, 0.0) + sample[1]
+    return merged
+
+
+def collect_metrics() -> dict:
+    """
+    Metrics for every live worker when sharing is enabled, otherwise just this
+    process. Falls back to this process if Redis is unavailable.
+    """
+    if shared_metrics_enabled():
+        publish_worker_snapshot(force=True)
+        try:
+            return merge_snapshots(_worker_snapshots())
+        except Exception as e:
+            print(f"Could not read shared metrics: {e}")
+    return merge_snapshots([registry.snapshot()])
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: list[str], values: Iterable[str], extra: dict | None = None) -> str:
+    pairs = [(name, value) for name, value in zip(labelnames, values)]
+    pairs += list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(merged: dict) -> str:
+    """Render merged metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, entry in sorted(merged.items()):
+        lines.append(f"# HELP {name} {entry['documentation']}")
+        lines.append(f"# TYPE {name} {entry['kind']}")
+        labelnames = entry["labelnames"]
+
+        for key, value in sorted(entry["samples"].items()):
+            if entry["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                continue
+
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(entry["buckets"] + ["+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                lines.append(
+                    f"{name}_bucket{_format_labels(labelnames, key, {'le': le})} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
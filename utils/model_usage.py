@@ -0,0 +1,72 @@
+"""
+Per-call model usage.
+
+Every model created through utils.ai_config is wrapped so each call reports
+its prompt-cache usage and latency: cached and uncached input tokens, time
+to the first streamed event, and total duration. Comparing calls with and
+without cache reads shows what the provider's prompt caching saves.
+"""
+import time
+from typing import Any, AsyncIterable, Optional
+
+from strands.models import Model
+
+from utils.metrics import LLM_CALL_SECONDS, LLM_INPUT_TOKENS_TOTAL
+
+
+def record_model_call(provider: str, usage: dict, first_event_seconds: float, total_seconds: float) -> None:
+    cache_read = usage.get("cacheReadInputTokens", 0)
+    cache_write = usage.get("cacheWriteInputTokens", 0)
+    cache = "hit" if cache_read else "miss"
+
+    LLM_INPUT_TOKENS_TOTAL.inc(usage.get("inputTokens", 0), provider=provider, kind="input")
+    if cache_read:
+        LLM_INPUT_TOKENS_TOTAL.inc(cache_read, provider=provider, kind="cache_read")
+    if cache_write:
+        LLM_INPUT_TOKENS_TOTAL.inc(cache_write, provider=provider, kind="cache_write")
+    LLM_CALL_SECONDS.observe(first_event_seconds, provider=provider, phase="first_token", cache=cache)
+    LLM_CALL_SECONDS.observe(total_seconds, provider=provider, phase="total", cache=cache)
+
+    print(
+        f"[LLM] provider={provider} | input_tokens={usage.get('inputTokens', 0)} "
+        f"| cache_read={cache_read} | cache_write={cache_write} "
+        f"| first_token_ms={first_event_seconds * 1000:.0f} | total_ms={total_seconds * 1000:.0f}"
+    )
+
+
+class UsageReportingModel(Model):
+    """Delegates to `model`, recording each streamed call's usage and latency"""
+
+    reports_usage = True
+
+    def __init__(self, model: Model, provider: str):
+        self.model = model
+        self.provider = provider
+
+    def __getattr__(self, name: str):
+        # strands reads `model.config`; provider-specific attributes pass through too
+        return getattr(self.model, name)
+
+    def update_config(self, **model_config: Any) -> None:
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        return self.model.get_config()
+
+    async def stream(self, *args: Any, **kwargs: Any) -> AsyncIterable[dict]:
+        started = time.perf_counter()
+        first_event: Optional[float] = None
+        usage: Optional[dict] = None
+        async for event in self.model.stream(*args, **kwargs):
+            if first_event is None and ("contentBlockDelta" in event or "contentBlockStart" in event):
+                first_event = time.perf_counter() - started
+            if "metadata" in event:
+                usage = event["metadata"].get("usage")
+            yield event
+
+        if usage is not None:
+            total = time.perf_counter() - started
+            record_model_call(self.provider, usage, first_event if first_event is not None else total, total)
+
+    def structured_output(self, *args: Any, **kwargs: Any):
+        return self.model.structured_output(*args, **kwargs)
@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, Optional
+
+from clients.redis_client import redis_client
+from utils.metrics import record_cache_lookup
+
+
+@dataclass
+class PageCacheEntry:
+    instruction: str
+    html: str
+    kb_version: str
+    timestamp: str
+
+    def to_dict(self):
+        return {
+            "instruction": self.instruction,
+            "html": self.html,
+            "kb_version": self.kb_version,
+            "timestamp": self.timestamp
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return PageCacheEntry(
+            instruction=data["instruction"],
+            html=data["html"],
+            kb_version=data["kb_version"],
+            timestamp=data["timestamp"]
+        )
+
+
+def normalize_instruction(instruction: str) -> str:
+    """Case, whitespace and punctuation insensitive form of an instruction"""
+    text = re.sub(r"[^\w\s]", " ", instruction.lower())
+    return " ".join(text.split())
+
+
+class PageCache:
+    """
+    Generated pages shared by every session.
+
+    Only fresh (non-refinement) pages are stored, keyed on the normalized
+    orchestrator instruction and the knowledge-base version. A sorted set of
+    last-access times bounds the number of entries; the least recently used
+    pages are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 500, ttl: int = 7 * 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = "page_cache"
+        self.index_key = f"{self.prefix}:index"
+        self.stats_key = f"{self.prefix}:stats"
+
+    def key_for(self, instruction: str, kb_version: str, requires_external_data: bool = True) -> str:
+        """Cache key for a page; also identifies identical in-flight generations"""
+        fingerprint = f"{normalize_instruction(instruction)}|external={requires_external_data}"
+        digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:32]
+        return f"{self.prefix}:{kb_version}:{digest}"
+
+    def get(
+        self,
+        instruction: str,
+        kb_version: str,
+        requires_external_data: bool = True,
+    ) -> Optional[PageCacheEntry]:
+        key = self.key_for(instruction, kb_version, requires_external_data)
+        entry_json = redis_client.get(key)
+
+        pipe = redis_client.pipeline()
+        if entry_json:
+            pipe.hincrby(self.stats_key, "hits", 1)
+            pipe.zadd(self.index_key, {key: time.time()})
+            pipe.expire(key, self.ttl)
+        else:
+            pipe.hincrby(self.stats_key, "misses", 1)
+        pipe.execute()
+        record_cache_lookup("page", hit=bool(entry_json))
+
+        if not entry_json:
+            return None
+        return PageCacheEntry.from_dict(json.loads(entry_json))
+
+    def add(
+        self,
+        instruction: str,
+        kb_version: str,
+        html: str,
+        requires_external_data: bool = True,
+    ) -> None:
+        key = self.key_for(instruction, kb_version, requires_external_data)
+        entry = PageCacheEntry(
+            instruction=instruction,
+            html=html,
+            kb_version=kb_version,
+            timestamp=datetime.now(timezone.utc).isoformat()
+        )
+
+        pipe = redis_client.pipeline()
+        pipe.set(key, json.dumps(entry.to_dict()), ex=self.ttl)
+        pipe.zadd(self.index_key, {key: time.time()})
+        pipe.execute()
+
+        self._evict()
+
+    def _evict(self) -> None:
+        overflow = redis_client.zcard(self.index_key) - self.max_entries
+        if overflow <= 0:
+            return
+
+        evicted = redis_client.zpopmin(self.index_key, overflow)
+        keys = [key for key, _ in evicted]
+        if keys:
+            redis_client.delete(*keys)
+            redis_client.hincrby(self.stats_key, "evictions", len(keys))
+
+    def stats(self) -> Dict[str, float]:
+        raw = redis_client.hgetall(self.stats_key) or {}
+        hits = int(raw.get("hits", 0))
+        misses = int(raw.get("misses", 0))
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": int(raw.get("evictions", 0)),
+            "entries": redis_client.zcard(self.index_key),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        keys = redis_client.zrange(self.index_key, 0, -1)
+        if keys:
+            redis_client.delete(*keys)
+        redis_client.delete(self.index_key, self.stats_key)
+
+
+def page_cache_enabled() -> bool:
+    return os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+
+
+page_cache = PageCache(
+    max_entries=int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "500")),
+    ttl=int(os.getenv("PAGE_CACHE_TTL", str(7 * 86400))),
+)
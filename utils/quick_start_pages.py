@@ -0,0 +1,187 @@
+"""
+Pre-rendered quick-start pages.
+
+The quick-start cards on the welcome page always ask for the same four
+pages. They are generated ahead of time for the current knowledge-base
+version and served from /quick-start/<page> without any model call.
+
+scripts/index_portfolio.py renders them after every reindex. A request that
+finds no page for the current version starts a background render, guarded
+by a Redis lock so only one worker renders, and the client falls back to the
+live chat path meanwhile. Background renders take an agent admission slot
+per page, like live requests, so they never add to the generation load the
+web workers admit.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import json
+import os
+import threading
+from typing import Optional
+import uuid
+
+from clients.redis_client import redis_client
+from utils.admission import AdmissionController, AdmissionRejected, agent_admission
+from utils.kb_version import get_kb_version
+from utils.metrics import QUICK_START_REQUESTS_TOTAL
+
+# Card name -> the chat message the card stands for
+QUICK_START_PROMPTS = {
+    "projects": "Show me your projects",
+    "experience": "Tell me about your work experience",
+    "education": "Describe your education/coursework",
+    "skills": "What are your technical skills?",
+}
+
+PREFIX = "quick_start"
+LOCK_KEY = f"{PREFIX}:render_lock"
+
+
+@dataclass
+class QuickStartPage:
+    name: str
+    prompt: str
+    chat_message: str
+    html: str
+    kb_version: str
+    timestamp: str
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "prompt": self.prompt,
+            "chat_message": self.chat_message,
+            "html": self.html,
+            "kb_version": self.kb_version,
+            "timestamp": self.timestamp
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return QuickStartPage(
+            name=data["name"],
+            prompt=data["prompt"],
+            chat_message=data["chat_message"],
+            html=data["html"],
+            kb_version=data["kb_version"],
+            timestamp=data["timestamp"]
+        )
+
+
+def quick_start_pages_enabled() -> bool:
+    return os.getenv("QUICK_START_PAGES_ENABLED", "true").lower() == "true"
+
+
+def page_key(name: str, kb_version: str) -> str:
+    return f"{PREFIX}:{kb_version}:{name}"
+
+
+def load_page(name: str, kb_version: str) -> Optional[QuickStartPage]:
+    data = redis_client.get(page_key(name, kb_version))
+    return QuickStartPage.from_dict(json.loads(data)) if data else None
+
+
+def render_page(name: str, kb_version: str) -> QuickStartPage:
+    """
+    Generate one page the way the live path would for the card's prompt.
+    Goes through the shared page cache, so the live fallback for the same
+    request is served from it too.
+    """
+    from agents.orchestrator.intent_router import decision_for_intent
+    from agents.orchestrator.tools.orchestrator_tools import generate_html_from_request
+
+    decision = decision_for_intent(name)
+    result = json.loads(generate_html_from_request(
+        instruction=decision.instruction,
+        refine_previous=decision.refine_previous,
+        requires_external_data=decision.requires_external_data,
+    ))
+    if not result.get("success") or not result.get("html"):
+        raise RuntimeError(result.get("error_message") or "generation returned no HTML")
+
+    return QuickStartPage(
+        name=name,
+        prompt=QUICK_START_PROMPTS[name],
+        chat_message=decision.chat_message,
+        html=result["html"],
+        kb_version=kb_version,
+        timestamp=datetime.now(timezone.utc).isoformat()
+    )
+
+
+def prerender_pages(force: bool = False, admission: AdmissionController | None = None) -> dict[str, str]:
+    """
+    Render every quick-start page missing for the current knowledge-base
+    version, or all of them with `force`. Returns each page's outcome.
+
+    With `admission`, each page waits for a slot there and rendering stops
+    if its queue is full.
+    """
+    kb_version = get_kb_version()
+    ttl = int(os.getenv("QUICK_START_TTL", str(30 * 86400)))
+    outcomes = {}
+    for name in QUICK_START_PROMPTS:
+        if not force and redis_client.exists(page_key(name, kb_version)):
+            outcomes[name] = "current"
+            continue
+        ticket = None
+        try:
+            if admission:
+                ticket = admission.reserve()
+                if not admission.wait(ticket):
+                    outcomes[name] = "cancelled"
+                    continue
+            page = render_page(name, kb_version)
+        except AdmissionRejected:
+            outcomes[name] = "busy"
+            break
+        except Exception as e:
+            print(f"Could not pre-render quick-start page {name}: {e}")
+            outcomes[name] = f"failed: {e}"
+            continue
+        finally:
+            if ticket:
+                admission.finish(ticket)
+        redis_client.set(page_key(name, kb_version), json.dumps(page.to_dict()), ex=ttl)
+        outcomes[name] = "rendered"
+    print(f"Quick-start pages for knowledge base version {kb_version}: {outcomes}")
+    return outcomes
+
+
+def _release_lock(token: str) -> None:
+    # Only our own lock: after its TTL another worker may hold a new one
+    if redis_client.get(LOCK_KEY) == token:
+        redis_client.delete(LOCK_KEY)
+
+
+def _prerender_in_background(token: str) -> None:
+    try:
+        prerender_pages(admission=agent_admission)
+    finally:
+        _release_lock(token)
+
+
+def schedule_prerender() -> bool:
+    """Start a background render unless one is already running on any worker"""
+    lock_seconds = int(os.getenv("QUICK_START_RENDER_LOCK_SECONDS", "600"))
+    token = uuid.uuid4().hex
+    if not redis_client.set(LOCK_KEY, token, nx=True, ex=lock_seconds):
+        return False
+    threading.Thread(
+        target=_prerender_in_background, args=(token,), daemon=True, name="quick-start-prerender"
+    ).start()
+    return True
+
+
+def get_quick_start_page(name: str) -> Optional[QuickStartPage]:
+    """The pre-rendered page for the current knowledge base, or None"""
+    if name not in QUICK_START_PROMPTS or not quick_start_pages_enabled():
+        return None
+    page = load_page(name, get_kb_version())
+    QUICK_START_REQUESTS_TOTAL.inc(page=name, result="hit" if page else "miss")
+    if page is None:
+        try:
+            schedule_prerender()
+        except Exception as e:
+            print(f"Could not schedule quick-start pre-render: {e}")
+    return page
@@ -1,14 +1,16 @@
 import os
+import threading
 
 from clients.retrieval.base import RetrievalClient
 from clients.retrieval.local_keyword_client import LocalKeywordRetrievalClient
-from clients.retrieval.upstash_vector_client import UpstashVectorRetrievalClient
 
 
 def create_retrieval_client() -> RetrievalClient:
     provider = os.getenv("RETRIEVAL_PROVIDER", "local").lower()
 
     if provider == "upstash":
+        from clients.retrieval.upstash_vector_client import UpstashVectorRetrievalClient
+
         return UpstashVectorRetrievalClient(
             rest_url=os.getenv("UPSTASH_VECTOR_REST_URL", ""),
             rest_token=os.getenv("UPSTASH_VECTOR_REST_TOKEN", ""),
@@ -34,6 +36,14 @@ def create_retrieval_client() -> RetrievalClient:
             )
         )
 
+    if provider == "simulated":
+        from clients.retrieval.simulated_client import SimulatedRetrievalClient
+
+        return SimulatedRetrievalClient(
+            latency_ms=float(os.getenv("SIMULATED_RETRIEVAL_LATENCY_MS", "50")),
+            chunk_count=int(os.getenv("SIMULATED_RETRIEVAL_CHUNKS", "6")),
+        )
+
     if provider == "local":
         return LocalKeywordRetrievalClient(
             data_dir=os.getenv("LOCAL_RAG_DATA_DIR", "data"),
@@ -42,4 +52,28 @@ def create_retrieval_client() -> RetrievalClient:
     raise ValueError(f"Unsupported RETRIEVAL_PROVIDER: {provider}")
 
 
-retrieval_client_singleton = create_retrieval_client()
+_retrieval_client: RetrievalClient | None = None
+_retrieval_client_lock = threading.Lock()
+
+
+def get_retrieval_client() -> RetrievalClient:
+    """
+    Shared retrieval client, created on first use.
+
+    Building it can read and chunk the whole local corpus or open remote
+    clients, so it is deferred from import time to the first request or
+    to the warm-up hook.
+    """
+    global _retrieval_client
+    if _retrieval_client is None:
+        with _retrieval_client_lock:
+            if _retrieval_client is None:
+                _retrieval_client = create_retrieval_client()
+    return _retrieval_client
+
+
+def __getattr__(name: str):
+    # Keeps `retrieval_client_singleton` importable without building it eagerly
+    if name == "retrieval_client_singleton":
+        return get_retrieval_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,450 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from clients.redis_client import async_redis_client, redis_client
+
+ProgressCallback = Callable[[Any], None]
+
+# High-volume progress payloads kept to this worker's subscribers
+LOCAL_ONLY_STATUSES = frozenset({"html_chunk"})
+
+
+class SharedFlightError(RuntimeError):
+    """Raised in waiters when the shared execution they joined failed."""
+
+
+class _Subscriber:
+    """A progress callback and the lock that keeps its messages in order."""
+
+    def __init__(self, callback: ProgressCallback):
+        self.callback = callback
+        self.lock = threading.Lock()
+
+    def deliver(self, message: Any) -> None:
+        with self.lock:
+            self.callback(message)
+
+
+class _Flight:
+    """
+    One in-process execution and the callbacks waiting on it.
+
+    Callbacks run outside `lock`: they may write to Redis, and a slow one
+    must not hold up the leader or other subscribers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.history: list[Any] = []
+        self.subscribers: list[_Subscriber] = []
+        self.done_callbacks: list[Callable[[], None]] = []
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+    def subscribe(self, callback: ProgressCallback) -> None:
+        # Late joiners first receive everything published so far. Holding the
+        # subscriber's own lock during the replay makes new messages wait for it.
+        subscriber = _Subscriber(callback)
+        with subscriber.lock:
+            with self.lock:
+                history = list(self.history)
+                self.subscribers.append(subscriber)
+            for message in history:
+                callback(message)
+
+    def publish(self, message: Any) -> None:
+        with self.lock:
+            self.history.append(message)
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.deliver(message)
+
+    def finish(self, result: Any, error: BaseException | None) -> None:
+        with self.lock:
+            self.result = result
+            self.error = error
+            self.done.set()
+            done_callbacks = list(self.done_callbacks)
+        for callback in done_callbacks:
+            callback()
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        with self.lock:
+            if not self.done.is_set():
+                self.done_callbacks.append(callback)
+                return
+        callback()
+
+    def outcome(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class _RemoteOutbox:
+    """Publishes events in order from a daemon thread until closed."""
+
+    def __init__(self, publish: Callable[[dict], None]):
+        self._publish = publish
+        self._events: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="single-flight-outbox", daemon=True)
+        self._thread.start()
+
+    def put(self, event: dict) -> None:
+        self._events.put(event)
+
+    def close(self) -> None:
+        """Publish what is queued, then stop"""
+        self._events.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while (event := self._events.get()) is not None:
+            try:
+                self._publish(event)
+            except Exception as e:
+                print(f"Could not publish shared flight event: {e}")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent executions of identical jobs.
+
+    The first caller for a key becomes the leader and runs the job; callers
+    that arrive while it is in flight subscribe to its progress messages and
+    receive the same result. With `distributed=True` a Redis lock elects one
+    leader across worker processes, and other workers relay its progress and
+    result from a pub/sub channel instead of running the job themselves.
+
+    Progress messages and results must be JSON serializable when distributed.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "single_flight",
+        distributed: bool = True,
+        lock_ttl: int = 300,
+        result_ttl: int = 60,
+    ):
+        self.namespace = namespace
+        self.distributed = distributed
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "followers": 0, "remote_followers": 0}
+
+    def _join(self, key: str) -> tuple[_Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats["followers"] += 1
+                return flight, False
+
+            flight = _Flight()
+            self._flights[key] = flight
+            self._stats["leaders"] += 1
+            return flight, True
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
+
+    # ----------------------------
+    # Blocking API
+    # ----------------------------
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[ProgressCallback], Any],
+        progress_callback: ProgressCallback | None = None,
+    ) -> Any:
+        """Run `fn(progress)` once per key among concurrent callers."""
+        flight, is_leader = self._join(key)
+        if progress_callback:
+            flight.subscribe(progress_callback)
+
+        if not is_leader:
+            flight.done.wait()
+            return flight.outcome()
+
+        try:
+            result = self._lead(key, fn, flight.publish)
+        except BaseException as exc:
+            flight.finish(None, exc)
+            raise
+        else:
+            flight.finish(result, None)
+        finally:
+            self._forget(key, flight)
+
+        return result
+
+    def _lead(self, key: str, fn: Callable[[ProgressCallback], Any], publish: ProgressCallback) -> Any:
+        if not self.distributed:
+            return fn(publish)
+
+        token = self._acquire(key)
+        if token is None:
+            remote = self._wait_for_remote(key, publish)
+            if remote is not None:
+                return remote["result"]
+            token = self._acquire(key)
+
+        relay = self._relay(key, publish) if token else publish
+        try:
+            result = fn(relay)
+        except BaseException as exc:
+            if token:
+                self._publish_remote(key, {"type": "error", "message": str(exc) or type(exc).__name__})
+            raise
+        finally:
+            if token:
+                self._release(key, token)
+
+        if token:
+            self._store_remote_result(key, token, result)
+        return result
+
+    # ----------------------------
+    # Async API
+    # ----------------------------
+
+    async def do_async(
+        self,
+        key: str,
+        coro_fn: Callable[[ProgressCallback], Awaitable[Any]],
+        progress_callback: ProgressCallback | None = None,
+    ) -> Any:
+        """Await `coro_fn(progress)` once per key among concurrent callers."""
+        flight, is_leader = self._join(key)
+        if progress_callback:
+            flight.subscribe(progress_callback)
+
+        if not is_leader:
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+
+            def resolve():
+                if not waiter.done():
+                    waiter.set_result(None)
+
+            flight.add_done_callback(lambda: loop.call_soon_threadsafe(resolve))
+            await waiter
+            return flight.outcome()
+
+        try:
+            result = await self._lead_async(key, coro_fn, flight.publish)
+        except asyncio.CancelledError:
+            # Followers should not inherit the leader's cancellation.
+            flight.finish(None, SharedFlightError("Shared generation was cancelled"))
+            raise
+        except BaseException as exc:
+            flight.finish(None, exc)
+            raise
+        else:
+            flight.finish(result, None)
+        finally:
+            self._forget(key, flight)
+
+        return result
+
+    async def _lead_async(
+        self,
+        key: str,
+        coro_fn: Callable[[ProgressCallback], Awaitable[Any]],
+        publish: ProgressCallback,
+    ) -> Any:
+        if not self.distributed:
+            return await coro_fn(publish)
+
+        token = await asyncio.to_thread(self._acquire, key)
+        if token is None:
+            remote = await self._wait_for_remote_async(key, publish)
+            if remote is not None:
+                return remote["result"]
+            token = await asyncio.to_thread(self._acquire, key)
+
+        if not token:
+            return await coro_fn(publish)
+
+        # Events are published from the outbox thread, so the loop never waits on Redis
+        outbox = _RemoteOutbox(lambda event: self._publish_remote(key, event))
+        try:
+            result = await coro_fn(self._relay(key, publish, outbox.put))
+        except BaseException as exc:
+            outbox.put({"type": "error", "message": str(exc) or type(exc).__name__})
+            raise
+        finally:
+            await asyncio.to_thread(outbox.close)
+            await asyncio.to_thread(self._release, key, token)
+
+        await asyncio.to_thread(self._store_remote_result, key, token, result)
+        return result
+
+    # ----------------------------
+    # Cross-worker coordination
+    # ----------------------------
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.namespace}:lock:{key}"
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.namespace}:result:{key}"
+
+    def _channel(self, key: str) -> str:
+        return f"{self.namespace}:events:{key}"
+
+    def _acquire(self, key: str) -> str | None:
+        token = uuid.uuid4().hex
+        if redis_client.set(self._lock_key(key), token, nx=True, ex=self.lock_ttl):
+            return token
+        return None
+
+    def _release(self, key: str, token: str) -> None:
+        if redis_client.get(self._lock_key(key)) == token:
+            redis_client.delete(self._lock_key(key))
+
+    def _relay(
+        self,
+        key: str,
+        publish: ProgressCallback,
+        remote_publish: Callable[[dict], None] | None = None,
+    ) -> ProgressCallback:
+        """
+        Progress callback for the leader: local subscribers get every message,
+        followers on other workers only status messages. Streamed HTML is left
+        out; remote followers get the page from the result.
+        """
+        remote_publish = remote_publish or (lambda event: self._publish_remote(key, event))
+
+        def relay(message: Any) -> None:
+            publish(message)
+            if not (isinstance(message, dict) and message.get("status") in LOCAL_ONLY_STATUSES):
+                remote_publish({"type": "progress", "message": message})
+
+        return relay
+
+    def _publish_remote(self, key: str, event: dict) -> None:
+        redis_client.publish(self._channel(key), json.dumps(event))
+
+    def _store_remote_result(self, key: str, token: str, result: Any) -> None:
+        # Tagged with the leader's lock token so followers of a later flight ignore it
+        redis_client.set(self._result_key(key), json.dumps({"token": token, "result": result}), ex=self.result_ttl)
+        self._publish_remote(key, {"type": "result", "result": result})
+
+    @staticmethod
+    def _stored_result(stored: str | None, leader: str | None) -> dict | None:
+        """
+        {"result": ...} from the stored result, unless it was left by an
+        earlier flight than the one led by `leader`
+        """
+        if stored is None:
+            return None
+        data = json.loads(stored)
+        if leader is not None and data["token"] != leader:
+            return None
+        return {"result": data["result"]}
+
+    @staticmethod
+    def _remote_event(data: str, publish: ProgressCallback) -> dict | None:
+        """Handle one event from the leader; {"result": ...} once it finished"""
+        event = json.loads(data)
+        if event["type"] == "progress":
+            publish(event["message"])
+        elif event["type"] == "result":
+            return {"result": event["result"]}
+        elif event["type"] == "error":
+            raise SharedFlightError(event["message"])
+        return None
+
+    def _wait_for_remote(self, key: str, publish: ProgressCallback) -> dict | None:
+        """
+        Relay another worker's execution of `key`.
+
+        Returns {"result": ...} once it finishes, or None when the remote
+        leader disappeared without a result and this worker should run the
+        job itself.
+        """
+        with self._lock:
+            self._stats["remote_followers"] += 1
+
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel(key))
+        try:
+            # Checked after subscribing so a result published just before the
+            # subscription is not missed.
+            leader = redis_client.get(self._lock_key(key))
+            remote = self._stored_result(redis_client.get(self._result_key(key)), leader)
+            if remote is not None:
+                return remote
+
+            deadline = time.monotonic() + self.lock_ttl
+            while time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    if not redis_client.exists(self._lock_key(key)):
+                        return self._stored_result(redis_client.get(self._result_key(key)), leader)
+                    continue
+
+                remote = self._remote_event(message["data"], publish)
+                if remote is not None:
+                    return remote
+            return None
+        finally:
+            pubsub.close()
+
+    async def _wait_for_remote_async(self, key: str, publish: ProgressCallback) -> dict | None:
+        """
+        _wait_for_remote on the asyncio client. Following can take up to
+        `lock_ttl`, far too long to hold a thread of the shared default
+        executor.
+        """
+        with self._lock:
+            self._stats["remote_followers"] += 1
+
+        pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._channel(key))
+        try:
+            leader = await async_redis_client.get(self._lock_key(key))
+            remote = self._stored_result(await async_redis_client.get(self._result_key(key)), leader)
+            if remote is not None:
+                return remote
+
+            deadline = time.monotonic() + self.lock_ttl
+            while time.monotonic() < deadline:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    if not await async_redis_client.exists(self._lock_key(key)):
+                        return self._stored_result(await async_redis_client.get(self._result_key(key)), leader)
+                    continue
+
+                remote = self._remote_event(message["data"], publish)
+                if remote is not None:
+                    return remote
+            return None
+        finally:
+            await pubsub.aclose()
+
+
+def single_flight_enabled() -> bool:
+    return os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+
+generation_flight = SingleFlight(
+    namespace="single_flight:html",
+    distributed=os.getenv("SINGLE_FLIGHT_DISTRIBUTED", "true").lower() == "true",
+)
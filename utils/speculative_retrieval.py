@@ -0,0 +1,132 @@
+"""
+Speculative knowledge-base retrieval.
+
+The orchestrator LLM takes long enough that retrieval on the raw chat
+message can finish while it decides. If the decision needs portfolio data,
+generation uses the speculative chunks, re-querying with the refined
+instruction and merging when the message alone did not name what to look
+up. Otherwise the speculation is discarded and counted as wasted.
+"""
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import re
+import threading
+from typing import Optional
+
+from clients.retrieval.base import RetrievedChunk
+from utils.metrics import SPECULATIVE_RETRIEVAL_TOTAL
+from utils.retrieval_config import get_retrieval_client
+
+# Words that say nothing about what to retrieve
+_STOPWORDS = frozenset("""
+    a about add all an and any are as at be can could describe descriptions detail details display do for from
+    give have how i in include is it its list me more my of on or please see show some tell that the their them
+    these this those to used using view what with you your
+""".split())
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def speculative_retrieval_enabled() -> bool:
+    return os.getenv("SPECULATIVE_RETRIEVAL_ENABLED", "true").lower() == "true"
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("SPECULATIVE_RETRIEVAL_WORKERS", "4")),
+                thread_name_prefix="speculative-retrieval",
+            )
+        return _executor
+
+
+def content_terms(text: str) -> set[str]:
+    return {token for token in re.findall(r"[a-z0-9+#]+", text.lower()) if token not in _STOPWORDS}
+
+
+def merge_chunks(*results: list[RetrievedChunk], top_k: int = 10) -> list[RetrievedChunk]:
+    """Union of retrieval results, keeping each chunk's best score"""
+    best: dict[str, RetrievedChunk] = {}
+    for chunks in results:
+        for chunk in chunks:
+            if chunk.text not in best or chunk.score > best[chunk.text].score:
+                best[chunk.text] = chunk
+    return sorted(best.values(), key=lambda chunk: chunk.score, reverse=True)[:top_k]
+
+
+class SpeculativeRetrieval:
+    """One speculative retrieval, resolved or discarded exactly once"""
+
+    def __init__(self, query: str, future: Future):
+        self.query = query
+        self.future = future
+        self.outcome: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, query: str) -> "SpeculativeRetrieval":
+        # The client is fetched on the worker thread too; building it can be slow
+        return cls(query, _get_executor().submit(lambda: get_retrieval_client().retrieve(query=query)))
+
+    def _finish(self, outcome: str) -> bool:
+        with self._lock:
+            if self.outcome is not None:
+                return False
+            self.outcome = outcome
+        SPECULATIVE_RETRIEVAL_TOTAL.inc(outcome=outcome)
+        return True
+
+    def _plan(self, instruction: str) -> str:
+        """'reuse' when the message already names what the instruction asks about"""
+        return "reuse" if content_terms(self.query) & content_terms(instruction) else "merge"
+
+    def resolve(self, instruction: str) -> list[RetrievedChunk]:
+        """Chunks for `instruction`, built on the speculative result"""
+        try:
+            speculative = self.future.result()
+        except Exception as e:
+            print(f"Speculative retrieval failed: {e}")
+            self._finish("failed")
+            return get_retrieval_client().retrieve(query=instruction)
+
+        if self._plan(instruction) == "reuse":
+            self._finish("reused")
+            return speculative
+
+        self._finish("merged")
+        return merge_chunks(get_retrieval_client().retrieve(query=instruction), speculative)
+
+    async def resolve_async(self, instruction: str) -> list[RetrievedChunk]:
+        try:
+            speculative = await asyncio.wrap_future(self.future)
+        except Exception as e:
+            print(f"Speculative retrieval failed: {e}")
+            self._finish("failed")
+            return await asyncio.to_thread(get_retrieval_client().retrieve, query=instruction)
+
+        if self._plan(instruction) == "reuse":
+            self._finish("reused")
+            return speculative
+
+        self._finish("merged")
+        refined = await asyncio.to_thread(get_retrieval_client().retrieve, query=instruction)
+        return merge_chunks(refined, speculative)
+
+    def discard(self) -> None:
+        """Drop a speculation generation did not use; a no-op once resolved"""
+        if self._finish("wasted"):
+            self.future.cancel()
+
+
+def start_speculative_retrieval(user_action: str) -> Optional[SpeculativeRetrieval]:
+    if not speculative_retrieval_enabled() or not content_terms(user_action):
+        return None
+    try:
+        return SpeculativeRetrieval.start(user_action)
+    except Exception as e:
+        print(f"Could not start speculative retrieval: {e}")
+        return None
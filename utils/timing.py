@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+
+class StageTimer:
+    """
+    Wall-clock durations (milliseconds) for the named stages of one request.
+
+    A stage entered more than once accumulates. Stages may nest, so the sum of
+    all stages can exceed the request's total time.
+    """
+
+    def __init__(self):
+        self._durations: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name: str, duration_ms: float) -> None:
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + duration_ms
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def count(self, name: str) -> int:
+        """How many times a stage was entered"""
+        with self._lock:
+            return self._counts.get(name, 0)
+
+    def merge(self, durations: Optional[Dict[str, float]]) -> None:
+        for name, duration_ms in (durations or {}).items():
+            self.record(name, duration_ms)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(duration_ms, 1) for name, duration_ms in self._durations.items()}
+
+    def server_timing_header(self) -> str:
+        return server_timing_header(self.as_dict())
+
+
+def server_timing_header(durations: Dict[str, float]) -> str:
+    """Format stage durations for the Server-Timing response header"""
+    return ", ".join(f"{name};dur={duration_ms:.1f}" for name, duration_ms in durations.items())
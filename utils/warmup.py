@@ -0,0 +1,104 @@
+"""
+Service warm-up.
+
+The retrieval client, model provider and Redis connection are created on
+first use so importing the app stays fast. Warming creates them ahead of
+traffic instead: gunicorn does it in each worker before accepting
+connections (see gunicorn.conf.py), and /healthz/warm does it on demand.
+"""
+import threading
+from typing import Callable
+
+from utils.metrics import STARTUP_SECONDS
+from utils.timing import StageTimer
+
+
+def _warm_redis() -> None:
+    from clients.redis_client import redis_client
+
+    redis_client.ping()
+
+
+def _warm_retrieval() -> None:
+    from utils.retrieval_config import get_retrieval_client
+
+    get_retrieval_client()
+
+
+def _warm_agents() -> None:
+    # Loads strands and the provider SDK, and leaves one idle agent of each kind pooled
+    from agents.html_generation.html_generation_agent import (
+        create_html_generation_agent,
+        create_html_patch_agent,
+        create_page_spec_agent,
+    )
+    from agents.orchestrator.orchestrator_agent import create_orchestrator_agent
+    from utils.agent_pool import pooled_agent
+
+    for kind, factory in (
+        ("orchestrator", create_orchestrator_agent),
+        ("html_generation", create_html_generation_agent),
+        ("html_patch", create_html_patch_agent),
+        ("page_spec", create_page_spec_agent),
+    ):
+        with pooled_agent(kind, factory):
+            pass
+
+
+WARM_STEPS: tuple[tuple[str, Callable[[], None]], ...] = (
+    ("redis", _warm_redis),
+    ("retrieval", _warm_retrieval),
+    ("agents", _warm_agents),
+)
+
+_lock = threading.Lock()
+_import_ms: float | None = None
+_warm = False
+_timings: dict[str, float] = {}
+_errors: dict[str, str] = {}
+
+
+def record_import_time(seconds: float) -> None:
+    """Report how long importing the app took"""
+    global _import_ms
+    _import_ms = round(seconds * 1000, 1)
+    STARTUP_SECONDS.observe(seconds, phase="import")
+    print(f"App imported in {_import_ms} ms")
+
+
+def warm_status() -> dict:
+    return {
+        "warm": _warm,
+        "import_ms": _import_ms,
+        "timings": dict(_timings),
+        "errors": dict(_errors),
+    }
+
+
+def warm_up(force: bool = False) -> dict:
+    """
+    Create every lazily initialized service. Runs once; later calls return
+    the recorded result unless a step failed, in which case it is retried.
+    """
+    global _warm, _timings, _errors
+    with _lock:
+        if _warm and not force:
+            return warm_status()
+
+        timer = StageTimer()
+        errors = {}
+        for name, step in WARM_STEPS:
+            try:
+                with timer.stage(name):
+                    step()
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+                errors[name] = str(e)
+
+        _timings = timer.as_dict()
+        _errors = errors
+        _warm = not errors
+        for name, duration_ms in _timings.items():
+            STARTUP_SECONDS.observe(duration_ms / 1000, phase=f"warm_{name}")
+        print(f"Warm-up finished: {_timings}")
+        return warm_status()
@@ -0,0 +1,137 @@
+"""
+Agent worker pool for queued chat turns.
+
+With CHAT_EXECUTION=queue the web process only enqueues chat turns and streams
+their events; these workers pop them from Redis, run the agent pipeline and
+write progress and results to each turn's event stream. Web nodes and agent
+workers scale independently.
+
+Run with:
+    python worker.py --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+
+
+def process_next_job(timeout: int = 1, worker: str | None = None) -> bool:
+    """
+    Run the oldest queued chat turn, if any arrives within `timeout` seconds.
+    The turn stays in this worker's processing list until it finishes, so a
+    crash mid-turn leaves it to be requeued rather than lost.
+    """
+    import app as portfolio_app
+    from utils.chat_jobs import (
+        ChatJobEvents,
+        acknowledge_chat_job,
+        announce_queue_positions,
+        dequeue_chat_job,
+        worker_id,
+    )
+
+    worker = worker or worker_id()
+    queued = dequeue_chat_job(worker, timeout=timeout)
+    if queued is None:
+        return False
+    job, item = queued
+
+    try:
+        announce_queue_positions(portfolio_app.queue_position_payload)
+        session_id = job["session_id"]
+        job_events = ChatJobEvents(session_id, job["job_id"])
+        attempt = job_events.start_attempt()
+        if attempt > int(os.getenv("CHAT_JOB_MAX_ATTEMPTS", "2")):
+            print(f"Giving up on chat job {job['job_id']} after {attempt - 1} attempts")
+            job_events.append({'status': 'error', 'message': 'The request was interrupted. Please try again.'})
+            return True
+
+        print(f"Running chat job {job['job_id']} in worker {os.getpid()} (attempt {attempt})")
+        portfolio_app.run_chat_job(
+            job_events,
+            portfolio_app.create_chat_store(session_id),
+            portfolio_app.create_html_cache(session_id),
+            job["instruction"],
+            None,
+            job.get("history_cursor"),
+            retry=attempt > 1,
+        )
+    finally:
+        acknowledge_chat_job(worker, item)
+    return True
+
+
+def work(stop_event) -> None:
+    # The supervisor handles shutdown; finish the current job on Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Services are created lazily, so each process opens its own after the fork
+    from utils.chat_jobs import WorkerLease, requeue_orphaned_jobs, worker_id
+    from utils.metrics import start_snapshot_publisher
+    from utils.warmup import warm_up
+
+    warm_up()
+    start_snapshot_publisher()
+
+    worker = worker_id()
+    lease = WorkerLease(worker)
+    lease.start()
+    reap_seconds = float(os.getenv("CHAT_JOB_REAP_SECONDS", "10"))
+    last_reaped = 0.0
+
+    while not stop_event.is_set():
+        try:
+            if time.monotonic() - last_reaped >= reap_seconds:
+                last_reaped = time.monotonic()
+                requeue_orphaned_jobs()
+            process_next_job(worker=worker)
+        except Exception as e:
+            print(f"Worker {os.getpid()} failed to process a job: {e}")
+            time.sleep(1)
+    lease.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run agent workers for queued chat turns.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.getenv("AGENT_WORKER_PROCESSES", "2")),
+        help="Chat turns run in parallel, one per process.",
+    )
+    args = parser.parse_args()
+
+    # Imported once here so forked workers skip the import
+    import app  # noqa: F401
+
+    stop_event = multiprocessing.Event()
+
+    def start_worker() -> multiprocessing.Process:
+        process = multiprocessing.Process(target=work, args=(stop_event,), daemon=True)
+        process.start()
+        return process
+
+    def request_stop(signum, frame):
+        print("Stopping agent workers after their current jobs...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    workers = [start_worker() for _ in range(args.processes)]
+    print(f"Started {len(workers)} agent workers")
+
+    while not stop_event.is_set():
+        time.sleep(1)
+        for index, process in enumerate(workers):
+            if not process.is_alive() and not stop_event.is_set():
+                print(f"Agent worker {process.pid} exited with {process.exitcode}; restarting")
+                workers[index] = start_worker()
+
+    for process in workers:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()